@@ -0,0 +1,312 @@
+"""Synthetic-repo benchmarks for wtf.
+
+Builds trees of fake repos in a temp dir, times each phase (discovery, git
+collection, diffs, a full cli run against a local stub llm) and writes the
+timings as json. Compare against an earlier run with --baseline.
+
+    python benchmarks/bench.py --scenario small --repeat 3
+    python benchmarks/bench.py --baseline benchmarks/results/old.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+RESULTS_VERSION = 1
+
+AUTHOR = "bench"
+EMAIL = "bench@example.com"
+
+
+@dataclass(slots=True)
+class Scenario:
+    repos: int
+    commits: int
+    # repos with uncommitted changes, and how big those changes are
+    dirty_repos: int
+    dirty_files: int
+    dirty_kb: int
+    # node_modules style clutter next to the repos: width ** depth dirs
+    junk_width: int
+    junk_depth: int
+
+
+SCENARIOS = {
+    "small": Scenario(10, 50, 2, 20, 4, 3, 3),
+    "medium": Scenario(50, 200, 5, 200, 8, 4, 4),
+    "large": Scenario(200, 500, 10, 500, 16, 4, 5),
+}
+
+
+def git_env() -> dict:
+    # keep the user's git config out of the synthetic repos
+    return {
+        **os.environ,
+        "GIT_CONFIG_NOSYSTEM": "1",
+        "GIT_CONFIG_GLOBAL": os.devnull,
+        "GIT_AUTHOR_NAME": AUTHOR,
+        "GIT_AUTHOR_EMAIL": EMAIL,
+        "GIT_COMMITTER_NAME": AUTHOR,
+        "GIT_COMMITTER_EMAIL": EMAIL,
+    }
+
+
+def fast_import_stream(commits: int, now: int) -> bytes:
+    # one commit a minute up to now, each touching one of 50 files
+    out = []
+    for i in range(commits):
+        ts = now - (commits - i) * 60
+        msg = f"feat: change {i}".encode()
+        body = f"value {i}\n".encode() * 20
+        out.append(b"commit refs/heads/main\n")
+        out.append(b"mark :%d\n" % (i + 1))
+        out.append(b"author %s <%s> %d +0000\n" % (AUTHOR.encode(), EMAIL.encode(), ts))
+        out.append(
+            b"committer %s <%s> %d +0000\n" % (AUTHOR.encode(), EMAIL.encode(), ts)
+        )
+        out.append(b"data %d\n%s\n" % (len(msg), msg))
+        if i:
+            out.append(b"from :%d\n" % i)
+        out.append(b"M 644 inline src/file%d.txt\n" % (i % 50))
+        out.append(b"data %d\n%s\n" % (len(body), body))
+    return b"".join(out)
+
+
+def make_repo(path: Path, commits: int, now: int):
+    env = git_env()
+    subprocess.run(["git", "init", "-q", "-b", "main", str(path)], check=True, env=env)
+    subprocess.run(
+        ["git", "fast-import", "--quiet"],
+        input=fast_import_stream(commits, now),
+        cwd=path,
+        check=True,
+        env=env,
+    )
+    subprocess.run(["git", "reset", "-q", "--hard"], cwd=path, check=True, env=env)
+
+
+def make_dirty(path: Path, files: int, kb: int):
+    # rewrite tracked files and add new ones, half and half
+    line = b"x" * 63 + b"\n"
+    for i in range(files):
+        name = f"src/file{i}.txt" if i < min(50, files // 2) else f"new/file{i}.txt"
+        target = path / name
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(line * (kb * 16))
+
+
+def make_junk(path: Path, width: int, depth: int, inner: str = "node_modules"):
+    # a deep tree without any repos, like an unpacked node_modules
+    if depth == 0:
+        path.mkdir(parents=True, exist_ok=True)
+        (path / "index.js").write_text("module.exports = {}\n")
+        return
+    for i in range(width):
+        make_junk(path / f"pkg{i}" / inner, width, depth - 1, inner)
+
+
+def build_tree(root: Path, scenario: Scenario) -> list[str]:
+    now = int(time.time())
+    repos = []
+    for i in range(scenario.repos):
+        # spread repos over a couple of levels, like a real projects dir
+        path = root / f"group{i % 5}" / f"repo{i}"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        make_repo(path, scenario.commits, now)
+        repos.append(str(path))
+    for path in repos[: scenario.dirty_repos]:
+        make_dirty(Path(path), scenario.dirty_files, scenario.dirty_kb)
+    # one copy discovery should prune by name, one it has to walk
+    make_junk(root / "node_modules", scenario.junk_width, scenario.junk_depth)
+    make_junk(root / "vendor", scenario.junk_width, scenario.junk_depth, "lib")
+    return repos
+
+
+def timed(fn, repeat: int) -> list[float]:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def run_cli(url: str | None, home: str, *args: str):
+    # the real entry point in a fresh interpreter so startup is measured too,
+    # talking to the stub at url
+    env = {**git_env(), "HOME": home, "USERPROFILE": home, "PYTHONPATH": str(ROOT)}
+    if url:
+        env["WTF_API_URL"] = url
+    subprocess.run(
+        [sys.executable, "-m", "wtf_dev.cli", *args],
+        cwd=ROOT,
+        env=env,
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+
+
+def bench_scenario(name: str, scenario: Scenario, repeat: int, url: str) -> list:
+    # wtf_dev is imported by main() after HOME points at the temp dir
+    from wtf_dev import cli, index
+    from wtf_dev.git import find_git_repos
+
+    results = []
+
+    def record(phase: str, times: list[float]):
+        results.append(
+            {
+                "scenario": name,
+                "phase": phase,
+                "times": times,
+                "min": min(times),
+                "median": statistics.median(times),
+            }
+        )
+        print(f"  {phase:<16} {statistics.median(times) * 1000:9.1f} ms")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "code"
+        start = time.perf_counter()
+        repos = build_tree(root, scenario)
+        print(f"{name}: built {len(repos)} repos in {time.perf_counter() - start:.1f}s")
+        dirty = repos[: scenario.dirty_repos]
+        since = time.time() - 86400
+
+        record("discover", timed(lambda: find_git_repos(str(root)), repeat))
+        index.load_repos(str(root), rebuild=True)
+        record("discover_index", timed(lambda: index.load_repos(str(root)), repeat))
+        record(
+            "get_commits",
+            timed(
+                lambda: [cli.get_commits(r, AUTHOR, "1 day ago") for r in repos], repeat
+            ),
+        )
+        record(
+            "start_repo",
+            timed(lambda: [cli.start_repo(r, AUTHOR, since) for r in repos], repeat),
+        )
+        record("gather", timed(lambda: cli.gather(str(root), AUTHOR, 1), repeat))
+        record("wip_diff", timed(lambda: [cli.get_wip_diff(r) for r in dirty], repeat))
+
+        home = os.environ["HOME"]
+        args = ("-d", str(root), "-a", AUTHOR, "--no-cache", "--days", "1")
+        record(
+            "cli_json",
+            timed(lambda: run_cli(url, home, *args, "--json"), repeat),
+        )
+        record("cli_stream", timed(lambda: run_cli(url, home, *args), repeat))
+        record("cli_spending", timed(lambda: run_cli(None, home, "--spending"), repeat))
+    return results
+
+
+def compare(
+    results: list, baseline_path: Path, tolerance: float, min_delta: float
+) -> list[str]:
+    # phases whose best time got slower than the baseline's by more than
+    # tolerance, ignoring millisecond jitter on the fast phases
+    baseline = json.loads(baseline_path.read_text())
+    before = {(r["scenario"], r["phase"]): r["min"] for r in baseline["results"]}
+    slower = []
+    for r in results:
+        old = before.get((r["scenario"], r["phase"]))
+        if old is None:
+            continue
+        if r["min"] > old * (1 + tolerance) and r["min"] - old > min_delta:
+            slower.append(
+                f"{r['scenario']}/{r['phase']}: "
+                f"{old * 1000:.1f} ms -> {r['min'] * 1000:.1f} ms"
+            )
+    return slower
+
+
+def git_version() -> str:
+    out = subprocess.run(["git", "--version"], capture_output=True, text=True)
+    return out.stdout.strip()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--scenario",
+        action="append",
+        choices=sorted(SCENARIOS),
+        help="scenario to run, repeatable (default: small and medium)",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--llm-latency", type=float, default=0.0, help="seconds the stub waits"
+    )
+    parser.add_argument("--out", type=Path, help="results file")
+    parser.add_argument("--baseline", type=Path, help="earlier results to compare")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument(
+        "--min-delta", type=float, default=0.01, help="seconds, below is noise"
+    )
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as home:
+        # storage paths are resolved at import, so set HOME before importing
+        os.environ["HOME"] = os.environ["USERPROFILE"] = home
+        wtf_dir = Path(home) / ".wtf"
+        wtf_dir.mkdir()
+        (wtf_dir / "config.json").write_text(
+            json.dumps({"api_key": "bench", "model": "bench/model"})
+        )
+        sys.path.insert(0, str(ROOT))
+
+        from wtf_dev import devserver
+
+        # fixed usage so cost accounting doesn't vary with the prompt
+        stub = devserver.start(
+            devserver.Settings(
+                latency=args.llm_latency, prompt_tokens=1000, completion_tokens=50
+            )
+        )
+        url = stub.url
+        results = []
+        try:
+            for name in args.scenario or ["small", "medium"]:
+                results.extend(bench_scenario(name, SCENARIOS[name], args.repeat, url))
+        finally:
+            stub.shutdown()
+
+    report = {
+        "version": RESULTS_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "git": git_version(),
+        "cpus": os.cpu_count(),
+        "repeat": args.repeat,
+        "scenarios": {
+            n: asdict(SCENARIOS[n]) for n in args.scenario or ["small", "medium"]
+        },
+        "results": results,
+    }
+    out = args.out or RESULTS_DIR / f"bench-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+    print(f"results written to {out}")
+
+    if args.baseline:
+        slower = compare(results, args.baseline, args.tolerance, args.min_delta)
+        for line in slower:
+            print(f"slower: {line}")
+        if slower:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,45 @@
+import os
+import tempfile
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+from src import cache
+
+
+def test_put_and_get():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        with patch.object(cache, "CACHE_DIR", Path(tmpdir)):
+            key = cache.make_key("model", "prompt")
+            assert cache.get(key) is None
+
+            cache.put(key, {"summary": "hi"})
+
+            assert cache.get(key) == {"summary": "hi"}
+            assert cache.make_key("model", "prompt") == key
+            assert cache.make_key("model", "other") != key
+
+
+def test_get_expires_after_ttl():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        with patch.object(cache, "CACHE_DIR", Path(tmpdir)):
+            cache.put("k", {"a": 1})
+            with patch.object(cache.time, "time", return_value=time.time() + 100):
+                assert cache.get("k", ttl=10) is None
+            assert not (Path(tmpdir) / "k.json").exists()
+
+
+def test_evicts_least_recently_used():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        with patch.object(cache, "CACHE_DIR", Path(tmpdir)):
+            for i, key in enumerate(["a", "b", "c"]):
+                cache.put(key, {"i": i}, max_entries=3)
+                os.utime(Path(tmpdir) / f"{key}.json", (1000 + i, 1000 + i))
+
+            # touching "a" makes "b" the oldest
+            cache.get("a")
+            cache.put("d", {"i": 3}, max_entries=3)
+
+            assert cache.get("b") is None
+            assert cache.get("a") == {"i": 0}
+            assert cache.get("d") == {"i": 3}
@@ -1,10 +1,14 @@
+import tempfile
 from pathlib import Path
 
 import pytest
 
-from src.cli import get_commits, format_for_llm
+from src.cli import format_for_llm, get_commits, start_repo
+from src.git import CommitRecord, RepoSnapshot
 from src.models import Commit, RepoSummary
 
+from .test_git import make_repo
+
 
 def test_get_commits_empty(mocker):
     mocker.patch("src.cli.get_git_commits", return_value=None)
@@ -13,24 +17,16 @@ def test_get_commits_empty(mocker):
 
 
 def test_get_commits_parses_correctly(mocker):
-    raw = "abc123|fix bug|2025-01-01|2025-01-01T10:00:00"
-    mocker.patch("src.cli.get_git_commits", return_value=raw)
+    records = [CommitRecord("abc123", "fix a | b", "2025-01-01", "2025-01-01T10:00")]
+    mocker.patch("src.cli.get_git_commits", return_value=records)
 
     commits = get_commits("/fake/repo", "author", "1 day ago")
 
     assert len(commits) == 1
     assert commits[0].hash == "abc123"
-    assert commits[0].message == "fix bug"
+    assert commits[0].message == "fix a | b"
     assert commits[0].date == "2025-01-01"
-
-
-def test_get_commits_multiple_lines(mocker):
-    raw = "abc123|fix bug|2025-01-01|time1\ndef456|add feature|2025-01-02|time2"
-    mocker.patch("src.cli.get_git_commits", return_value=raw)
-
-    commits = get_commits("/fake/repo", "author", "1 day ago")
-
-    assert len(commits) == 2
+    assert commits[0].repo_name == "repo"
 
 
 def test_format_for_llm():
@@ -62,3 +58,225 @@ def test_format_for_llm():
     assert "repo1 (2 commits)" in result
     assert "commit 1" in result
     assert "commit 2" in result
+
+
+def test_gather_keeps_repo_order(mocker):
+    import time
+
+    from src import cli, storage, streak
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        root = Path(tmpdir) / "code"
+        for i in range(5):
+            make_repo(root / f"repo{i}", [f"work in repo{i}"])
+        (root / "repo1" / "file.txt").write_text("wip")
+        wtf_dir = Path(tmpdir) / ".wtf"
+        mocker.patch.object(storage, "WTF_DIR", wtf_dir)
+        mocker.patch.object(storage, "HISTORY_DIR", wtf_dir / "history")
+        mocker.patch.object(streak, "STREAK_FILE", wtf_dir / "streaks.json")
+        mocker.patch("src.cli.storage.load_config", return_value={})
+        mocker.patch("src.llm.get_model", return_value="test-model")
+        real_start = cli.start_repo
+
+        def slow_start(repo_path, *args):
+            # make earlier repos finish last
+            time.sleep(0.01 * (5 - int(repo_path[-1])))
+            return real_start(repo_path, *args)
+
+        mocker.patch("src.cli.start_repo", side_effect=slow_start)
+        repos = cli.find_git_repos(str(root))
+
+        result, commits_text, diff_text = cli.gather(
+            str(root), "tester", 1, no_index=True, jobs=4
+        )
+
+        assert [r.path for r in result.repos] == repos
+        assert [w.repo_name for w in result.wip] == ["repo1"]
+        assert "work in repo0" in commits_text and "+wip" in diff_text
+
+
+def test_start_repo_defers_diff_to_pool(mocker):
+    from concurrent.futures import ThreadPoolExecutor
+
+    snapshot = RepoSnapshot(
+        branch="main",
+        status=["M app.py"],
+        commits=[CommitRecord("abc", "fix", "2025-01-01", "2025-01-01T10:00:00")],
+        commit_dates={"2025-01-01"},
+    )
+    mocker.patch("src.cli.get_repo_snapshot", return_value=snapshot)
+    mocker.patch("src.cli.get_wip_diff", return_value="+ change")
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        summary, wip, dates, diff = start_repo("/fake/repo", "me", 0.0, None, pool)
+
+        assert summary.branch == "main"
+        assert summary.commits[0].repo_name == "repo"
+        assert wip.files_changed == ["M app.py"]
+        assert wip.diff_preview == ""
+        assert diff.result() == "+ change"
+        assert dates == {"2025-01-01"}
+
+    _, wip, _, diff = start_repo("/fake/repo", "me", 0.0)
+    assert diff is None
+    assert wip.diff_preview == "+ change"
+
+
+def test_respond_falls_back_to_offline_summary(mocker, capsys):
+    import json
+    from datetime import datetime
+
+    import requests
+
+    from src.cli import respond
+    from src.models import LLMResponse, StandupResult
+
+    result = StandupResult(
+        repos=[
+            RepoSummary(
+                name="api",
+                path="/api",
+                commits=[
+                    Commit(
+                        hash="a", message="feat: x", date="", time="", repo_name="api"
+                    )
+                ],
+            )
+        ],
+        llm_response=LLMResponse(summary="", roast=""),
+        generated_at=datetime.now(),
+        cost_usd=0.0,
+    )
+    mocker.patch("src.llm.get_model", return_value="m")
+    mocker.patch("src.cache.get", return_value=None)
+    put = mocker.patch("src.cache.put")
+    spend = mocker.patch("src.cli.storage.add_spending")
+    mocker.patch("src.cli.storage.save_standup")
+    mocker.patch("src.llm.summarize", side_effect=requests.ConnectionError("down"))
+
+    respond(result, "commits", None, {}, json_out=True)
+
+    out = json.loads(capsys.readouterr().out)
+    assert out["summary"] == "1 feature in api. Latest: x."
+    assert result.cost_usd == 0.0
+    # offline answers are not cached or billed
+    put.assert_not_called()
+    spend.assert_not_called()
+
+
+def test_respond_bills_map_calls_made_before_falling_back(mocker, capsys):
+    from datetime import datetime
+
+    import requests
+    import typer
+
+    from src.cli import respond
+    from src.models import LLMResponse, StandupResult
+
+    result = StandupResult(
+        repos=[],
+        llm_response=LLMResponse(summary="", roast=""),
+        generated_at=datetime.now(),
+        cost_usd=0.0,
+    )
+    error = requests.Timeout("slow")
+    error.cost = 0.02
+    mocker.patch("src.llm.get_model", return_value="m")
+    mocker.patch("src.cache.get", return_value=None)
+    mocker.patch("src.cache.put")
+    spend = mocker.patch("src.cli.storage.add_spending")
+    mocker.patch("src.cli.storage.save_standup")
+    mocker.patch("src.llm.summarize", side_effect=error)
+
+    respond(result, "commits", None, {}, json_out=True)
+    spend.assert_called_once_with(0.02, "m")
+
+    # and when there is no fallback, before reporting the error
+    spend.reset_mock()
+    with pytest.raises(typer.Exit):
+        respond(result, "commits", None, {"offline_fallback": False}, json_out=True)
+    spend.assert_called_once_with(0.02, "m")
+
+
+@pytest.mark.parametrize("flag", ["--json", "--ndjson"])
+def test_copy_keeps_machine_output_clean(mocker, flag):
+    import sys
+    from unittest.mock import MagicMock
+
+    from typer.testing import CliRunner
+
+    from src import cli
+
+    result = MagicMock()
+    mocker.patch("src.cli.storage.is_configured", return_value=True)
+    mocker.patch("src.cli.storage.load_config", return_value={})
+    mocker.patch("src.cli.gather", return_value=(result, "commits", None))
+    mocker.patch("src.cli.respond")
+    mocker.patch("src.export.write_ndjson_start")
+    mocker.patch.dict(sys.modules, {"pyperclip": MagicMock()})
+    render_copied = mocker.patch("src.cli.formatter.render_copied")
+
+    out = CliRunner().invoke(cli.app, [flag, "--copy", "--here", "--no-daemon"])
+
+    assert out.exit_code == 0
+    assert out.stdout == ""
+    assert "copied to clipboard" in out.stderr
+    render_copied.assert_not_called()
+
+
+def test_team_without_members_errors_on_stderr_for_json(capsys):
+    import typer
+
+    from src import cli
+
+    with pytest.raises(typer.Exit):
+        cli.run_team([" "], ".", 1, {}, json_out=True)
+
+    captured = capsys.readouterr()
+    assert captured.out == ""
+    assert "No team members given." in captured.err
+
+
+def test_gather_keeps_wip_in_idle_repos(mocker):
+    import os
+    import time
+
+    from src import cli, index, storage, streak
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        root = Path(tmpdir) / "code"
+        # git hasn't touched it in a month, but a file was edited today
+        month_ago = time.time() - 30 * 86400
+        date = f"@{int(month_ago)} +0000"
+        mocker.patch.dict(
+            os.environ, {"GIT_AUTHOR_DATE": date, "GIT_COMMITTER_DATE": date}
+        )
+        make_repo(root / "old", ["a month ago"])
+        (root / "old" / "file.txt").write_text("wip")
+
+        def age_git_dir():
+            for dirpath, dirnames, filenames in os.walk(root / "old" / ".git"):
+                for name in [*dirnames, *filenames]:
+                    os.utime(os.path.join(dirpath, name), (month_ago, month_ago))
+
+        wtf_dir = Path(tmpdir) / ".wtf"
+        mocker.patch.object(storage, "WTF_DIR", wtf_dir)
+        mocker.patch.object(storage, "HISTORY_DIR", wtf_dir / "history")
+        mocker.patch.object(streak, "STREAK_FILE", wtf_dir / "streaks.json")
+        mocker.patch.object(index, "INDEX_FILE", wtf_dir / "index.json")
+        mocker.patch("src.cli.storage.load_config", return_value={})
+        mocker.patch("src.llm.get_model", return_value="test-model")
+        # the first run records the repo's streak days, after that it's idle
+        age_git_dir()
+        cli.gather(str(root), "tester", 1)
+        # git status may have refreshed the index
+        age_git_dir()
+        snapshot = mocker.spy(cli, "get_repo_snapshot")
+
+        result, _, diff_text = cli.gather(str(root), "tester", 1)
+
+        assert result.repos == []
+        assert [w.files_changed for w in result.wip] == [["M file.txt"]]
+        assert "+wip" in diff_text
+        # status only, the idle repo has no commits to log
+        assert snapshot.call_args.kwargs["log"] is False
@@ -0,0 +1,128 @@
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from src import daemon, index, storage
+from src.models import LLMResponse, StandupResult
+
+OPTIONS = {"max_depth": None, "skip_dirs": []}
+
+pytestmark = pytest.mark.skipif(not daemon.supported(), reason="needs unix sockets")
+
+
+def make_daemon(scan_path="/code", **kwargs):
+    return daemon.Daemon(scan_path, "tester", 1, OPTIONS, **kwargs)
+
+
+def fake_latest():
+    result = StandupResult(
+        repos=[],
+        llm_response=LLMResponse(summary="", roast=""),
+        generated_at=datetime.now(),
+        cost_usd=0.0,
+        author="tester",
+    )
+    return {
+        "result": result.model_dump_json(),
+        "commits_text": "commits",
+        "diff_text": None,
+        "fingerprints": {},
+    }
+
+
+def test_standup_only_served_for_the_same_collection():
+    d = make_daemon()
+    d.latest = fake_latest()
+    d.refreshed_at = time.time()
+    key = daemon.request_key("/code", "tester", d.days_now(), OPTIONS)
+
+    assert d.handle({"op": "standup", "key": key})["ok"]
+    other = daemon.request_key("/elsewhere", "tester", d.days_now(), OPTIONS)
+    assert not d.handle({"op": "standup", "key": other})["ok"]
+
+    # a collection older than two intervals is not worth printing
+    d.refreshed_at = time.time() - 3 * d.interval
+    assert not d.handle({"op": "standup", "key": key})["ok"]
+
+
+def test_fetch_falls_back_when_a_repo_moved_on(mocker):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        head = Path(tmpdir) / ".git" / "HEAD"
+        head.parent.mkdir()
+        head.write_text("ref: refs/heads/main\n")
+        latest = {**fake_latest(), "fingerprints": {tmpdir: index.fingerprint(tmpdir)}}
+        mocker.patch("src.daemon.query", return_value={"ok": True, **latest})
+
+        assert daemon.fetch("/code", "tester", 1, OPTIONS) is not None
+
+        # a commit since the daemon collected
+        later = time.time() + 60
+        os.utime(head, (later, later))
+        assert daemon.fetch("/code", "tester", 1, OPTIONS) is None
+
+
+def test_summary_due_once_after_standup_time():
+    assert not make_daemon().summary_due()
+    d = make_daemon(at="00:00")
+    assert d.summary_due()
+    d.summarized_on = datetime.now().date()
+    assert not d.summary_due()
+
+
+def test_offline_summarizer_is_never_asked_ahead(mocker):
+    mocker.patch(
+        "src.daemon.storage.load_config", return_value={"summarizer": "offline"}
+    )
+    summarize = mocker.patch("src.llm.summarize")
+    spend = mocker.patch("src.daemon.storage.add_spending")
+    d = make_daemon(at="00:00")
+
+    d.summarize("commits", None)
+
+    summarize.assert_not_called()
+    spend.assert_not_called()
+    assert not d.summary_due()
+
+
+def test_client_round_trip_over_socket():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        with (
+            patch.object(storage, "WTF_DIR", Path(tmpdir)),
+            patch.object(storage, "HISTORY_DIR", Path(tmpdir) / "history"),
+        ):
+            # no daemon: the client falls back
+            assert daemon.fetch("/code", "tester", 1, OPTIONS) is None
+
+            d = make_daemon()
+
+            def refresh():
+                d.latest = fake_latest()
+                d.refreshed_at = time.time()
+
+            with patch.object(d, "refresh", side_effect=refresh):
+                thread = threading.Thread(target=d.run)
+                thread.start()
+                try:
+                    for _ in range(50):
+                        if daemon.status():
+                            break
+                        time.sleep(0.05)
+                    assert daemon.status()["author"] == "tester"
+                    result, commits_text, diff_text = daemon.fetch(
+                        "/code", "tester", d.days_now(), OPTIONS
+                    )
+                    assert result.author == "tester"
+                    assert commits_text == "commits"
+                finally:
+                    assert daemon.stop()
+                    thread.join(5)
+
+            assert not thread.is_alive()
+            assert not daemon.socket_path().exists()
+            assert daemon.status() is None
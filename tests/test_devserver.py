@@ -0,0 +1,126 @@
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import pytest
+import requests
+
+from src import devserver, llm
+
+
+@pytest.fixture
+def serve(mocker):
+    # starts stub servers and points the llm module at the last one
+    mocker.patch("src.llm.get_api_key", return_value="test-key")
+    mocker.patch("src.llm.get_model", return_value="test-model")
+    servers = []
+
+    def start(**settings):
+        server = devserver.start(devserver.Settings(**settings))
+        servers.append(server)
+        mocker.patch("src.llm.OPENROUTER_URL", server.url)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_analyze_commits_against_stub(serve):
+    server = serve(prompt_tokens=1000, completion_tokens=50)
+
+    response, cost = llm.analyze_commits("\nrepo (1 commits):\n  - fix")
+
+    assert response.summary == devserver.ANSWERS["standup"]["summary"]
+    assert cost == pytest.approx(
+        llm.calc_cost({"prompt_tokens": 1000, "completion_tokens": 50})
+    )
+    assert server.requests[0]["model"] == "test-model"
+
+
+def test_stream_arrives_in_chunks(serve):
+    serve(chunk_size=4, chunk_delay=0.01)
+    updates = []
+
+    response, _ = llm.stream_commits(
+        "commits", on_update=lambda f, t: updates.append((f, t))
+    )
+
+    summary = devserver.ANSWERS["standup"]["summary"]
+    assert response.summary == summary
+    assert len([t for f, t in updates if f == "summary"]) > 1
+    assert "".join(t for f, t in updates if f == "summary") == summary
+
+
+def test_models_endpoint(serve):
+    server = serve()
+
+    models = requests.get(server.url.replace("chat/completions", "models")).json()
+
+    assert [m["id"] for m in models["data"]] == [m["id"] for m in devserver.MODELS]
+
+
+def test_errors_are_retried(serve, mocker):
+    mocker.patch("src.transport.backoff", return_value=0.0)
+    # with this seed the first two requests fail and the third succeeds
+    server = serve(error_rate=0.5, seed=7)
+
+    response, _ = llm.analyze_commits("commits")
+
+    assert response.summary
+    assert len(server.requests) == 3
+
+
+def test_slow_provider_runs_into_the_deadline(serve):
+    serve(latency=2.0)
+
+    started = time.monotonic()
+    # a read timeout on the last attempt, or the deadline itself
+    with pytest.raises(requests.exceptions.Timeout):
+        llm.analyze_commits("commits", deadline=0.3)
+    assert time.monotonic() - started < 1.5
+
+
+def test_record_then_replay(serve):
+    real = serve(prompt_tokens=7)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = Path(tmpdir) / "cassette.json"
+
+        serve(cassette=path, upstream=real.url)
+        recorded, _ = llm.analyze_commits("commits")
+        streamed, _ = llm.stream_commits("commits")
+        assert len(real.requests) == 2
+        assert len(json.loads(path.read_text())["interactions"]) == 2
+
+        # replaying needs no upstream, and answers what was recorded
+        replay = serve(cassette=path, completion_tokens=999)
+        assert llm.analyze_commits("commits")[0] == recorded
+        assert llm.stream_commits("commits")[0] == streamed
+        assert len(replay.requests) == 2
+        assert len(real.requests) == 2
+
+
+def test_stalled_upstream_answers_504(serve):
+    stalled = serve(latency=2.0)
+    recorder = serve(upstream=stalled.url, upstream_timeout=0.2)
+
+    started = time.monotonic()
+    response = requests.post(recorder.url, json={"model": "m", "messages": []})
+
+    assert response.status_code == 504
+    assert "upstream failed" in response.json()["error"]["message"]
+    assert time.monotonic() - started < 1.5
+    assert recorder.cassette.interactions == {}
+
+
+def test_model_picker_follows_the_api_url(serve, mocker):
+    from src import setup
+
+    server = serve()
+    mocker.patch.dict("os.environ", {"WTF_API_URL": server.url})
+
+    models = setup.fetch_models("test-key")
+
+    assert [m["id"] for m in models] == [m["id"] for m in devserver.MODELS]
@@ -0,0 +1,103 @@
+import io
+import json
+from datetime import datetime
+
+from src import export
+from src.models import (
+    Commit,
+    LLMResponse,
+    RepoSummary,
+    StandupResult,
+    TimeStats,
+    WipSummary,
+)
+
+
+def make_result():
+    return StandupResult(
+        repos=[
+            RepoSummary(
+                name="api",
+                path="/code/api",
+                branch="main",
+                commits=[
+                    Commit(
+                        hash="abc",
+                        message="fix a | b",
+                        date="2025-01-01",
+                        time="2025-01-01T23:00:00+00:00",
+                        repo_name="api",
+                    )
+                ],
+            )
+        ],
+        llm_response=LLMResponse(summary="s", roast="r", wip_summary=None),
+        generated_at=datetime(2025, 1, 2, 9, 30),
+        cost_usd=0.01,
+        wip=[WipSummary(repo_name="api", files_changed=["M a.py"], diff_preview="+x")],
+        time_stats=TimeStats(total_commits=1, late_night_commits=1),
+        streak=3,
+        longest_streak=5,
+        week_days=["2025-01-01"],
+        author="tester",
+    )
+
+
+def test_json_document_has_everything():
+    out = io.StringIO()
+    export.write_json(make_result(), out)
+
+    record = json.loads(out.getvalue())
+
+    assert record["schema"] == "wtf.standup"
+    assert record["version"] == export.SCHEMA_VERSION
+    assert record["generated_at"] == "2025-01-02T09:30:00"
+    assert record["wip_summary"] == ""
+    assert record["streak"] == {
+        "current": 3,
+        "longest": 5,
+        "week_days": ["2025-01-01"],
+    }
+    assert record["time_stats"]["late_night_commits"] == 1
+    assert record["repos"] == [
+        {
+            "name": "api",
+            "path": "/code/api",
+            "branch": "main",
+            "commit_count": 1,
+            "commits": [
+                {
+                    "hash": "abc",
+                    "message": "fix a | b",
+                    "date": "2025-01-01",
+                    "time": "2025-01-01T23:00:00+00:00",
+                }
+            ],
+        }
+    ]
+    assert record["wip"] == [
+        {"repo": "api", "files_changed": ["M a.py"], "diff_preview": "+x"}
+    ]
+
+
+def test_missing_time_stats_keep_the_schema():
+    result = make_result()
+    result.time_stats = None
+
+    record = export.standup_record(result)
+
+    assert record["time_stats"]["total_commits"] == 0
+
+
+def test_ndjson_lines_add_up_to_the_document():
+    result = make_result()
+    out = io.StringIO()
+    export.write_ndjson_start(result, out)
+    export.write_ndjson_end(result, out)
+
+    lines = [json.loads(line) for line in out.getvalue().splitlines()]
+
+    assert [line.pop("type") for line in lines] == ["standup", "repo", "wip", "summary"]
+    standup, repo, wip, summary = lines
+    merged = {**standup, **summary, "repos": [repo], "wip": [wip]}
+    assert merged == export.standup_record(result)
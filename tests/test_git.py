@@ -1,11 +1,39 @@
+import io
 import os
 import subprocess
 import tempfile
 from pathlib import Path
+from unittest.mock import MagicMock
 
 import pytest
 
-from src.git import find_git_repos, get_git_commits, get_git_user
+from src.git import (
+    find_git_repos,
+    get_git_commits,
+    get_git_diff,
+    get_git_user,
+    get_repo_snapshot,
+    parse_status_v2,
+    read_log,
+)
+
+
+def make_repo(path, messages):
+    # real repo with one commit per message
+    env = {
+        **os.environ,
+        "GIT_AUTHOR_NAME": "tester",
+        "GIT_AUTHOR_EMAIL": "t@example.com",
+        "GIT_COMMITTER_NAME": "tester",
+        "GIT_COMMITTER_EMAIL": "t@example.com",
+    }
+    subprocess.run(["git", "init", "-q", "-b", "main", str(path)], check=True)
+    for i, message in enumerate(messages):
+        (Path(path) / "file.txt").write_text(str(i))
+        subprocess.run(["git", "add", "."], cwd=path, check=True, env=env)
+        subprocess.run(
+            ["git", "commit", "-q", "-m", message], cwd=path, check=True, env=env
+        )
 
 
 def test_find_git_repos_empty_dir():
@@ -40,6 +68,95 @@ def test_find_git_repos_nested():
         assert len(repos) == 2
 
 
+def test_find_git_repos_does_not_descend_into_repos():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        repo = Path(tmpdir) / "repo"
+        (repo / ".git").mkdir(parents=True)
+        (repo / "vendor" / "inner" / ".git").mkdir(parents=True)
+
+        assert find_git_repos(tmpdir) == [str(repo)]
+        assert len(find_git_repos(tmpdir, nested=True)) == 2
+
+
+def test_find_git_repos_skips_dependency_dirs():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        (Path(tmpdir) / "node_modules" / "pkg" / ".git").mkdir(parents=True)
+        (Path(tmpdir) / "scratch" / "repo" / ".git").mkdir(parents=True)
+        (Path(tmpdir) / "code" / "repo" / ".git").mkdir(parents=True)
+
+        repos = find_git_repos(tmpdir, skip_dirs=["scratch"])
+        assert repos == [str(Path(tmpdir) / "code" / "repo")]
+
+
+def test_find_git_repos_finds_repos_named_like_dependency_dirs():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        code = Path(tmpdir) / "code"
+        for name in ["app", "build", "target"]:
+            (code / name / ".git").mkdir(parents=True)
+        (code / "dist" / "pkg" / ".git").mkdir(parents=True)
+
+        repos = find_git_repos(str(code))
+        assert repos == [str(code / name) for name in ["app", "build", "target"]]
+        # unless the user skips them
+        assert find_git_repos(str(code), skip_dirs=["build"]) == [
+            str(code / "app"),
+            str(code / "target"),
+        ]
+
+
+def test_find_git_repos_max_depth():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        (Path(tmpdir) / "a" / ".git").mkdir(parents=True)
+        (Path(tmpdir) / "b" / "c" / ".git").mkdir(parents=True)
+
+        assert len(find_git_repos(tmpdir, max_depth=1)) == 1
+        assert len(find_git_repos(tmpdir, max_depth=2)) == 2
+
+
+def test_find_git_repos_symlinks():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        (Path(tmpdir) / "real" / "repo" / ".git").mkdir(parents=True)
+        os.symlink(Path(tmpdir) / "real", Path(tmpdir) / "link")
+
+        assert len(find_git_repos(tmpdir)) == 1
+        # following links must not report the same repo twice
+        assert len(find_git_repos(tmpdir, follow_symlinks=True)) == 1
+
+
+def test_get_git_commits_keeps_subjects_whole():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        make_repo(tmpdir, ["first", "fix a | b"])
+
+        commits = get_git_commits(tmpdir, "tester", "1 day ago")
+
+        assert [c.message for c in commits] == ["fix a | b", "first"]
+        assert commits[0].author == "tester <t@example.com>"
+
+
+def test_read_log_handles_records_split_across_reads():
+    data = b"\0".join(
+        "\x1f".join([f"h{i}", f"subject {i}", "d", "t", "0", "a"]).encode()
+        for i in range(20)
+    )
+
+    class Trickle(io.RawIOBase):
+        # hands out 7 bytes per read, like a slow pipe
+        def __init__(self):
+            self.data = data
+
+        def read1(self, size=-1):
+            chunk, self.data = self.data[:7], self.data[7:]
+            return chunk
+
+    proc = MagicMock()
+    proc.stdout = Trickle()
+
+    records = list(read_log(proc, "/repo", 0.0))
+
+    assert [r[1] for r in records] == [f"subject {i}" for i in range(20)]
+    proc.wait.assert_called_once()
+
+
 def test_get_git_commits_invalid_repo():
     with tempfile.TemporaryDirectory() as tmpdir:
         result = get_git_commits(tmpdir, "anyone", "1 day ago")
@@ -49,3 +166,83 @@ def test_get_git_commits_invalid_repo():
 def test_get_git_user_returns_string_or_none():
     result = get_git_user()
     assert result is None or isinstance(result, str)
+
+
+def test_get_repo_snapshot():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        make_repo(tmpdir, ["first", "fix a | b"])
+        (Path(tmpdir) / "file.txt").write_text("dirty")
+        (Path(tmpdir) / "new.txt").write_text("new")
+
+        snapshot = get_repo_snapshot(tmpdir, "tester", 0)
+
+        assert snapshot.branch == "main"
+        assert [c.message for c in snapshot.commits] == ["fix a | b", "first"]
+        assert snapshot.status == ["M file.txt", "?? new.txt"]
+        assert len(snapshot.commit_dates) == 1
+
+
+def test_get_repo_snapshot_not_a_repo():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        snapshot = get_repo_snapshot(tmpdir, "tester", 0)
+        assert snapshot.branch == ""
+        assert snapshot.commits == []
+        assert snapshot.status == []
+
+
+def test_parse_status_v2():
+    output = "\n".join(
+        [
+            "# branch.oid abc",
+            "# branch.head (detached)",
+            "1 .M N... 100644 100644 100644 aaa aaa src/app.py",
+            "1 A. N... 000000 100644 100644 000 bbb new file.py",
+            "2 R. N... 100644 100644 100644 ccc ccc R100 new.py\told.py",
+            "? notes.txt",
+        ]
+    )
+
+    branch, files = parse_status_v2(output)
+
+    assert branch == "HEAD"
+    assert files == [
+        "M src/app.py",
+        "A new file.py",
+        "R old.py -> new.py",
+        "?? notes.txt",
+    ]
+
+
+def test_get_git_diff_bounded():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        make_repo(tmpdir, ["first"])
+        (Path(tmpdir) / "file.txt").write_text("changed\n")
+        (Path(tmpdir) / "uv.lock").write_text("lock\n" * 1000)
+        (Path(tmpdir) / "big.txt").write_text("line of text\n" * 100_000)
+        subprocess.run(["git", "add", "."], cwd=tmpdir, check=True)
+
+        full = get_git_diff(tmpdir)
+        bounded = get_git_diff(tmpdir, max_bytes=4096, exclude=["**/uv.lock"])
+
+        assert "uv.lock" in full
+        assert "uv.lock" not in bounded
+        # smallest change is picked first, big.txt doesn't fit next to it
+        assert "+changed" in bounded
+        assert "big.txt" not in bounded
+
+        # on its own the big file is streamed and cut at the byte budget
+        (Path(tmpdir) / "file.txt").write_text("0")
+        bounded = get_git_diff(tmpdir, max_bytes=4096, exclude=["**/uv.lock"])
+        assert len(bounded.encode()) <= 4096
+        assert bounded.endswith("line of text")
+
+
+def test_get_git_diff_bounded_from_subdirectory():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        make_repo(tmpdir, ["first"])
+        (Path(tmpdir) / "sub").mkdir()
+        (Path(tmpdir) / "file.txt").write_text("changed\n")
+
+        diff = get_git_diff(str(Path(tmpdir) / "sub"), max_bytes=4096)
+
+        assert "+changed" in diff
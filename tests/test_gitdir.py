@@ -0,0 +1,137 @@
+import os
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+from src import gitdir
+
+from .test_git import make_repo
+
+
+def test_resolve_ref_packed():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        make_repo(tmpdir, ["first"])
+        git_dir = str(Path(tmpdir) / ".git")
+        loose = gitdir.resolve_ref(git_dir, "refs/heads/main")
+
+        subprocess.run(["git", "pack-refs", "--all"], cwd=tmpdir, check=True)
+
+        assert not (Path(git_dir) / "refs" / "heads" / "main").exists()
+        assert gitdir.resolve_ref(git_dir, "refs/heads/main") == loose
+
+
+def test_has_commits_since():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        make_repo(tmpdir, ["first", "second"])
+
+        assert gitdir.has_commits_since(tmpdir, "tester", time.time() - 60) is True
+        assert gitdir.has_commits_since(tmpdir, "tester", time.time() + 60) is False
+        # someone else's commit proves nothing about this author
+        assert gitdir.has_commits_since(tmpdir, "nobody", time.time() - 60) is None
+
+
+def test_has_commits_since_unborn_branch():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        subprocess.run(["git", "init", "-q", tmpdir], check=True)
+        assert gitdir.has_commits_since(tmpdir, "tester", 0) is False
+
+
+def test_has_commits_since_unresolved_ref_with_history():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        make_repo(tmpdir, ["first"])
+        (Path(tmpdir) / ".git" / "refs" / "heads" / "main").unlink()
+        # commits were made, the branch just isn't where we look
+        assert gitdir.has_commits_since(tmpdir, "tester", 0) is None
+
+
+def test_reftable_repos_fall_back_to_git():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        make_repo(tmpdir, ["first"])
+        git_dir = Path(tmpdir) / ".git"
+        with open(git_dir / "config", "a") as f:
+            f.write("[extensions]\n\trefStorage = reftable\n")
+
+        assert gitdir.has_commits_since(tmpdir, "tester", time.time() + 60) is None
+
+
+def test_merge_finished_by_hand_is_not_a_local_commit():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        make_repo(tmpdir, ["first"])
+        env = {
+            **os.environ,
+            "GIT_AUTHOR_NAME": "tester",
+            "GIT_AUTHOR_EMAIL": "t@example.com",
+            "GIT_COMMITTER_NAME": "tester",
+            "GIT_COMMITTER_EMAIL": "t@example.com",
+        }
+
+        def git(*args, check=True):
+            subprocess.run(
+                ["git", *args], cwd=tmpdir, env=env, check=check, capture_output=True
+            )
+
+        git("checkout", "-q", "-b", "other")
+        (Path(tmpdir) / "file.txt").write_text("other")
+        git("commit", "-q", "-am", "other side")
+        git("checkout", "-q", "main")
+        # reflog times are whole seconds, keep the checkout out of the window
+        time.sleep(1)
+        since = int(time.time())
+        (Path(tmpdir) / "file.txt").write_text("main")
+        git("commit", "-q", "-am", "main side")
+        assert gitdir.only_local_commits_since(tmpdir, since)
+
+        # conflicts, resolved and committed by hand: "commit (merge)"
+        git("merge", "-q", "other", check=False)
+        (Path(tmpdir) / "file.txt").write_text("both")
+        git("commit", "-q", "-am", "merge other")
+
+        assert not gitdir.only_local_commits_since(tmpdir, since)
+
+
+def test_own_hooks_path():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        make_repo(tmpdir, ["first"])
+        assert not gitdir.own_hooks_path(tmpdir)
+
+        subprocess.run(
+            ["git", "config", "core.hooksPath", ".husky"], cwd=tmpdir, check=True
+        )
+        assert gitdir.own_hooks_path(tmpdir)
+
+
+def test_has_commits_since_falls_back_for_gitdir_files():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        (Path(tmpdir) / ".git").write_text("gitdir: /elsewhere\n")
+        assert gitdir.has_commits_since(tmpdir, "tester", 0) is None
+
+
+def test_reflog_since_reads_newest_first():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        log = Path(tmpdir) / "HEAD"
+        zero = "0" * 40
+        log.write_bytes(
+            f"{zero} {'a' * 40} Ann <a@x> 100 +0000\tcommit (initial): one\n"
+            f"{'a' * 40} {'b' * 40} Ann <a@x> 200 +0000\tcommit: two\n"
+            f"{'b' * 40} {'c' * 40} Bob <b@x> 300 +0000\tcheckout: moving\n".encode()
+        )
+
+        entries = list(gitdir.reflog_since(str(log), 150))
+
+        assert entries == [
+            ("Bob <b@x>", b"checkout: moving"),
+            ("Ann <a@x>", b"commit: two"),
+        ]
+
+
+def test_only_local_commits_since():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        make_repo(tmpdir, ["first", "second"])
+        since = time.time() - 60
+        assert gitdir.only_local_commits_since(tmpdir, since)
+
+        # a checkout can put commits on HEAD that no hook saw
+        subprocess.run(["git", "checkout", "-q", "-b", "other"], cwd=tmpdir, check=True)
+        assert not gitdir.only_local_commits_since(tmpdir, since)
+        assert gitdir.only_local_commits_since(tmpdir, time.time() + 60)
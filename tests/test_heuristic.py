@@ -0,0 +1,74 @@
+from datetime import datetime
+
+from src import heuristic
+from src.models import Commit, RepoSummary, StandupResult, TimeStats, WipSummary
+
+
+def make_result(repos, wip=None, time_stats=None, streak=0):
+    return StandupResult(
+        repos=[
+            RepoSummary(
+                name=name,
+                path=f"/{name}",
+                commits=[
+                    Commit(hash=str(i), message=m, date="", time="", repo_name=name)
+                    for i, m in enumerate(messages)
+                ],
+            )
+            for name, messages in repos.items()
+        ],
+        llm_response={"summary": "", "roast": ""},
+        generated_at=datetime.now(),
+        cost_usd=0.0,
+        wip=wip or [],
+        time_stats=time_stats,
+        streak=streak,
+    )
+
+
+def test_parse_conventional_commits():
+    assert heuristic.parse("feat(api): add routes") == ("feat", "api", "add routes")
+    assert heuristic.parse("Fix!: breaking") == ("fix", None, "breaking")
+    assert heuristic.parse("bugfix: typo") == ("fix", None, "typo")
+    assert heuristic.parse("note: not a type") == (None, None, "note: not a type")
+    assert heuristic.parse("just words") == (None, None, "just words")
+
+
+def test_summary_counts_kinds_and_scopes():
+    result = make_result(
+        {
+            "api": ["feat(auth): add login", "fix(auth): token expiry", "tidy up"],
+            "web": ["feat(ui): dark mode"],
+        }
+    )
+
+    response = heuristic.summarize(result)
+
+    assert response.summary == (
+        "2 features, 1 fix and 1 other commit across 2 repos. "
+        "Mostly around auth and ui. Latest: add login."
+    )
+
+
+def test_roast_picks_the_first_rule_that_fires():
+    fixes = {"api": ["fix: a", "fix: b", "fix: c", "feat: d"]}
+    assert "bugs are winning" in heuristic.summarize(make_result(fixes)).roast
+
+    late = make_result(fixes, time_stats=TimeStats(late_night_commits=2))
+    assert heuristic.summarize(late).roast.startswith("2 commits after 10pm")
+
+    calm = make_result({"api": ["feat: one"]})
+    assert heuristic.summarize(calm).roast == heuristic.summarize(calm).roast
+
+
+def test_wip_summary_groups_by_directory():
+    wip = WipSummary(
+        repo_name="api",
+        files_changed=["M src/a.py", "M src/b.py", "?? README.md"],
+        diff_preview="",
+    )
+
+    response = heuristic.summarize(make_result({}, wip=[wip]))
+
+    assert response.wip_summary == "3 uncommitted files, mostly in api/src and api."
+    assert heuristic.summarize(make_result({})).wip_summary == ""
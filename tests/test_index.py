@@ -0,0 +1,74 @@
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+from src import index
+
+
+def test_load_repos_uses_index_until_tree_changes():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        root = Path(tmpdir) / "code"
+        (root / "repo1" / ".git").mkdir(parents=True)
+        with patch.object(index, "INDEX_FILE", Path(tmpdir) / "index.json"):
+            assert index.load_repos(str(root)) == [str(root / "repo1")]
+
+            with patch.object(index, "find_git_repos") as find:
+                assert index.load_repos(str(root)) == [str(root / "repo1")]
+                find.assert_not_called()
+
+            # a new clone changes the root mtime and triggers a rescan
+            (root / "repo2" / ".git").mkdir(parents=True)
+            os.utime(root, (time.time() + 5, time.time() + 5))
+            assert len(index.load_repos(str(root))) == 2
+
+
+def test_load_repos_rebuild_and_option_change():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        root = Path(tmpdir) / "code"
+        (root / "a" / "b" / ".git").mkdir(parents=True)
+        with patch.object(index, "INDEX_FILE", Path(tmpdir) / "index.json"):
+            assert len(index.load_repos(str(root))) == 1
+            assert index.load_repos(str(root), max_depth=1) == []
+            assert len(index.load_repos(str(root), rebuild=True)) == 1
+
+
+def test_active_since():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        git_dir = Path(tmpdir) / ".git"
+        git_dir.mkdir()
+        (git_dir / "HEAD").write_text("ref: refs/heads/main\n")
+        old = time.time() - 10 * 86400
+        os.utime(git_dir / "HEAD", (old, old))
+
+        assert index.active_since(tmpdir, old - 1)
+        assert not index.active_since(tmpdir, time.time() - 86400)
+
+
+def test_fingerprint_follows_gitdir_file():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        real = Path(tmpdir) / "real.git"
+        real.mkdir()
+        (real / "HEAD").write_text("ref: refs/heads/main\n")
+        work = Path(tmpdir) / "work"
+        work.mkdir()
+        (work / ".git").write_text(f"gitdir: {real}\n")
+
+        assert index.fingerprint(str(work)) > 0
+        assert index.fingerprint(tmpdir) == 0.0
+
+
+def test_old_index_with_fingerprints_is_rebuilt():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        root = Path(tmpdir) / "code"
+        (root / "repo1" / ".git").mkdir(parents=True)
+        index_file = Path(tmpdir) / "index.json"
+        old = {"version": 1, "roots": {str(root): {"repos": {"gone": 1.0}}}}
+        index_file.write_text(json.dumps(old))
+        with patch.object(index, "INDEX_FILE", index_file):
+            assert index.load_repos(str(root)) == [str(root / "repo1")]
+
+        entry = json.loads(index_file.read_text())["roots"][str(root)]
+        assert entry["repos"] == ["repo1"]
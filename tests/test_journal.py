@@ -0,0 +1,210 @@
+import os
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from src import journal, storage
+from src.cli import start_repo
+from src.git import CommitRecord, RepoSnapshot
+
+from .test_git import make_repo
+
+
+def git(repo, *args, home):
+    env = {
+        **os.environ,
+        "HOME": home,
+        "GIT_AUTHOR_NAME": "tester",
+        "GIT_AUTHOR_EMAIL": "t@example.com",
+        "GIT_COMMITTER_NAME": "tester",
+        "GIT_COMMITTER_EMAIL": "t@example.com",
+    }
+    subprocess.run(["git", *args], cwd=repo, check=True, env=env)
+
+
+def test_hooks_journal_commits_and_rewrites():
+    with tempfile.TemporaryDirectory() as home:
+        wtf_dir = Path(home) / ".wtf"
+        repo = os.path.join(home, "repo")
+        make_repo(repo, ["before hooks"])
+        with (
+            patch.object(storage, "WTF_DIR", wtf_dir),
+            patch.object(storage, "HISTORY_DIR", wtf_dir / "history"),
+        ):
+            storage.init_storage()
+            top = journal.install(repo, time.time())
+            assert top == os.path.realpath(repo)
+
+            (Path(repo) / "a.txt").write_text("a")
+            git(repo, "add", ".", home=home)
+            git(repo, "commit", "-q", "-m", "first try", home=home)
+            git(repo, "commit", "-q", "--amend", "-m", "fixed it", home=home)
+
+            book = journal.load(0)
+            commits, dates = book.lookup(repo, "tester", 0, None)
+            assert [c.message for c in commits] == ["fixed it"]
+            assert dates == {commits[0].date}
+            assert book.lookup(repo, "someone else", 0, None) == ([], set())
+
+            # hooks were installed just now, so only a window starting after
+            # that can be answered from the journal alone
+            assert not book.covers(repo, time.time() - 3600)
+            assert book.covers(repo, time.time() + 1)
+
+            journal.uninstall(repo)
+            assert journal.load(0) is None
+            assert not (Path(repo) / ".git" / "hooks" / "post-commit").exists()
+
+
+def test_install_keeps_existing_hook():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        hook = Path(tmpdir) / "post-commit"
+        hook.write_text("#!/bin/bash\necho existing\n")
+
+        journal.write_hook(hook)
+        text = hook.read_text()
+        assert text.startswith("#!/bin/bash\n" + journal.BEGIN_MARKER)
+        assert text.endswith("echo existing\n")
+        assert os.access(hook, os.X_OK)
+
+        # installing twice is a no-op
+        journal.write_hook(hook)
+        assert hook.read_text() == text
+
+        journal.remove_hook(hook)
+        assert hook.read_text() == "#!/bin/bash\necho existing\n"
+
+
+def test_load_stops_at_since(mocker):
+    mocker.patch("src.journal.gitdir.only_local_commits_since", return_value=True)
+    mocker.patch("src.journal.gitdir.own_hooks_path", return_value=False)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        with (
+            patch.object(storage, "WTF_DIR", Path(tmpdir)),
+            patch.object(storage, "HISTORY_DIR", Path(tmpdir) / "history"),
+        ):
+            storage.init_storage()
+            hooks = Path(tmpdir) / "hooks"
+            journal.write_hook(hooks / "post-commit")
+            journal.save_hooks(
+                {"global": {"installed_at": 0, "hook": str(hooks)}, "repos": {}}
+            )
+
+            def line(kind, at, *fields):
+                return "\x1f".join([kind, str(at), *fields]) + "\n"
+
+            def commit(at, full, subject):
+                iso = "2026-01-01T10:00:00+00:00"
+                who = ("tester", "t@example.com")
+                return line(
+                    "c", at, "/r", "main", full, full[:7], subject, *who, iso, str(at)
+                )
+
+            journal.journal_path().write_text(
+                commit(100, "a" * 40, "old")
+                + commit(200, "b" * 40, "amended away")
+                + line("r", 300, "/r", "b" * 40)
+                + commit(300, "c" * 40, "new")
+            )
+
+            book = journal.load(150)
+            assert book.covers("/r", 150)
+            commits, _ = book.lookup("/r", "tester", 150, None)
+            assert [c.message for c in commits] == ["new"]
+            assert [r[1] for r in book.commits["/r"]] == ["c" * 40]
+
+
+def test_start_repo_skips_git_log_for_journaled_repos(mocker):
+    mocker.patch("src.journal.gitdir.only_local_commits_since", return_value=True)
+    mocker.patch("src.journal.gitdir.own_hooks_path", return_value=False)
+    snapshot = RepoSnapshot(branch="main", status=[])
+    get_snapshot = mocker.patch("src.cli.get_repo_snapshot", return_value=snapshot)
+    record = CommitRecord("abc", "from journal", "2026-01-01", "2026-01-01T10:00")
+    book = journal.Journal(
+        global_since=0,
+        commits={os.path.realpath("/fake/repo"): [("me <m@x>", "abc", record, 500)]},
+    )
+
+    summary, _, dates, _ = start_repo("/fake/repo", "me", 100.0, None, None, book)
+
+    assert get_snapshot.call_args.kwargs["log"] is False
+    assert [c.message for c in summary.commits] == ["from journal"]
+    assert dates == {"2026-01-01"}
+
+    # not covered for the window: git log runs as before
+    book.global_since = 200
+    start_repo("/fake/repo", "me", 100.0, None, None, book)
+    assert get_snapshot.call_args.kwargs["log"] is True
+
+
+def test_global_hooks_still_run_repo_hooks(mocker):
+    with tempfile.TemporaryDirectory() as home:
+        gitconfig = os.path.join(home, ".gitconfig")
+        env = {"HOME": home, "GIT_CONFIG_GLOBAL": gitconfig}
+        mocker.patch.dict(os.environ, env)
+        repo = os.path.join(home, "repo")
+        make_repo(repo, ["before hooks"])
+        # a repo hook that rejects every commit
+        pre_commit = Path(repo) / ".git" / "hooks" / "pre-commit"
+        pre_commit.write_text("#!/bin/sh\necho repo pre-commit >&2\nexit 1\n")
+        pre_commit.chmod(0o755)
+
+        with (
+            patch.object(storage, "WTF_DIR", Path(home) / ".wtf"),
+            patch.object(storage, "HISTORY_DIR", Path(home) / ".wtf" / "history"),
+        ):
+            storage.init_storage()
+            hooks = journal.install_global(time.time())
+            assert (hooks / "pre-commit").read_text() == journal.CHAIN_SHIM
+
+            (Path(repo) / "a.txt").write_text("a")
+            git(repo, "add", ".", home=home)
+            # the repo's hook runs, and its exit status stops the commit
+            with pytest.raises(subprocess.CalledProcessError) as blocked:
+                git(repo, "commit", "-q", "-m", "blocked", home=home)
+            assert blocked.value.returncode == 1
+
+            pre_commit.unlink()
+            git(repo, "commit", "-q", "-m", "allowed", home=home)
+            commits, _ = journal.load(0).lookup(repo, "tester", 0, None)
+            assert [c.message for c in commits] == ["allowed"]
+
+            journal.uninstall_global()
+            assert not hooks.exists() or not any(hooks.iterdir())
+            assert (
+                journal.git_output(["git", "config", "--global", "core.hooksPath"])
+                is None
+            )
+
+
+def test_global_hooks_do_not_cover_repos_with_their_own_hooks_path(mocker):
+    with tempfile.TemporaryDirectory() as home:
+        env = {"HOME": home, "GIT_CONFIG_GLOBAL": os.path.join(home, ".gitconfig")}
+        mocker.patch.dict(os.environ, env)
+        plain = os.path.join(home, "plain")
+        husky = os.path.join(home, "husky")
+        make_repo(plain, ["before hooks"])
+        make_repo(husky, ["before hooks"])
+        git(husky, "config", "core.hooksPath", ".husky", home=home)
+
+        wtf_dir = Path(home) / ".wtf"
+        with (
+            patch.object(storage, "WTF_DIR", wtf_dir),
+            patch.object(storage, "HISTORY_DIR", wtf_dir / "history"),
+        ):
+            storage.init_storage()
+            journal.install_global(time.time() - 60)
+            for repo in (plain, husky):
+                (Path(repo) / "a.txt").write_text("a")
+                git(repo, "add", ".", home=home)
+                git(repo, "commit", "-q", "-m", "after hooks", home=home)
+
+            book = journal.load(0)
+            assert book.covers(plain, time.time() - 30)
+            # git never ran the wtf hooks here, git log has to
+            assert not book.covers(husky, time.time() - 30)
+            assert book.lookup(husky, "tester", 0, None) == ([], set())
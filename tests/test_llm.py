@@ -1,9 +1,19 @@
 import json
+import tempfile
+import time
+from pathlib import Path
 from unittest.mock import MagicMock, patch
 
 import pytest
 
-from src.llm import analyze_commits, calc_cost
+from src import cache, llm, transport
+from src.llm import (
+    FieldStream,
+    analyze_commits,
+    cache_key,
+    calc_cost,
+    stream_commits,
+)
 
 
 def test_calc_cost():
@@ -43,7 +53,7 @@ def test_analyze_commits_success(mocker):
     }
     mock_response.raise_for_status = MagicMock()
 
-    mocker.patch("src.llm.requests.post", return_value=mock_response)
+    mocker.patch("src.llm.transport.post", return_value=mock_response)
     mocker.patch("src.llm.get_api_key", return_value="test-key")
     mocker.patch("src.llm.get_model", return_value="test-model")
 
@@ -52,3 +62,147 @@ def test_analyze_commits_success(mocker):
     assert response.summary == "test summary"
     assert response.roast == "test roast"
     assert cost > 0
+
+
+def test_cache_key_depends_on_model_and_content(mocker):
+    mocker.patch("src.llm.get_model", return_value="model-a")
+    key = cache_key("commits", "diff")
+
+    assert cache_key("commits", "diff") == key
+    assert cache_key("commits", None) != key
+
+    mocker.patch("src.llm.get_model", return_value="model-b")
+    assert cache_key("commits", "diff") != key
+
+
+def collect_fields(chunks):
+    stream = FieldStream()
+    fields = {}
+    for chunk in chunks:
+        for field, text in stream.feed(chunk):
+            fields[field] = fields.get(field, "") + text
+    return fields
+
+
+def test_field_stream_handles_any_chunking():
+    payload = json.dumps(
+        {
+            "summary": 'Fixed "quotes", tabs\tand emoji \U0001f525 \u00e9',
+            "roast": "ok",
+            "wip_summary": None,
+        }
+    )
+    expected = {
+        "summary": 'Fixed "quotes", tabs\tand emoji \U0001f525 \u00e9',
+        "roast": "ok",
+    }
+
+    assert collect_fields([payload]) == expected
+    # one character at a time splits every escape sequence
+    assert collect_fields(list(payload)) == expected
+
+
+def test_stream_commits(mocker):
+    content = json.dumps(
+        {"summary": "streamed summary", "roast": "r", "wip_summary": ""}
+    )
+    lines = [b": OPENROUTER PROCESSING", b""]
+    for i in range(0, len(content), 7):
+        delta = {"choices": [{"delta": {"content": content[i : i + 7]}}]}
+        lines.append(b"data: " + json.dumps(delta).encode())
+    lines.append(b'data: {"choices": [], "usage": {"prompt_tokens": 10}}')
+    lines.append(b"data: [DONE]")
+
+    mock_response = MagicMock()
+    mock_response.iter_lines.return_value = lines
+    post = mocker.patch("src.llm.transport.post", return_value=mock_response)
+    mocker.patch("src.llm.get_api_key", return_value="test-key")
+    mocker.patch("src.llm.get_model", return_value="test-model")
+
+    updates = []
+    response, cost = stream_commits(
+        "commits", on_update=lambda f, t: updates.append((f, t))
+    )
+
+    assert post.call_args.kwargs["json"]["stream"] is True
+    assert response.summary == "streamed summary"
+    assert "".join(t for f, t in updates if f == "summary") == "streamed summary"
+    assert cost == pytest.approx(10 * 0.0000001)
+
+
+def fake_complete(calls):
+    # answers notes for batches and the standup for the final prompt
+    def complete(payload, deadline=None, throttle=None):
+        system, user = (m["content"] for m in payload["messages"])
+        calls.append(user)
+        if system == llm.MAP_PROMPT:
+            return {"notes": f"notes {len(calls)}", "patterns": ""}, 0.01
+        return {"summary": "big week", "roast": "r", "wip_summary": ""}, 0.02
+
+    return complete
+
+
+def test_summarize_fits_in_one_call(mocker):
+    mocker.patch("src.llm.get_model", return_value="test-model")
+    calls = []
+    mocker.patch("src.llm.complete", side_effect=fake_complete(calls))
+
+    response, cost = llm.summarize("\nrepo (1 commits):\n  - one", budget=1000)
+
+    assert response.summary == "big week"
+    assert len(calls) == 1 and "- one" in calls[0]
+
+
+def test_summarize_maps_batches_then_reduces(mocker):
+    mocker.patch("src.llm.get_model", return_value="test-model")
+    mocker.patch("src.llm.storage.load_config", return_value={})
+    lines = [f"  - commit number {i}" for i in range(200)]
+    commits_text = "\nrepo (200 commits):\n" + "\n".join(lines)
+    calls = []
+    mocker.patch("src.llm.complete", side_effect=fake_complete(calls))
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        with patch.object(cache, "CACHE_DIR", Path(tmpdir)):
+            response, cost = llm.summarize(commits_text, budget=500)
+            batches = len(calls) - 1
+            assert batches > 1
+            assert response.summary == "big week"
+            assert cost == pytest.approx(batches * 0.01 + 0.02)
+            # the final prompt only sees the notes
+            assert "commit number" not in calls[-1]
+            assert f"notes on them in {batches} batches" in calls[-1]
+
+            # notes are cached per batch, only the final call runs again
+            calls.clear()
+            llm.summarize(commits_text, budget=500)
+            assert len(calls) == 1
+
+
+def test_map_reduce_keeps_to_the_deadline(mocker):
+    mocker.patch("src.llm.get_model", return_value="test-model")
+    mocker.patch("src.llm.storage.load_config", return_value={"map_concurrency": 1})
+    deadlines = []
+
+    def slow_complete(payload, deadline=None, throttle=None):
+        deadlines.append(deadline)
+        time.sleep(0.3)
+        return {"notes": "n", "patterns": ""}, 0.01
+
+    mocker.patch("src.llm.complete", side_effect=slow_complete)
+
+    started = time.monotonic()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        with patch.object(cache, "CACHE_DIR", Path(tmpdir)):
+            with pytest.raises(transport.DeadlineExceeded) as error:
+                llm.map_reduce(
+                    [f"batch {i}" for i in range(5)], deadline=1.0, no_cache=True
+                )
+
+    # each call only gets what is left of the map round, and the batches
+    # queued behind it never start once that is gone
+    assert len(deadlines) == 3
+    assert deadlines[0] <= 1.0 * llm.MAP_DEADLINE_SHARE
+    assert deadlines == sorted(deadlines, reverse=True)
+    assert time.monotonic() - started < 1.0
+    # the calls that finished are still paid for
+    assert llm.spent(error.value) == pytest.approx(0.03)
@@ -0,0 +1,81 @@
+import json
+import tempfile
+from pathlib import Path
+
+from src import profiling
+from src.git import get_git_diff, get_repo_snapshot
+
+from .test_git import make_repo
+
+
+def test_recording_is_a_noop_without_a_profile():
+    assert profiling.current is None
+    profiling.record("git status", "/repo", profiling.now(), subprocesses=1)
+    with profiling.phase("discover"):
+        pass
+    profiling.add_tokens({"prompt_tokens": 10})
+    assert profiling.stop() is None
+
+
+def test_summarize_totals_phases_and_ranks_repos():
+    profile = profiling.start()
+    try:
+        started = profiling.now()
+        profiling.record_git("git status", "/a", started, b"12345")
+        profiling.record_git("git log", "/a", started, b"123")
+        profiling.record_git("git status", "/b", started, b"")
+        profiling.add_tokens({"prompt_tokens": 100, "completion_tokens": 20})
+        profiling.add_tokens({"prompt_tokens": 1})
+    finally:
+        profiling.stop()
+
+    # give /b the slowest git call so the ranking is deterministic
+    profile.spans[2].seconds = 10.0
+    summary = profiling.summarize(profile)
+    assert summary["phases"]["git status"]["calls"] == 2
+    assert summary["phases"]["git status"]["bytes"] == 5
+    assert summary["subprocesses"] == 3
+    assert summary["bytes_read"] == 8
+    assert summary["tokens"] == {"prompt_tokens": 101, "completion_tokens": 20}
+    assert [r["repo"] for r in summary["slowest_repos"]] == ["/b", "/a"]
+    assert summary["slowest_repos"][1]["calls"] == 2
+
+
+def test_git_calls_are_counted():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        make_repo(tmpdir, ["first"])
+        (Path(tmpdir) / "file.txt").write_text("changed\n")
+
+        profile = profiling.start()
+        try:
+            get_repo_snapshot(tmpdir, "tester", 0)
+            get_git_diff(tmpdir, max_bytes=1024, exclude=[])
+        finally:
+            profiling.stop()
+
+        names = [s.name for s in profile.spans if s.subprocesses]
+        assert sorted(names) == ["git diff", "git log", "git numstat", "git status"]
+        assert all(s.repo == tmpdir for s in profile.spans)
+        diff = next(s for s in profile.spans if s.name == "git diff")
+        assert diff.bytes_read > 0
+
+
+def test_write_trace():
+    profile = profiling.start()
+    try:
+        with profiling.phase("prompt"):
+            pass
+        profiling.record_git("git log", "/a", profiling.now(), b"abc")
+    finally:
+        profiling.stop()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = Path(tmpdir) / "trace.json"
+        profiling.write_trace(profile, str(path))
+        trace = json.loads(path.read_text())
+
+    events = trace["traceEvents"]
+    assert [e["name"] for e in events] == ["prompt", "git log"]
+    assert all(e["ph"] == "X" for e in events)
+    assert events[1]["args"] == {"subprocesses": 1, "bytes_read": 3, "repo": "/a"}
+    assert trace["otherData"]["bytes_read"] == 3
@@ -0,0 +1,131 @@
+from src import prompt
+from src.models import Commit, RepoSummary, WipSummary
+
+
+def make_diff(files):
+    # files: {path: [hunk bodies]}
+    out = []
+    for path, hunks in files.items():
+        out.append(f"diff --git a/{path} b/{path}\nindex 111..222 100644")
+        out.append(f"--- a/{path}\n+++ b/{path}")
+        for body in hunks:
+            out.append(f"@@ -1,1 +1,1 @@\n{body}")
+    return "\n".join(out)
+
+
+def make_summary(name, count):
+    commits = [
+        Commit(
+            hash=str(i),
+            message=f"commit number {i} in {name}",
+            date="2025-01-01",
+            time="",
+            repo_name=name,
+        )
+        for i in range(count)
+    ]
+    return RepoSummary(name=name, path=f"/{name}", commits=commits)
+
+
+def test_is_noise():
+    assert prompt.is_noise("uv.lock")
+    assert prompt.is_noise("web/package-lock.json")
+    assert prompt.is_noise("static/app.min.js")
+    assert prompt.is_noise("assets/logo.png")
+    assert prompt.is_noise("web/node_modules/x/index.js")
+    assert not prompt.is_noise("src/app.py")
+    assert not prompt.is_noise("docs/build.md")
+
+
+def test_fair_shares():
+    assert prompt.fair_shares([10, 100, 100], 110) == [10, 50, 50]
+    assert prompt.fair_shares([10, 20], 100) == [10, 20]
+    assert prompt.fair_shares([], 100) == []
+
+
+def test_score_prefers_definitions_over_imports():
+    definition = "@@ -1 +1 @@\n+def handle_request(req):\n+    return route(req)"
+    imports = "@@ -1 +1 @@\n+import os\n+import sys"
+    assert prompt.score_hunk(definition) > prompt.score_hunk(imports)
+
+
+def test_format_wip_drops_noise_and_ranks_hunks():
+    diff = make_diff(
+        {
+            "uv.lock": ["+" + "x" * 4000],
+            "src/app.py": [
+                "+import os",
+                "+def new_feature():\n+    return compute()",
+            ],
+        }
+    )
+    wip = WipSummary(
+        repo_name="repo", files_changed=["M uv.lock", "M src/app.py"], diff_preview=diff
+    )
+
+    text = prompt.format_wip([wip], budget=30)
+
+    assert "M uv.lock" in text
+    assert "xxxx" not in text
+    assert "def new_feature" in text
+    assert "import os" not in text
+    # what was sent is what gets saved
+    assert wip.diff_preview in text
+
+
+def test_format_commits_respects_budget():
+    summaries = [make_summary("small", 2), make_summary("busy", 500)]
+
+    unlimited = prompt.format_commits(summaries)
+    limited = prompt.format_commits(summaries, budget=300)
+
+    assert "busy (500 commits)" in limited
+    assert "commit number 1 in small" in limited
+    assert "more" in limited
+    assert prompt.estimate_tokens(limited) < 400 < prompt.estimate_tokens(unlimited)
+
+
+def test_plan_stays_within_budget():
+    summaries = [make_summary(f"repo{i}", 200) for i in range(5)]
+    hunk = "+def f():\n" + "+    value = compute()\n" * 50
+    wips = [
+        WipSummary(
+            repo_name=f"repo{i}",
+            files_changed=["M app.py"],
+            diff_preview=make_diff({"app.py": [hunk] * 20}),
+        )
+        for i in range(5)
+    ]
+
+    commits_text, diff_text = prompt.plan(summaries, wips, budget=2000)
+
+    total = prompt.estimate_tokens(commits_text) + prompt.estimate_tokens(diff_text)
+    assert total <= 2200
+    assert all(f"repo{i}" in diff_text for i in range(5))
+
+
+def test_batch_keeps_repos_whole_and_splits_big_ones():
+    summaries = [make_summary("small", 3), make_summary("busy", 300)]
+    commits_text = prompt.format_commits(summaries)
+
+    batches = prompt.batch(commits_text, 500)
+
+    assert len(batches) > 1
+    assert all(prompt.estimate_tokens(b) <= 520 for b in batches)
+    assert (
+        "small (3 commits)" in batches[0] and "commit number 2 in small" in batches[0]
+    )
+    # every piece of the busy repo says where it's from
+    assert all("busy (300 commits)" in b for b in batches[1:])
+    lines = [line for b in batches for line in b.split("\n") if line.startswith("  ")]
+    assert lines == [line for line in commits_text.split("\n") if line.startswith("  ")]
+
+
+def test_plan_fits_one_batch_unless_given_more():
+    summaries = [make_summary(f"repo{i}", 200) for i in range(5)]
+
+    commits_text, _ = prompt.plan(summaries, [], budget=1000)
+    assert prompt.batch(commits_text, 1000) == [commits_text]
+
+    commits_text, _ = prompt.plan(summaries, [], budget=1000, batches=4)
+    assert 1 < len(prompt.batch(commits_text, 1000)) <= 4
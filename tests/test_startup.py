@@ -0,0 +1,84 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).parent.parent
+
+# modules the cheap commands must never pay for
+HEAVY_MODULES = {"rich", "requests", "urllib3", "pydantic", "pyperclip", "InquirerPy"}
+
+# cumulative import time of the cli module, generous so slow machines pass
+# but well under the ~350ms it took when everything was imported eagerly
+IMPORT_BUDGET_US = 200_000
+
+
+def import_times(*args: str, env: dict | None = None) -> dict[str, int]:
+    # run the cli under -X importtime and return cumulative us per module
+    with tempfile.TemporaryDirectory() as home:
+        wtf_dir = Path(home) / ".wtf"
+        wtf_dir.mkdir()
+        (wtf_dir / "config.json").write_text(json.dumps({"api_key": "x", "model": "m"}))
+        code = (
+            "import sys; from src.cli import app; "
+            f"sys.argv = ['wtf', {', '.join(repr(a) for a in args)}]; app()"
+        )
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            cwd=ROOT,
+            env={**os.environ, "HOME": home, "USERPROFILE": home, **(env or {})},
+            capture_output=True,
+            text=True,
+        )
+    assert proc.returncode == 0, proc.stderr
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+@pytest.mark.parametrize(
+    "args", [("--spending",), ("--spending", "--by", "model"), ("--history",)]
+)
+def test_cheap_commands_skip_heavy_imports(args):
+    times = import_times(*args)
+    heavy = {m for m in times if m.split(".")[0] in HEAVY_MODULES}
+    assert not heavy
+
+
+def test_cli_import_stays_within_budget():
+    times = import_times("--spending")
+    assert times["src.cli"] < IMPORT_BUDGET_US
+
+
+@pytest.mark.parametrize("flag", ["--json", "--ndjson"])
+def test_machine_output_never_imports_rich(flag):
+    from src import devserver
+
+    from .test_git import make_repo
+
+    server = devserver.start()
+    try:
+        with tempfile.TemporaryDirectory() as repo:
+            make_repo(repo, ["feat: one"])
+            times = import_times(
+                flag,
+                "--here",
+                "--dir",
+                repo,
+                "--author",
+                "tester",
+                "--no-daemon",
+                env={"WTF_API_URL": server.url},
+            )
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert not {m for m in times if m.split(".")[0] == "rich"}
@@ -1,4 +1,7 @@
+import json
+import sqlite3
 import tempfile
+import threading
 from datetime import datetime
 from pathlib import Path
 from unittest.mock import patch
@@ -9,11 +12,11 @@ from src import storage
 from src.models import Commit, LLMResponse, RepoSummary, StandupResult
 
 
-def make_standup_result():
+def make_standup_result(repo="test-repo", generated_at=None, author=""):
     return StandupResult(
         repos=[
             RepoSummary(
-                name="test-repo",
+                name=repo,
                 path="/path/to/repo",
                 commits=[
                     Commit(
@@ -21,17 +24,18 @@ def make_standup_result():
                         message="test commit",
                         date="2025-01-01",
                         time="10:00",
-                        repo_name="test-repo",
+                        repo_name=repo,
                     )
                 ],
             )
         ],
         llm_response=LLMResponse(
-            summary="test summary",
+            summary=f"test summary {repo}",
             roast="test roast",
         ),
-        generated_at=datetime.now(),
+        generated_at=generated_at or datetime.now(),
         cost_usd=0.001,
+        author=author,
     )
 
 
@@ -47,7 +51,7 @@ def test_save_and_load_standup():
 
                     history = storage.load_history()
                     assert len(history) == 1
-                    assert history[0].llm_response.summary == "test summary"
+                    assert history[0].llm_response.summary == "test summary test-repo"
 
 
 def test_spending_tracking():
@@ -69,3 +73,177 @@ def test_load_spending_empty():
         with patch.object(storage, "SPENDING_FILE", Path(tmpdir) / "nonexistent.json"):
             records = storage.load_spending()
             assert records == []
+
+
+def test_history_imports_json_files_once():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        history_dir = Path(tmpdir) / "history"
+        history_dir.mkdir()
+        old = make_standup_result(repo="old", generated_at=datetime(2025, 1, 1))
+        (history_dir / "2025-01-01_090000.json").write_text(old.model_dump_json())
+        (history_dir / "broken.json").write_text("{not json")
+        with patch.object(storage, "WTF_DIR", Path(tmpdir)):
+            with patch.object(storage, "HISTORY_DIR", history_dir):
+                storage.save_standup(make_standup_result(repo="new"))
+                storage.save_standup(make_standup_result(repo="newer"))
+
+                history = storage.load_history()
+                assert [h.repos[0].name for h in history] == ["newer", "new", "old"]
+
+
+def test_json_import_that_lost_the_race_does_nothing():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        history_dir = Path(tmpdir) / "history"
+        history_dir.mkdir()
+        old = make_standup_result(repo="old", generated_at=datetime(2025, 1, 1))
+        (history_dir / "2025-01-01_090000.json").write_text(old.model_dump_json())
+        with patch.object(storage, "WTF_DIR", Path(tmpdir)):
+            with patch.object(storage, "HISTORY_DIR", history_dir):
+                # one process saw no marker, another imported before it got
+                # the write lock
+                late = sqlite3.connect(storage.history_db())
+                storage.connect_history().close()
+                storage.import_json_history(late)
+                late.close()
+
+                assert [h.repos[0].name for h in storage.load_history()] == ["old"]
+
+
+def test_history_filters_and_pages():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        with patch.object(storage, "WTF_DIR", Path(tmpdir)):
+            with patch.object(storage, "HISTORY_DIR", Path(tmpdir) / "history"):
+                for day in range(1, 6):
+                    storage.save_standup(
+                        make_standup_result(
+                            repo="api" if day % 2 else "web",
+                            generated_at=datetime(2026, 3, day, 9),
+                            author="ann" if day < 4 else "bob",
+                        )
+                    )
+
+                entries = storage.load_history_entries(limit=2)
+                assert [e.generated_at.day for e in entries] == [5, 4]
+                entries = storage.load_history_entries(limit=2, offset=2)
+                assert [e.generated_at.day for e in entries] == [3, 2]
+
+                entries = storage.load_history_entries(repo="api")
+                assert [e.generated_at.day for e in entries] == [5, 3, 1]
+
+                entries = storage.load_history_entries(
+                    since=datetime(2026, 3, 2), until=datetime(2026, 3, 4), author="ann"
+                )
+                assert [e.generated_at.day for e in entries] == [3, 2]
+                assert entries[0].summary == "test summary api"
+
+
+def patch_spending(tmpdir):
+    return patch.object(storage, "SPENDING_FILE", Path(tmpdir) / "spending.json")
+
+
+def test_spending_migrates_legacy_file():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        legacy = Path(tmpdir) / "spending.json"
+        legacy.write_text(
+            '[{"timestamp": "2026-01-01T10:00:00", "model": "a", "cost": 0.5}]'
+        )
+        with patch.object(storage, "WTF_DIR", Path(tmpdir)), patch_spending(tmpdir):
+            storage.add_spending(0.25, "b")
+
+            assert not legacy.exists()
+            assert storage.get_total_spent() == pytest.approx(0.75)
+            assert len(storage.load_spending()) == 2
+
+
+def test_spending_total_uses_checkpoint():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        with patch.object(storage, "WTF_DIR", Path(tmpdir)), patch_spending(tmpdir):
+            storage.add_spending(0.001, "m")
+            assert storage.get_total_spent() == pytest.approx(0.001)
+
+            # records past the checkpoint (another process, or a partial
+            # write still in flight) are folded in lazily
+            with open(storage.spending_ledger(), "a") as f:
+                f.write('{"timestamp": "2026-01-01T00:00:00", "cost": 0.002}\n')
+                f.write('{"timestamp": "2026-01-01T00:0')
+            assert storage.get_total_spent() == pytest.approx(0.003)
+
+            with patch.object(storage, "_record_cost") as record_cost:
+                storage.get_total_spent()
+                record_cost.assert_not_called()
+
+
+def test_spending_breakdown():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        with patch.object(storage, "WTF_DIR", Path(tmpdir)), patch_spending(tmpdir):
+            with open(storage.spending_ledger(), "w") as f:
+                f.write(
+                    '{"timestamp": "2026-01-31T09:00:00", "model": "a", "cost": 1}\n'
+                    '{"timestamp": "2026-02-01T09:00:00", "model": "b", "cost": 2}\n'
+                    '{"timestamp": "2026-02-01T18:00:00", "model": "a", "cost": 4}\n'
+                )
+
+            assert storage.get_spending_breakdown("model") == {"a": 5, "b": 2}
+            assert storage.get_spending_breakdown("day") == {
+                "2026-01-31": 1,
+                "2026-02-01": 6,
+            }
+            assert storage.get_spending_breakdown("month") == {
+                "2026-01": 1,
+                "2026-02": 6,
+            }
+
+
+def test_concurrent_spending_writes_are_not_lost():
+    from concurrent.futures import ThreadPoolExecutor
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        with patch.object(storage, "WTF_DIR", Path(tmpdir)), patch_spending(tmpdir):
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                list(pool.map(lambda _: storage.add_spending(1.0, "m"), range(80)))
+
+            assert len(storage.load_spending()) == 80
+            assert storage.get_total_spent() == pytest.approx(80.0)
+
+
+def test_config_is_read_once_per_process():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        config_file = Path(tmpdir) / "config.json"
+        config_file.write_text('{"api_key": "k", "model": "m", "skip_dirs": ["x"]}')
+        with (
+            patch.object(storage, "WTF_DIR", Path(tmpdir)),
+            patch.object(storage, "CONFIG_FILE", config_file),
+            patch.object(storage, "read_config", wraps=storage.read_config) as read,
+        ):
+            assert storage.is_configured()
+            assert storage.load_config()["model"] == "m"
+            assert read.call_count == 1
+
+            # saving keeps the cached copy current without another read
+            storage.save_config("k2", "m2")
+            assert storage.load_config() == {
+                "api_key": "k2",
+                "model": "m2",
+                "skip_dirs": ["x"],
+            }
+            assert read.call_count == 1
+
+
+def test_write_atomic_concurrent_writers():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = Path(tmpdir) / "state.json"
+        texts = [json.dumps({"writer": i, "pad": "x" * 10000}) for i in range(8)]
+        threads = [
+            threading.Thread(
+                target=lambda t=t: [storage.write_atomic(path, t) for _ in range(20)]
+            )
+            for t in texts
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        # always one writer's whole text, and no temp files left behind
+        assert path.read_text() in texts
+        assert [p.name for p in Path(tmpdir).iterdir()] == ["state.json"]
@@ -0,0 +1,36 @@
+import tempfile
+from datetime import date
+from pathlib import Path
+from unittest.mock import patch
+
+from src import streak
+
+
+def test_longest_streak():
+    days = {"2026-01-01", "2026-01-02", "2026-01-03", "2026-01-05", "2026-01-06"}
+    assert streak.longest_streak(days) == 3
+    assert streak.longest_streak(set()) == 0
+
+
+def test_stats_week_days():
+    days = {"2026-10-11", "2026-10-12", "2026-10-14"}
+    # 2026-10-15 is a thursday, the week starts on the 12th
+    stats = streak.stats(days, today=date(2026, 10, 15))
+    assert stats.week_days == ["2026-10-12", "2026-10-14"]
+    assert stats.longest == 2
+
+
+def test_record_merges_days_and_moves_marks():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        with patch.object(streak, "STREAK_FILE", Path(tmpdir) / "streaks.json"):
+            book = streak.load("me")
+            assert streak.scan_from(book, "/repo") == 0.0
+
+            streak.record("me", book, {"2026-01-01"}, ["/repo"], 1_000_000.0)
+            streak.record("me", streak.load("me"), {"2026-01-02"}, [], 2_000_000.0)
+
+            book = streak.load("me")
+            assert book["days"] == {"2026-01-01", "2026-01-02"}
+            assert streak.scanned_at(book, "/repo") == 1_000_000.0
+            assert streak.scan_from(book, "/repo") == 1_000_000.0 - streak.OVERLAP
+            assert streak.load("someone else")["days"] == set()
@@ -0,0 +1,141 @@
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from src import devserver, llm, team, transport
+from src.models import LLMResponse
+
+
+def commit_as(path, name, email, message):
+    env = {
+        **os.environ,
+        "GIT_AUTHOR_NAME": name,
+        "GIT_AUTHOR_EMAIL": email,
+        "GIT_COMMITTER_NAME": name,
+        "GIT_COMMITTER_EMAIL": email,
+    }
+    (Path(path) / "file.txt").write_text(message)
+    subprocess.run(["git", "add", "."], cwd=path, check=True, env=env)
+    subprocess.run(
+        ["git", "commit", "-q", "-m", message], cwd=path, check=True, env=env
+    )
+
+
+@pytest.fixture
+def repo():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        subprocess.run(["git", "init", "-q", "-b", "main", tmpdir], check=True)
+        commit_as(tmpdir, "Ann", "ann@home.org", "ann at home")
+        commit_as(tmpdir, "Bob", "bob@corp.com", "bob fix")
+        commit_as(tmpdir, "Ann Smith", "ann@corp.com", "ann at work")
+        commit_as(tmpdir, "carl", "carl@old.org", "carl change")
+        # .mailmap is applied by git log, not by us
+        (Path(tmpdir) / ".mailmap").write_text("Carl Real <carl@old.org>\n")
+        yield tmpdir
+
+
+def test_parse_members_splits_and_dedupes():
+    members = team.parse_members(["Ann,Bob", "Ann", " "], {})
+    assert [m.name for m in members] == ["Ann", "Bob"]
+
+
+def test_parse_members_uses_config_aliases():
+    config = {"team": {"Ann": ["ann@corp.com"], "Bob": []}}
+    members = team.parse_members(["all"], config)
+
+    assert [m.name for m in members] == ["Ann", "Bob"]
+    assert members[0].matches("A. Smith <ann@corp.com>")
+    assert not members[1].matches("A. Smith <ann@corp.com>")
+
+
+def test_split_gives_each_member_their_commits(repo):
+    members = team.parse_members(["Ann,Bob,Carl Real,Zed"], {})
+    by_member = team.split(team.collect([repo], 0, 2), members)
+
+    assert [c.message for c in by_member["Ann"][0].commits] == [
+        "ann at work",
+        "ann at home",
+    ]
+    assert [c.message for c in by_member["Bob"][0].commits] == ["bob fix"]
+    assert [c.message for c in by_member["Carl Real"][0].commits] == ["carl change"]
+    assert by_member["Zed"] == []
+
+
+def test_run_reports_each_member_as_it_finishes(repo, mocker):
+    mocker.patch("src.team.llm.get_model", return_value="m")
+    mocker.patch("src.team.cache.get", return_value=None)
+    mocker.patch("src.team.cache.put")
+    mocker.patch("src.team.storage.add_spending")
+    save = mocker.patch("src.team.storage.save_standup")
+
+    def analyze(commits_text, diff_text, deadline=None, throttle=None):
+        if "bob fix" in commits_text:
+            raise RuntimeError("rate limited")
+        return LLMResponse(summary="did things", roast="meh"), 0.01
+
+    analyze_commits = mocker.patch("src.team.llm.analyze_commits", side_effect=analyze)
+    done = []
+    members = team.parse_members(["Ann,Bob,Zed"], {})
+
+    outcomes = team.run(
+        members, [repo], 0, 2, {}, on_done=lambda m, r, e: done.append(m)
+    )
+
+    assert sorted(done) == ["Ann", "Bob", "Zed"]
+    (ann, _), (bob, bob_error), (zed, _) = outcomes
+    assert ann.author == "Ann" and ann.llm_response.summary == "did things"
+    assert bob is None and str(bob_error) == "rate limited"
+    # nothing to summarize, no llm call
+    assert zed.repos == [] and zed.cost_usd == 0.0
+    assert analyze_commits.call_count == 2
+    assert save.call_count == 1
+
+
+def test_throttle_spaces_calls():
+    throttle = transport.Throttle(60 * 20)
+    started = time.monotonic()
+    threads = [threading.Thread(target=throttle.wait) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # the first goes straight away, the rest 50ms apart
+    assert time.monotonic() - started >= 0.14
+
+
+def test_throttle_without_limit_does_not_wait():
+    throttle = transport.Throttle(None)
+    started = time.monotonic()
+    for _ in range(100):
+        throttle.wait()
+    assert time.monotonic() - started < 0.05
+
+
+def test_every_llm_request_waits_for_the_throttle(mocker):
+    # a big member's map-reduce makes several requests, each one throttled
+    mocker.patch("src.llm.get_api_key", return_value="test-key")
+    mocker.patch("src.llm.get_model", return_value="test-model")
+    mocker.patch("src.llm.storage.load_config", return_value={})
+    mocker.patch("src.llm.cache.put")
+    server = devserver.start()
+    mocker.patch("src.llm.api_url", return_value=server.url)
+    throttle = mocker.Mock(spec=transport.Throttle)
+    lines = [f"  - commit number {i}" for i in range(200)]
+    try:
+        llm.summarize(
+            "\nrepo (200 commits):\n" + "\n".join(lines),
+            budget=500,
+            no_cache=True,
+            throttle=throttle,
+        )
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert len(server.requests) > 2
+    assert throttle.wait.call_count == len(server.requests)
@@ -0,0 +1,104 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from src import transport
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # replies with the next scripted (status, headers, delay) per request
+    script = []
+    hits = 0
+
+    def do_GET(self):
+        cls = type(self)
+        status, headers, delay = cls.script[min(cls.hits, len(cls.script) - 1)]
+        cls.hits += 1
+        time.sleep(delay)
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    StubHandler.hits = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield StubHandler, f"http://127.0.0.1:{server.server_port}/"
+    server.shutdown()
+    server.server_close()
+
+
+def test_retries_until_success(stub, mocker):
+    handler, url = stub
+    handler.script = [(503, {}, 0), (429, {"Retry-After": "0"}, 0), (200, {}, 0)]
+    mocker.patch.object(transport, "BACKOFF_BASE", 0.01)
+
+    response = transport.get(url)
+
+    assert response.status_code == 200
+    assert handler.hits == 3
+
+
+def test_gives_up_and_returns_last_response(stub, mocker):
+    handler, url = stub
+    handler.script = [(500, {}, 0)]
+    mocker.patch.object(transport, "BACKOFF_BASE", 0.01)
+
+    response = transport.get(url, retries=2)
+
+    assert response.status_code == 500
+    assert handler.hits == 3
+
+
+def test_does_not_retry_client_errors(stub):
+    handler, url = stub
+    handler.script = [(401, {}, 0)]
+
+    response = transport.get(url)
+
+    assert response.status_code == 401
+    assert handler.hits == 1
+
+
+def test_read_timeout_respects_deadline(stub):
+    handler, url = stub
+    handler.script = [(200, {}, 1.0)]
+
+    started = time.monotonic()
+    with pytest.raises(requests.exceptions.Timeout):
+        transport.get(url, deadline=0.3)
+    assert time.monotonic() - started < 0.9
+
+
+def test_retry_after_is_not_slept_past_deadline(stub):
+    handler, url = stub
+    handler.script = [(429, {"Retry-After": "30"}, 0)]
+
+    started = time.monotonic()
+    response = transport.get(url, deadline=1)
+
+    assert response.status_code == 429
+    assert time.monotonic() - started < 1
+
+
+def test_retry_after_parsing():
+    response = requests.Response()
+    response.headers["Retry-After"] = "2"
+    assert transport.retry_after(response) == 2.0
+
+    response.headers["Retry-After"] = "Wed, 21 Oct 2015 07:28:00 GMT"
+    assert transport.retry_after(response) == 0.0
+
+    assert transport.retry_after(None) is None
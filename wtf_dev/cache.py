@@ -0,0 +1,53 @@
+import hashlib
+import json
+import os
+import time
+
+from . import storage
+
+CACHE_DIR = storage.WTF_DIR / "cache"
+DEFAULT_TTL = 24 * 3600
+DEFAULT_MAX_ENTRIES = 200
+
+
+def make_key(*parts: str) -> str:
+    # content address for the given inputs
+    return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()
+
+
+def get(key: str, ttl: float = DEFAULT_TTL) -> dict | None:
+    # cached value for key, None if missing or older than ttl
+    path = CACHE_DIR / f"{key}.json"
+    try:
+        entry = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if time.time() - entry.get("created", 0) > ttl:
+        path.unlink(missing_ok=True)
+        return None
+    # mtime doubles as last access time for lru eviction
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return entry.get("value")
+
+
+def put(key: str, value: dict, max_entries: int = DEFAULT_MAX_ENTRIES):
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    path = CACHE_DIR / f"{key}.json"
+    storage.write_atomic(path, json.dumps({"created": time.time(), "value": value}))
+    evict(max_entries)
+
+
+def evict(max_entries: int = DEFAULT_MAX_ENTRIES):
+    # drop least recently used entries beyond the cap
+    entries = []
+    for path in CACHE_DIR.glob("*.json"):
+        try:
+            entries.append((path.stat().st_mtime, path))
+        except OSError:
+            continue
+    entries.sort(reverse=True)
+    for _, path in entries[max_entries:]:
+        path.unlink(missing_ok=True)
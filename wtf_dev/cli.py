@@ -1,26 +1,46 @@
-import json
-from datetime import datetime
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from enum import Enum
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, List, Optional
 
-import pyperclip
 import typer
 
-from . import formatter, storage
+# only cheap modules at import time so --spending and --history start fast,
+# llm (requests), models (pydantic), rich and pyperclip load when used
+from . import formatter, profiling, storage
 from .git import (
     find_git_repos,
-    get_commit_streak,
-    get_current_branch,
     get_git_commits,
     get_git_diff,
-    get_git_diff_stat,
     get_git_user,
+    get_repo_snapshot,
 )
-from .llm import analyze_commits, get_model
-from .models import Commit, RepoSummary, StandupResult, TimeStats, WipSummary
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor, Future
+
+    from .journal import Journal
+    from .models import Commit, RepoSummary, StandupResult, TimeStats, WipSummary
+
+
+class SpendingBreakdown(str, Enum):
+    model = "model"
+    day = "day"
+    month = "month"
+
 
 app = typer.Typer(add_completion=False, invoke_without_command=True)
 
+# repo collection is mostly waiting on git subprocesses, so oversubscribe cores
+DEFAULT_JOBS = min(32, (os.cpu_count() or 1) * 4)
+HISTORY_PAGE_SIZE = 10
+# raw diff read per repo for the prompt planner to pick hunks from
+MAX_DIFF_BYTES = 256 * 1024
+
 
 @app.command()
 def setup():
@@ -29,6 +49,232 @@ def setup():
     run_setup()
 
 
+@app.command(name="index")
+def index_command(
+    dir: Optional[Path] = typer.Option(None, "--dir", "-d"),
+    rebuild: bool = typer.Option(False, "--rebuild"),
+):
+    # show or rebuild the cached repo list for a scan root
+    from . import index
+
+    scan_path = str(dir) if dir else "."
+    config = storage.load_config() or {}
+    repos = index.load_repos(
+        scan_path, rebuild=rebuild, skip_dirs=config.get("skip_dirs", [])
+    )
+    action = "rebuilt" if rebuild else "indexed"
+    formatter.console.print(
+        f"[dim]{len(repos)} repos {action} under {os.path.abspath(scan_path)}[/dim]"
+    )
+
+
+daemon_app = typer.Typer(add_completion=False, no_args_is_help=True)
+app.add_typer(daemon_app, name="daemon", help="Precompute standups in the background")
+
+
+def daemon_args(
+    dir: Optional[Path], author: Optional[str], days: int, interval: float, at
+) -> list[str]:
+    args = ["--days", str(days), "--interval", str(interval)]
+    if dir:
+        args += ["--dir", str(dir.resolve())]
+    if author:
+        args += ["--author", author]
+    if at:
+        args += ["--at", at]
+    return args
+
+
+def check_daemon_support():
+    from . import daemon
+
+    if not daemon.supported():
+        formatter.console.print("[red]wtf daemon needs unix sockets[/red]")
+        raise typer.Exit(1)
+
+
+@daemon_app.command(name="run")
+def daemon_run(
+    dir: Optional[Path] = typer.Option(None, "--dir", "-d"),
+    author: Optional[str] = typer.Option(None, "--author", "-a"),
+    days: int = typer.Option(1, "--days", "-n"),
+    interval: float = typer.Option(300, "--interval", min=10),
+    at: Optional[datetime] = typer.Option(None, "--at", formats=["%H:%M"]),
+    jobs: int = typer.Option(DEFAULT_JOBS, "--jobs", "-j", min=1),
+):
+    # collect in the foreground, for launchd/systemd or `wtf daemon start`
+    from . import daemon
+
+    check_daemon_support()
+    config = storage.load_config() or {}
+    standup_time = at.strftime("%H:%M") if at else config.get("standup_time")
+    runner = daemon.Daemon(
+        str(dir) if dir else ".",
+        author or get_git_user() or "unknown",
+        days,
+        options=dict(
+            max_depth=None,
+            nested=False,
+            skip_dirs=config.get("skip_dirs", []),
+            follow_symlinks=False,
+            one_filesystem=False,
+        ),
+        interval=interval,
+        at=standup_time,
+        jobs=jobs,
+    )
+    try:
+        runner.run()
+    except RuntimeError as e:
+        formatter.console.print(f"[red]{e}[/red]")
+        raise typer.Exit(1)
+
+
+@daemon_app.command(name="start")
+def daemon_start(
+    dir: Optional[Path] = typer.Option(None, "--dir", "-d"),
+    author: Optional[str] = typer.Option(None, "--author", "-a"),
+    days: int = typer.Option(1, "--days", "-n"),
+    interval: float = typer.Option(300, "--interval", min=10),
+    at: Optional[datetime] = typer.Option(None, "--at", formats=["%H:%M"]),
+):
+    from . import daemon
+
+    check_daemon_support()
+    running = daemon.status()
+    if running:
+        formatter.console.print(
+            f"[dim]wtf daemon already running (pid {running['pid']})[/dim]"
+        )
+        return
+    at_text = at.strftime("%H:%M") if at else None
+    pid = daemon.spawn(daemon_args(dir, author, days, interval, at_text))
+    # wait for the socket so the next `wtf` can use it
+    for _ in range(50):
+        if daemon.status():
+            break
+        time.sleep(0.1)
+    formatter.console.print(
+        f"[dim]wtf daemon started (pid {pid}), log in {daemon.log_path()}[/dim]"
+    )
+
+
+@daemon_app.command(name="stop")
+def daemon_stop():
+    from . import daemon
+
+    if daemon.stop():
+        formatter.console.print("[dim]wtf daemon stopped[/dim]")
+    else:
+        formatter.console.print("[dim]wtf daemon is not running[/dim]")
+
+
+@daemon_app.command(name="status")
+def daemon_status():
+    from . import daemon
+
+    running = daemon.status()
+    if not running:
+        formatter.console.print("[dim]wtf daemon is not running[/dim]")
+        raise typer.Exit(1)
+    refreshed = running["refreshed_at"]
+    when = datetime.fromtimestamp(refreshed).strftime("%H:%M:%S") if refreshed else "-"
+    formatter.console.print(
+        f"[dim]pid {running['pid']}, watching {running['scan_path']} "
+        f"as {running['author']}, last refresh {when}[/dim]"
+    )
+    if running.get("error"):
+        formatter.console.print(f"[red]last refresh failed: {running['error']}[/red]")
+
+
+hook_app = typer.Typer(add_completion=False, no_args_is_help=True)
+app.add_typer(hook_app, name="hook", help="Journal new commits from git hooks")
+
+
+@hook_app.command(name="install")
+def hook_install(
+    dir: Optional[Path] = typer.Option(None, "--dir", "-d"),
+    global_: bool = typer.Option(False, "--global"),
+):
+    # journal commits as they are made so wtf can skip git log
+    from . import journal
+
+    try:
+        if global_:
+            where = journal.install_global(time.time())
+        else:
+            where = journal.install(str(dir) if dir else ".", time.time())
+    except (ValueError, OSError, subprocess.CalledProcessError) as e:
+        formatter.console.print(f"[red]{e}[/red]")
+        raise typer.Exit(1)
+    formatter.console.print(f"[dim]commit journal hooks installed in {where}[/dim]")
+
+
+@hook_app.command(name="uninstall")
+def hook_uninstall(
+    dir: Optional[Path] = typer.Option(None, "--dir", "-d"),
+    global_: bool = typer.Option(False, "--global"),
+):
+    from . import journal
+
+    try:
+        if global_:
+            journal.uninstall_global()
+        else:
+            journal.uninstall(str(dir) if dir else ".")
+    except (ValueError, OSError) as e:
+        formatter.console.print(f"[red]{e}[/red]")
+        raise typer.Exit(1)
+    formatter.console.print("[dim]commit journal hooks removed[/dim]")
+
+
+@app.command(name="dev")
+def dev_command(
+    port: int = typer.Option(8787, "--port", "-p", min=0),
+    latency: float = typer.Option(0.0, "--latency", min=0),
+    chunk_delay: float = typer.Option(0.0, "--chunk-delay", min=0),
+    error_rate: float = typer.Option(0.0, "--error-rate", min=0, max=1),
+    error_status: int = typer.Option(503, "--error-status"),
+    prompt_tokens: Optional[int] = typer.Option(None, "--prompt-tokens", min=0),
+    completion_tokens: Optional[int] = typer.Option(None, "--completion-tokens", min=0),
+    seed: Optional[int] = typer.Option(None, "--seed"),
+    cassette: Optional[Path] = typer.Option(None, "--cassette"),
+    record_from: Optional[str] = typer.Option(None, "--record-from"),
+    upstream_timeout: float = typer.Option(60.0, "--upstream-timeout", min=0.1),
+):
+    # serve a local openrouter stand-in until ctrl-c
+    from . import devserver
+
+    if record_from and not cassette:
+        formatter.console.print("[red]--record-from needs a --cassette to write[/red]")
+        raise typer.Exit(1)
+    settings = devserver.Settings(
+        latency=latency,
+        chunk_delay=chunk_delay,
+        error_rate=error_rate,
+        error_status=error_status,
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        seed=seed,
+        cassette=cassette,
+        upstream=record_from,
+        upstream_timeout=upstream_timeout,
+    )
+    try:
+        server = devserver.Server(("127.0.0.1", port), settings)
+    except (OSError, ValueError) as e:
+        formatter.console.print(f"[red]{e}[/red]")
+        raise typer.Exit(1)
+    formatter.console.print(f"[dim]serving on {server.url}[/dim]")
+    formatter.console.print(f"[dim]run wtf with WTF_API_URL={server.url}[/dim]")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
 @app.callback(invoke_without_command=True)
 def main(
     ctx: typer.Context,
@@ -40,11 +286,36 @@ def main(
     spending: bool = typer.Option(False, "--spending"),
     history: bool = typer.Option(False, "--history"),
     json_out: bool = typer.Option(False, "--json"),
+    ndjson: bool = typer.Option(False, "--ndjson"),
+    jobs: int = typer.Option(DEFAULT_JOBS, "--jobs", "-j", min=1),
+    max_depth: Optional[int] = typer.Option(None, "--max-depth", min=0),
+    nested: bool = typer.Option(False, "--nested"),
+    follow_symlinks: bool = typer.Option(False, "--follow-symlinks"),
+    one_fs: bool = typer.Option(False, "--one-fs"),
+    no_index: bool = typer.Option(False, "--no-index"),
+    no_daemon: bool = typer.Option(False, "--no-daemon"),
+    no_cache: bool = typer.Option(False, "--no-cache"),
+    deadline: Optional[float] = typer.Option(None, "--deadline", min=1),
+    no_stream: bool = typer.Option(False, "--no-stream"),
+    since: Optional[datetime] = typer.Option(None, "--since", formats=["%Y-%m-%d"]),
+    until: Optional[datetime] = typer.Option(None, "--until", formats=["%Y-%m-%d"]),
+    repo: Optional[str] = typer.Option(None, "--repo"),
+    page: int = typer.Option(1, "--page", min=1),
+    by: Optional[SpendingBreakdown] = typer.Option(None, "--by"),
+    profile: bool = typer.Option(False, "--profile"),
+    profile_out: Optional[Path] = typer.Option(None, "--profile-out"),
+    team: Optional[List[str]] = typer.Option(None, "--team"),
+    offline: bool = typer.Option(False, "--offline"),
 ):
     # if a subcommand was invoked, skip main logic
     if ctx.invoked_subcommand is not None:
         return
 
+    # report on the way out, however the run ends
+    if profile or profile_out:
+        profiling.start()
+        ctx.call_on_close(lambda: report_profile(profile, profile_out))
+
     # check if configured, run setup if not
     if not storage.is_configured():
         formatter.console.print("[yellow]First time? Let's set up wtf.[/yellow]")
@@ -57,18 +328,26 @@ def main(
     if spending:
         total = storage.get_total_spent()
         formatter.render_spending(total)
+        if by:
+            rows = storage.get_spending_breakdown(by.value)
+            formatter.render_spending_breakdown(rows)
         return
 
     # handle --history
     if history:
-        past = storage.load_history()
-        for item in past:
-            formatter.console.print(f"[dim]{item.generated_at}[/dim]")
-            formatter.console.print(item.llm_response.summary)
-            formatter.console.print()
+        past = storage.load_history_entries(
+            limit=HISTORY_PAGE_SIZE,
+            offset=(page - 1) * HISTORY_PAGE_SIZE,
+            since=since,
+            until=until + timedelta(days=1) if until else None,
+            repo=repo,
+            author=author,
+        )
+        formatter.render_history(past)
         return
 
     # main flow
+    config = storage.load_config() or {}
     scan_path = str(dir) if dir else "."
     git_author = author or get_git_user() or "unknown"
 
@@ -76,143 +355,507 @@ def main(
     if datetime.now().weekday() == 0:
         days = max(days, 3)
 
+    options = dict(
+        max_depth=max_depth,
+        nested=nested,
+        skip_dirs=config.get("skip_dirs", []),
+        follow_symlinks=follow_symlinks,
+        one_filesystem=one_fs,
+    )
+
+    # machine output never touches rich, and nothing but json goes to stdout
+    machine = json_out or ndjson
+
+    if team:
+        run_team(
+            team,
+            scan_path,
+            days,
+            config,
+            here=here,
+            no_index=no_index,
+            jobs=jobs,
+            options=options,
+            no_cache=no_cache,
+            json_out=machine,
+            deadline=deadline,
+            offline=offline,
+        )
+        return
+
+    # a running daemon has the repos collected already (and, past the
+    # standup time, the summary waiting in the cache)
+    gathered = None
+    if not here and not no_daemon and profiling.current is None:
+        from . import daemon
+
+        gathered = daemon.fetch(scan_path, git_author, days, options)
+        if gathered is not None and not machine:
+            formatter.render_preamble(gathered[0])
+
+    if gathered is None:
+        gathered = gather(
+            scan_path,
+            git_author,
+            days,
+            here=here,
+            no_index=no_index,
+            jobs=jobs,
+            options=options,
+            show=not machine,
+        )
+    if gathered is None:
+        if machine:
+            print("No commits found.", file=sys.stderr)
+        else:
+            formatter.console.print("[yellow]No commits found.[/yellow]")
+        raise typer.Exit()
+
+    result, commits_text, diff_text = gathered
+    if ndjson:
+        # the repos go out before the llm is asked
+        from . import export
+
+        export.write_ndjson_start(result)
+    respond(
+        result,
+        commits_text,
+        diff_text,
+        config,
+        no_cache=no_cache,
+        json_out=json_out,
+        no_stream=no_stream,
+        deadline=deadline,
+        offline=offline,
+        ndjson=ndjson,
+    )
+
+    # copy to clipboard
+    if copy:
+        import pyperclip
+
+        pyperclip.copy(result.llm_response.summary)
+        if machine:
+            print("copied to clipboard", file=sys.stderr)
+        else:
+            formatter.render_copied()
+
+
+def gather(
+    scan_path: str,
+    git_author: str,
+    days: int,
+    here: bool = False,
+    no_index: bool = False,
+    jobs: int = DEFAULT_JOBS,
+    options: dict | None = None,
+    show: bool = False,
+) -> tuple["StandupResult", str, str | None] | None:
+    # all the git work: the result without its llm fields, plus the planned
+    # prompt. with show the preamble renders as soon as it is known
+    from concurrent.futures import ThreadPoolExecutor
+
+    from . import journal, llm, prompt, streak
+    from .models import LLMResponse, StandupResult
+
+    config = storage.load_config() or {}
+    options = options or {}
+    started_at = time.time()
+    since_ts = started_at - days * 86400
+    streak_book = streak.load(git_author)
+
     # find repos and commits
-    if here:
-        repos = [scan_path]
-    else:
-        repos = find_git_repos(scan_path)
+    with profiling.phase("discover"):
+        repos, idle = find_repos(
+            scan_path, here, no_index, since_ts, streak_book, **options
+        )
 
     summaries = []
     wip_summaries = []
     all_commits = []
-
-    for repo_path in repos:
-        commits = get_commits(repo_path, git_author, f"{days} days ago")
-        branch = get_current_branch(repo_path)
-
-        if commits:
-            summaries.append(
-                RepoSummary(
-                    name=Path(repo_path).name,
-                    path=repo_path,
-                    commits=commits,
-                    branch=branch,
-                )
-            )
-            all_commits.extend(commits)
-
-        # gather wip (uncommitted changes)
-        diff_stat = get_git_diff_stat(repo_path)
-        if diff_stat:
-            diff = get_git_diff(repo_path)
-            wip_summaries.append(
-                WipSummary(
-                    repo_name=Path(repo_path).name,
-                    files_changed=diff_stat,
-                    diff_preview=diff[:2000],
-                )
+    commit_dates = set()
+    pending_diffs = []
+
+    # pipeline: snapshots fan out on the pool and dirty repos queue their
+    # (slower) diff on the same pool, so the trees render while diffs run
+    dates_since = {r: streak.scan_from(streak_book, r) for r in repos}
+    # repos with the commit hooks get their commits from the journal instead
+    # of git log, repos needing a full backfill (dates_since 0) never qualify
+    with profiling.phase("journal"):
+        book = journal.load(
+            min([since_ts, *(d for d in dates_since.values() if d >= 1)])
+        )
+    collect_started = profiling.now()
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        started_repos = pool.map(
+            lambda r: start_repo(
+                r, git_author, since_ts, dates_since.get(r), pool, book, r in idle
+            ),
+            repos,
+        )
+        for summary, wip, dates, diff in started_repos:
+            if summary:
+                summaries.append(summary)
+                all_commits.extend(summary.commits)
+            if wip:
+                wip_summaries.append(wip)
+                pending_diffs.append((wip, diff))
+            commit_dates |= dates
+        profiling.record("collect", None, collect_started)
+
+        # only git log new days, the day set covers everything before that
+        with profiling.phase("streak"):
+            streak_stats = streak.record(
+                git_author, streak_book, commit_dates, repos, started_at
             )
 
-    if not summaries and not wip_summaries:
-        formatter.console.print("[yellow]No commits found.[/yellow]")
-        raise typer.Exit()
+        if not summaries and not wip_summaries:
+            return None
+
+        # calculate time stats
+        time_stats = calculate_time_stats(all_commits)
+
+        # build result, the llm fields get filled in by respond
+        result = StandupResult(
+            repos=summaries,
+            llm_response=LLMResponse(summary="", roast=""),
+            generated_at=datetime.now(),
+            cost_usd=0.0,
+            wip=wip_summaries,
+            time_stats=time_stats,
+            streak=streak_stats.current,
+            longest_streak=streak_stats.longest,
+            week_days=streak_stats.week_days,
+            author=git_author,
+        )
 
-    # calculate time stats
-    time_stats = calculate_time_stats(all_commits)
+        # nothing above needs the llm, show it while diffs and llm run
+        if show:
+            with profiling.phase("render"):
+                formatter.render_preamble(result)
+
+        with profiling.phase("diff wait"):
+            for wip, diff in pending_diffs:
+                wip.diff_preview = diff.result()
+
+    # plan the prompt as soon as it is complete, sized to the model's budget
+    with profiling.phase("prompt"):
+        budget = config.get("prompt_budget") or prompt.budget_for(llm.get_model())
+        commits_text, diff_text = prompt.plan(
+            summaries,
+            wip_summaries,
+            budget,
+            batches=config.get("max_batches", prompt.DEFAULT_MAX_BATCHES),
+        )
+    return result, commits_text, diff_text
+
+
+def run_team(
+    names: list[str],
+    scan_path: str,
+    days: int,
+    config: dict,
+    here: bool = False,
+    no_index: bool = False,
+    jobs: int = DEFAULT_JOBS,
+    options: dict | None = None,
+    no_cache: bool = False,
+    json_out: bool = False,
+    deadline: float | None = None,
+    offline: bool = False,
+):
+    # one standup per member from a single git log per repo. json is ndjson,
+    # a line per member as soon as their summary is in
+    from . import export, team
+
+    members = team.parse_members(names, config)
+    if not members:
+        if json_out:
+            print("No team members given.", file=sys.stderr)
+        else:
+            formatter.console.print("[yellow]No team members given.[/yellow]")
+        raise typer.Exit(1)
+    since_ts = time.time() - days * 86400
+    with profiling.phase("discover"):
+        repos, idle = find_repos(scan_path, here, no_index, since_ts, **(options or {}))
+    # only commits matter here, idle repos have none to give
+    repos = [r for r in repos if r not in idle]
+
+    def on_done(member, result, error):
+        if json_out:
+            export.write_line(team_record(member, result, error))
+
+    outcomes = team.run(
+        members,
+        repos,
+        since_ts,
+        jobs,
+        config,
+        no_cache=no_cache,
+        deadline=deadline,
+        on_done=on_done,
+        offline=offline,
+    )
+    if not json_out:
+        formatter.render_team(
+            [(m.name, *outcome) for m, outcome in zip(members, outcomes)]
+        )
+    if any(error for _, error in outcomes):
+        raise typer.Exit(1)
+
+
+def team_record(member: str, result: "StandupResult | None", error) -> dict:
+    # the --json standup record, plus the error (null when it worked)
+    from . import export
 
-    # get streak
-    streak = get_commit_streak(scan_path, git_author) if summaries else 0
+    if result is None:
+        record = {"schema": export.SCHEMA, "version": export.SCHEMA_VERSION}
+    else:
+        record = export.standup_record(result)
+    record["author"] = member
+    record["error"] = None if error is None else str(error)
+    return record
+
+
+def respond(
+    result: "StandupResult",
+    commits_text: str,
+    diff_text: str | None,
+    config: dict,
+    no_cache: bool = False,
+    json_out: bool = False,
+    no_stream: bool = False,
+    deadline: float | None = None,
+    offline: bool = False,
+    ndjson: bool = False,
+):
+    # fill in the llm fields, save the standup and print the rest of it
+    from . import cache, llm
+    from .models import LLMResponse
 
-    # call llm
-    commits_text = format_for_llm(summaries) if summaries else "No commits."
-    diff_text = format_wip_for_llm(wip_summaries) if wip_summaries else None
+    # --offline (or "summarizer" in the config) picks the backend. offline
+    # answers are free and instant, so they skip the cache
+    backend = "offline" if offline else config.get("summarizer", llm.DEFAULT_BACKEND)
+    remote = backend != "offline"
 
+    # identical prompts are answered from the local cache for free
+    with profiling.phase("cache"):
+        key = llm.cache_key(commits_text, diff_text)
+        ttl = config.get("cache_ttl", cache.DEFAULT_TTL)
+        cached = None if no_cache or not remote else cache.get(key, ttl)
+
+    result.cache_hit = cached is not None
+
+    # stream the summary under the repo trees unless output is json
+    machine = json_out or ndjson
+    streaming = cached is None and remote and not machine and not no_stream
+    live = formatter.SummaryStream() if streaming else None
+
+    llm_started = profiling.now()
     try:
-        llm_response, cost = analyze_commits(commits_text, diff_text)
-        storage.add_spending(cost, get_model())
+        if cached is not None:
+            llm_response, cost = LLMResponse(**cached), 0.0
+        else:
+            try:
+                llm_response, cost = llm.BACKENDS[backend](
+                    result,
+                    commits_text,
+                    diff_text,
+                    config.get("prompt_budget"),
+                    on_update=live.update if live else None,
+                    deadline=deadline or config.get("deadline"),
+                    no_cache=no_cache,
+                )
+            except llm.FALLBACK_ERRORS as e:
+                # no network or past the deadline, a rough standup beats none
+                if not remote or not config.get("offline_fallback", True):
+                    raise
+                formatter.render_fallback(llm.fallback_reason(e), live)
+                if llm.spent(e):
+                    storage.add_spending(llm.spent(e), llm.get_model())
+                remote, live = False, None
+                llm_response, cost = llm.offline_backend(
+                    result, commits_text, diff_text
+                )
+            if live:
+                live.finish(llm_response)
+        profiling.record("llm", None, llm_started)
+        if cached is None and remote:
+            max_entries = config.get("cache_max_entries", cache.DEFAULT_MAX_ENTRIES)
+            cache.put(key, llm_response.model_dump(), max_entries)
+        if remote:
+            storage.add_spending(cost, llm.get_model())
     except Exception as e:
+        if llm.spent(e):
+            storage.add_spending(llm.spent(e), llm.get_model())
+        if machine:
+            print(f"LLM error: {e}", file=sys.stderr)
+            raise typer.Exit(1)
+        if live:
+            formatter.console.print()
         formatter.console.print(f"[red]LLM error: {e}[/red]")
         raise typer.Exit(1)
 
-    # build result
-    result = StandupResult(
-        repos=summaries,
-        llm_response=llm_response,
-        generated_at=datetime.now(),
-        cost_usd=cost,
-        wip=wip_summaries,
-        time_stats=time_stats,
-        streak=streak,
-    )
+    result.llm_response = llm_response
+    result.cost_usd = cost
 
     # save to history
-    storage.save_standup(result)
+    with profiling.phase("history save"):
+        storage.save_standup(result)
 
     # output
-    if json_out:
-        print(
-            json.dumps(
-                {
-                    "summary": result.llm_response.summary,
-                    "roast": result.llm_response.roast,
-                    "repos": [
-                        {"name": r.name, "commits": len(r.commits)} for r in summaries
-                    ],
-                },
-                indent=2,
-            )
+    render_started = profiling.now()
+    if machine:
+        from . import export
+
+        if ndjson:
+            export.write_ndjson_end(result)
+        else:
+            export.write_json(result)
+    elif live is None:
+        formatter.render_summary(result.llm_response)
+    profiling.record("render", None, render_started)
+
+
+def find_repos(
+    scan_path: str,
+    here: bool,
+    no_index: bool,
+    since: float,
+    streak_book: dict | None = None,
+    **options,
+) -> tuple[list[str], set[str]]:
+    # (repos, the idle ones among them). idle repos are those git hasn't
+    # touched since the window opened (or since their streak days were last
+    # recorded): no new commits, but files can still have been edited, which
+    # never touches .git, so they still get git status
+    from . import index, streak
+
+    if here:
+        return [scan_path], set()
+    if no_index:
+        return find_git_repos(scan_path, **options), set()
+    repos = index.load_repos(scan_path, **options)
+    if streak_book is None:
+        return repos, {r for r in repos if not index.active_since(r, since)}
+    return repos, {
+        r
+        for r in repos
+        if not index.active_since(r, min(since, streak.scanned_at(streak_book, r)))
+    }
+
+
+def report_profile(show: bool, trace_path: Path | None):
+    profile = profiling.stop()
+    if profile is None:
+        return
+    if show:
+        formatter.render_profile(profiling.summarize(profile))
+    if trace_path:
+        profiling.write_trace(profile, str(trace_path))
+
+
+def start_repo(
+    repo_path: str,
+    author: str,
+    since: float,
+    dates_since: float | None = None,
+    diff_pool: "Executor | None" = None,
+    book: "Journal | None" = None,
+    idle: bool = False,
+) -> tuple["RepoSummary | None", "WipSummary | None", set[str], "Future | None"]:
+    # gather commits, wip and streak dates for a single repo. with a
+    # diff_pool the diff is left running there and its future returned
+    # instead of filling in diff_preview. with a journal that covers the
+    # repo, or for an idle repo, only git status runs
+    from .models import Commit, RepoSummary, WipSummary
+
+    # (commits, dates) when they are known without git log
+    known = None
+    log_since = since if dates_since is None else min(since, dates_since)
+    if idle:
+        known = [], set()
+    elif book is not None and book.covers(repo_path, log_since):
+        known = book.lookup(repo_path, author, since, dates_since)
+    snapshot = get_repo_snapshot(
+        repo_path, author, since, dates_since, log=known is None
+    )
+    if known is not None:
+        snapshot.commits, snapshot.commit_dates = known
+    name = Path(repo_path).name
+
+    summary = None
+    if snapshot.commits:
+        summary = RepoSummary(
+            name=name,
+            path=repo_path,
+            commits=[
+                Commit(
+                    hash=c.hash,
+                    message=c.message,
+                    date=c.date,
+                    time=c.time,
+                    repo_name=name,
+                )
+                for c in snapshot.commits
+            ],
+            branch=snapshot.branch,
         )
-    else:
-        formatter.render(result)
 
-    # copy to clipboard
-    if copy:
-        pyperclip.copy(result.llm_response.summary)
-        formatter.render_copied()
+    # gather wip (uncommitted changes)
+    wip = None
+    diff = None
+    if snapshot.status:
+        wip = WipSummary(repo_name=name, files_changed=snapshot.status, diff_preview="")
+        if diff_pool is None:
+            wip.diff_preview = get_wip_diff(repo_path)
+        else:
+            diff = diff_pool.submit(get_wip_diff, repo_path)
+    return summary, wip, snapshot.commit_dates, diff
 
 
-def get_commits(repo_path: str, author: str, since: str) -> list[Commit]:
-    raw = get_git_commits(repo_path, author, since)
-    if not raw:
-        return []
+def get_wip_diff(repo_path: str) -> str:
+    # bounded diff with lockfiles and generated files excluded up front
+    from . import prompt
 
-    commits = []
-    for line in raw.split("\n"):
-        if "|" in line:
-            parts = line.split("|")
-            commits.append(
-                Commit(
-                    hash=parts[0],
-                    message=parts[1],
-                    date=parts[2] if len(parts) > 2 else "",
-                    time=parts[3] if len(parts) > 3 else "",
-                    repo_name=Path(repo_path).name,
-                )
-            )
-    return commits
+    return get_git_diff(
+        repo_path, max_bytes=MAX_DIFF_BYTES, exclude=prompt.NOISE_PATHSPECS
+    )
+
+
+def get_commits(repo_path: str, author: str, since: str) -> list["Commit"]:
+    from .models import Commit
+
+    name = Path(repo_path).name
+    return [
+        Commit(
+            hash=c.hash,
+            message=c.message,
+            date=c.date,
+            time=c.time,
+            repo_name=name,
+        )
+        for c in get_git_commits(repo_path, author, since) or []
+    ]
+
+
+def format_for_llm(summaries: list["RepoSummary"], budget: int | None = None) -> str:
+    from . import prompt
+
+    return prompt.format_commits(summaries, budget)
 
 
-def format_for_llm(summaries: list[RepoSummary]) -> str:
-    lines = []
-    for s in summaries:
-        lines.append(f"\n{s.name} ({len(s.commits)} commits):")
-        for c in s.commits:
-            lines.append(f"  - {c.message}")
-    return "\n".join(lines)
+def format_wip_for_llm(
+    wip_summaries: list["WipSummary"], budget: int | None = None
+) -> str:
+    from . import prompt
 
+    return prompt.format_wip(wip_summaries, budget)
 
-def format_wip_for_llm(wip_summaries: list[WipSummary]) -> str:
-    lines = []
-    for wip in wip_summaries:
-        lines.append(f"\n{wip.repo_name} ({len(wip.files_changed)} files changed):")
-        for f in wip.files_changed[:10]:
-            lines.append(f"  {f}")
-        if wip.diff_preview:
-            lines.append(f"\nDiff preview:\n{wip.diff_preview[:1500]}")
-    return "\n".join(lines)
 
+def calculate_time_stats(commits: list["Commit"]) -> "TimeStats":
+    from .models import TimeStats
 
-def calculate_time_stats(commits: list[Commit]) -> TimeStats:
     if not commits:
         return TimeStats()
 
@@ -0,0 +1,271 @@
+import json
+import os
+import socket
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from . import storage
+
+# how often the daemon re-collects the repos, and how stale a collection
+# the client will still print. the client also checks each repo's
+# fingerprint, the age limit covers what that can't see (edits that
+# aren't staged yet, new clones)
+DEFAULT_INTERVAL = 300
+MAX_AGE_INTERVALS = 2
+# the client gives up on the daemon quickly and does the work itself
+CLIENT_TIMEOUT = 1.0
+
+
+def socket_path() -> Path:
+    # resolved on every call so a patched WTF_DIR is respected
+    return storage.WTF_DIR / "daemon.sock"
+
+
+def log_path() -> Path:
+    return storage.WTF_DIR / "daemon.log"
+
+
+def supported() -> bool:
+    return hasattr(socket, "AF_UNIX")
+
+
+def query(message: dict, timeout: float = CLIENT_TIMEOUT) -> dict | None:
+    # one json line out, one back. None when no daemon answers
+    if not supported() or not socket_path().exists():
+        return None
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(str(socket_path()))
+            sock.sendall(json.dumps(message).encode() + b"\n")
+            with sock.makefile("rb") as f:
+                line = f.readline()
+        return json.loads(line) if line else None
+    except (OSError, ValueError):
+        return None
+
+
+def request_key(scan_path: str, author: str, days: int, options: dict) -> dict:
+    # everything that changes what gets collected
+    return {
+        "scan_path": os.path.abspath(scan_path),
+        "author": author,
+        "days": days,
+        "options": options,
+    }
+
+
+def fetch(scan_path: str, author: str, days: int, options: dict):
+    # the daemon's latest collection as (result, commits_text, diff_text),
+    # or None when it isn't running, is collecting something else, is stale
+    # or a repo has moved on (a commit, a checkout, a git add) since
+    reply = query(
+        {"op": "standup", "key": request_key(scan_path, author, days, options)}
+    )
+    if not reply or not reply.get("ok"):
+        return None
+    from . import index
+
+    if "fingerprints" not in reply or index.changed(reply["fingerprints"]):
+        return None
+    from .models import StandupResult
+
+    try:
+        result = StandupResult.model_validate_json(reply["result"])
+    except Exception:
+        return None
+    return result, reply["commits_text"], reply["diff_text"]
+
+
+def status() -> dict | None:
+    return query({"op": "status"})
+
+
+def stop() -> bool:
+    return query({"op": "stop"}) is not None
+
+
+class Daemon:
+    # latest collection for one scan root, refreshed on a timer
+
+    def __init__(
+        self,
+        scan_path: str,
+        author: str,
+        days: int,
+        options: dict,
+        interval: float = DEFAULT_INTERVAL,
+        at: str | None = None,
+        jobs: int | None = None,
+    ):
+        self.scan_path = scan_path
+        self.author = author
+        self.days = days
+        self.options = options
+        self.interval = interval
+        self.at = at
+        self.jobs = jobs
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.latest = None
+        self.refreshed_at = 0.0
+        self.summarized_on = None
+        self.error = None
+
+    def days_now(self) -> int:
+        # same monday rule as the cli (show fri-sun)
+        if datetime.now().weekday() == 0:
+            return max(self.days, 3)
+        return self.days
+
+    def refresh(self):
+        from . import index
+        from .cli import DEFAULT_JOBS, gather
+
+        storage.reload_config()
+        # taken before collecting, so a commit landing mid-refresh still
+        # counts as a change
+        fingerprints = index.fingerprints(self.scan_path, **self.options)
+        gathered = gather(
+            self.scan_path,
+            self.author,
+            self.days_now(),
+            jobs=self.jobs or DEFAULT_JOBS,
+            options=self.options,
+        )
+        latest = None
+        if gathered is not None:
+            result, commits_text, diff_text = gathered
+            latest = {
+                "result": result.model_dump_json(),
+                "commits_text": commits_text,
+                "diff_text": diff_text,
+                "fingerprints": fingerprints,
+            }
+        with self.lock:
+            self.latest = latest
+            self.refreshed_at = time.time()
+        if gathered is not None and self.summary_due():
+            self.summarize(gathered[1], gathered[2])
+
+    def summary_due(self) -> bool:
+        # once a day, as soon as the standup time has passed
+        if not self.at:
+            return False
+        today = datetime.now().date()
+        hour, minute = (int(part) for part in self.at.split(":"))
+        due = datetime.now().replace(hour=hour, minute=minute, second=0)
+        return datetime.now() >= due and self.summarized_on != today
+
+    def summarize(self, commits_text: str, diff_text: str | None):
+        # ask the llm ahead of time, the client finds the answer in the cache
+        from . import cache, llm
+
+        config = storage.load_config() or {}
+        # offline standups are free and instant, nothing to prepare
+        if config.get("summarizer", llm.DEFAULT_BACKEND) == "offline":
+            self.summarized_on = datetime.now().date()
+            return
+        key = llm.cache_key(commits_text, diff_text)
+        if cache.get(key, config.get("cache_ttl", cache.DEFAULT_TTL)) is None:
+            try:
+                llm_response, cost = llm.summarize(
+                    commits_text,
+                    diff_text,
+                    config.get("prompt_budget"),
+                    deadline=config.get("deadline"),
+                )
+            except Exception as e:
+                if llm.spent(e):
+                    storage.add_spending(llm.spent(e), llm.get_model())
+                raise
+            max_entries = config.get("cache_max_entries", cache.DEFAULT_MAX_ENTRIES)
+            cache.put(key, llm_response.model_dump(), max_entries)
+            storage.add_spending(cost, llm.get_model())
+        self.summarized_on = datetime.now().date()
+
+    def handle(self, message: dict) -> dict:
+        op = message.get("op")
+        if op == "stop":
+            self.stopped.set()
+            return {"ok": True}
+        with self.lock:
+            latest, refreshed_at = self.latest, self.refreshed_at
+        if op == "status":
+            return {
+                "ok": True,
+                "pid": os.getpid(),
+                "scan_path": os.path.abspath(self.scan_path),
+                "author": self.author,
+                "interval": self.interval,
+                "at": self.at,
+                "refreshed_at": refreshed_at,
+                "error": self.error,
+            }
+        if op == "standup":
+            key = request_key(
+                self.scan_path, self.author, self.days_now(), self.options
+            )
+            fresh = time.time() - refreshed_at < self.interval * MAX_AGE_INTERVALS
+            if message.get("key") != key or latest is None or not fresh:
+                return {"ok": False}
+            return {"ok": True, "refreshed_at": refreshed_at, **latest}
+        return {"ok": False, "error": f"unknown op {op!r}"}
+
+    def run(self):
+        # serve on the socket while refreshing on the main thread
+        path = socket_path()
+        storage.init_storage()
+        if status() is not None:
+            raise RuntimeError("wtf daemon is already running")
+        path.unlink(missing_ok=True)
+
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                try:
+                    message = json.loads(self.rfile.readline())
+                    reply = daemon.handle(message)
+                except ValueError:
+                    reply = {"ok": False, "error": "bad request"}
+                self.wfile.write(json.dumps(reply).encode() + b"\n")
+
+        server = socketserver.ThreadingUnixStreamServer(str(path), Handler)
+        server.daemon_threads = True
+        os.chmod(path, 0o600)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            while not self.stopped.is_set():
+                try:
+                    self.refresh()
+                    self.error = None
+                except Exception as e:
+                    # keep serving the last good collection
+                    self.error = str(e)
+                    print(f"{datetime.now().isoformat()} refresh failed: {e}")
+                    sys.stdout.flush()
+                self.stopped.wait(self.interval)
+        finally:
+            server.shutdown()
+            server.server_close()
+            path.unlink(missing_ok=True)
+
+
+def spawn(args: list[str]) -> int:
+    # start `wtf daemon run` detached, logging to ~/.wtf/daemon.log
+    storage.init_storage()
+    with open(log_path(), "ab") as log:
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "wtf_dev.cli", "daemon", "run", *args],
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            start_new_session=True,
+        )
+    return proc.pid
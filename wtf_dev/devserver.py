@@ -0,0 +1,289 @@
+import hashlib
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# a local stand-in for the openrouter api, for tests, benchmarks and trying
+# out slow or failing providers: `wtf dev`, then WTF_API_URL=<its url> wtf
+
+CASSETTE_VERSION = 1
+
+MODELS = [
+    {
+        "id": "openai/gpt-oss-120b",
+        "name": "gpt-oss-120b (local stub)",
+        "context_length": 131072,
+        "pricing": {"prompt": "0.0000001", "completion": "0.0000002"},
+    },
+    {
+        "id": "anthropic/claude-3.5-sonnet",
+        "name": "Claude 3.5 Sonnet (local stub)",
+        "context_length": 200000,
+        "pricing": {"prompt": "0.000003", "completion": "0.000015"},
+    },
+]
+
+# canned answers by json schema name, in the shape llm.py asks for
+ANSWERS = {
+    "standup": {
+        "summary": "Shipped a handful of commits against the local stub.",
+        "roast": "Even the fake LLM noticed.",
+        "wip_summary": "",
+    },
+    "standup_notes": {"notes": "Worked through a batch of commits.", "patterns": ""},
+}
+
+
+@dataclass(slots=True)
+class Settings:
+    # seconds before the answer starts, and between streamed chunks
+    latency: float = 0.0
+    chunk_delay: float = 0.0
+    # characters of content per streamed chunk
+    chunk_size: int = 16
+    # share of requests answered with error_status instead
+    error_rate: float = 0.0
+    error_status: int = 503
+    # usage reported back, estimated from the text when None
+    prompt_tokens: int | None = None
+    completion_tokens: int | None = None
+    # fixes which requests fail, for repeatable runs
+    seed: int | None = None
+    # recorded answers to replay, and where to get (and record) the ones
+    # it doesn't have
+    cassette: Path | None = None
+    upstream: str | None = None
+    # seconds to wait on the upstream before answering 504 instead
+    upstream_timeout: float = 60.0
+
+
+def request_key(body: dict) -> str:
+    # what makes two requests the same answer
+    return hashlib.sha256(
+        json.dumps(
+            {
+                "model": body.get("model"),
+                "messages": body.get("messages"),
+                "response_format": body.get("response_format"),
+                "stream": bool(body.get("stream")),
+            },
+            sort_keys=True,
+        ).encode()
+    ).hexdigest()
+
+
+@dataclass(slots=True)
+class Cassette:
+    # request key -> recorded answer: {"status", "body"} or, streamed,
+    # {"status", "events"} with the raw "data: ..." lines
+    path: Path | None = None
+    interactions: dict[str, dict] = field(default_factory=dict)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    @classmethod
+    def load(cls, path: Path | None) -> "Cassette":
+        cassette = cls(path)
+        if path is None or not path.exists():
+            return cassette
+        data = json.loads(path.read_text(encoding="utf-8"))
+        if data.get("version") != CASSETTE_VERSION:
+            raise ValueError(f"{path} is not a version {CASSETTE_VERSION} cassette")
+        cassette.interactions = {i["key"]: i for i in data["interactions"]}
+        return cassette
+
+    def get(self, key: str) -> dict | None:
+        with self.lock:
+            return self.interactions.get(key)
+
+    def add(self, key: str, interaction: dict):
+        with self.lock:
+            self.interactions[key] = {"key": key, **interaction}
+            if self.path is not None:
+                data = {
+                    "version": CASSETTE_VERSION,
+                    "interactions": list(self.interactions.values()),
+                }
+                self.path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+
+
+class Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], settings: Settings):
+        super().__init__(address, Handler)
+        self.settings = settings
+        self.cassette = Cassette.load(settings.cassette)
+        self.random = random.Random(settings.seed)
+        self.lock = threading.Lock()
+        # every chat request body, in arrival order
+        self.requests = []
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/api/v1/chat/completions"
+
+    def should_fail(self) -> bool:
+        with self.lock:
+            return self.random.random() < self.settings.error_rate
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: Server
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self.send_json(200, {"data": MODELS})
+        else:
+            self.send_json(404, {"error": {"message": "not found", "code": 404}})
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_json(404, {"error": {"message": "not found", "code": 404}})
+            return
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server = self.server
+        settings = server.settings
+        with server.lock:
+            server.requests.append(body)
+
+        time.sleep(settings.latency)
+        if server.should_fail():
+            status = settings.error_status
+            self.send_json(status, {"error": {"message": "stub error", "code": status}})
+            return
+
+        key = request_key(body)
+        recorded = server.cassette.get(key)
+        if recorded is None and settings.upstream:
+            recorded = self.record(key, body)
+            if recorded is None:
+                return
+        if recorded is None:
+            recorded = synthesize(body, settings)
+
+        if "events" in recorded:
+            self.send_events(recorded["status"], recorded["events"])
+        else:
+            self.send_json(recorded["status"], recorded["body"])
+
+    def record(self, key: str, body: dict) -> dict | None:
+        # ask the real api, keep the answer. streams are passed through as
+        # they arrive (None, nothing left to send). an upstream that fails
+        # or stalls gets a 504, or a cut-off stream, and nothing is recorded
+        import requests
+
+        settings = self.server.settings
+        headers = {"Content-Type": "application/json"}
+        if self.headers.get("Authorization"):
+            headers["Authorization"] = self.headers["Authorization"]
+        stream = bool(body.get("stream"))
+        streaming = False
+        try:
+            with requests.post(
+                settings.upstream,
+                json=body,
+                headers=headers,
+                stream=stream,
+                timeout=settings.upstream_timeout,
+            ) as response:
+                if not stream or response.status_code != 200:
+                    recorded = {
+                        "status": response.status_code,
+                        "body": response.json(),
+                    }
+                    if response.status_code == 200:
+                        self.server.cassette.add(key, recorded)
+                    return recorded
+                self.start_events(200)
+                streaming = True
+                events = []
+                for line in response.iter_lines():
+                    if line.startswith(b"data:"):
+                        events.append(line.decode())
+                        self.write_chunk(line + b"\n\n")
+        except (requests.RequestException, ValueError) as e:
+            if streaming:
+                self.write_chunk(b"")
+                return None
+            message = f"upstream failed: {e}"
+            return {"status": 504, "body": {"error": {"message": message, "code": 504}}}
+        self.write_chunk(b"")
+        self.server.cassette.add(key, {"status": 200, "events": events})
+        return None
+
+    def send_json(self, status: int, payload: dict):
+        out = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def start_events(self, status: int):
+        self.send_response(status)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        # openrouter sends these while the model thinks
+        self.write_chunk(b": OPENROUTER PROCESSING\n\n")
+
+    def send_events(self, status: int, events: list[str]):
+        self.start_events(status)
+        for event in events:
+            time.sleep(self.server.settings.chunk_delay)
+            self.write_chunk(event.encode() + b"\n\n")
+        self.write_chunk(b"")
+
+    def write_chunk(self, data: bytes):
+        # chunked encoding, an empty chunk ends the response
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def log_message(self, *args):
+        pass
+
+
+def synthesize(body: dict, settings: Settings) -> dict:
+    # a canned answer for the schema asked for, with plausible usage
+    schema = (body.get("response_format") or {}).get("json_schema") or {}
+    content = json.dumps(ANSWERS.get(schema.get("name"), ANSWERS["standup"]))
+    prompt = sum(len(m.get("content") or "") for m in body.get("messages", []))
+    usage = {
+        "prompt_tokens": (
+            prompt // 4 if settings.prompt_tokens is None else settings.prompt_tokens
+        ),
+        "completion_tokens": (
+            len(content) // 4
+            if settings.completion_tokens is None
+            else settings.completion_tokens
+        ),
+    }
+    if not body.get("stream"):
+        return {
+            "status": 200,
+            "body": {"choices": [{"message": {"content": content}}], "usage": usage},
+        }
+    size = max(1, settings.chunk_size)
+    chunks = [
+        {"choices": [{"delta": {"content": content[i : i + size]}}]}
+        for i in range(0, len(content), size)
+    ]
+    chunks.append({"choices": [], "usage": usage})
+    events = [f"data: {json.dumps(c)}" for c in chunks]
+    events.append("data: [DONE]")
+    return {"status": 200, "events": events}
+
+
+def start(settings: Settings | None = None, port: int = 0) -> Server:
+    # serving on a background thread, stop with server.shutdown()
+    server = Server(("127.0.0.1", port), settings or Settings())
+    threading.Thread(
+        target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+    ).start()
+    return server
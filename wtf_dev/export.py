@@ -0,0 +1,106 @@
+import json
+import sys
+from typing import TYPE_CHECKING, TextIO
+
+if TYPE_CHECKING:
+    from .models import RepoSummary, StandupResult, WipSummary
+
+# machine readable standups for --json and --ndjson. plain json, never
+# rich. the version only goes up when a field is renamed, removed or
+# changes meaning, new fields can appear at any time
+SCHEMA = "wtf.standup"
+SCHEMA_VERSION = 1
+
+
+def standup_record(result: "StandupResult") -> dict:
+    # everything in a standup, the --json document
+    return {
+        **head_record(result),
+        **summary_record(result),
+        "repos": [repo_record(r) for r in result.repos],
+        "wip": [wip_record(w) for w in result.wip],
+    }
+
+
+def head_record(result: "StandupResult") -> dict:
+    # what is known before the llm answers
+    stats = result.time_stats
+    return {
+        "schema": SCHEMA,
+        "version": SCHEMA_VERSION,
+        "author": result.author,
+        "generated_at": result.generated_at.isoformat(),
+        "streak": {
+            "current": result.streak,
+            "longest": result.longest_streak,
+            "week_days": list(result.week_days),
+        },
+        "time_stats": {
+            "total_commits": stats.total_commits if stats else 0,
+            "late_night_commits": stats.late_night_commits if stats else 0,
+            "early_morning_commits": stats.early_morning_commits if stats else 0,
+            "estimated_hours": stats.estimated_hours if stats else 0.0,
+        },
+    }
+
+
+def summary_record(result: "StandupResult") -> dict:
+    llm_response = result.llm_response
+    return {
+        "summary": llm_response.summary,
+        "roast": llm_response.roast,
+        "wip_summary": llm_response.wip_summary or "",
+        "cost_usd": result.cost_usd,
+        "cache_hit": result.cache_hit,
+    }
+
+
+def repo_record(repo: "RepoSummary") -> dict:
+    return {
+        "name": repo.name,
+        "path": repo.path,
+        "branch": repo.branch,
+        "commit_count": len(repo.commits),
+        "commits": [
+            {"hash": c.hash, "message": c.message, "date": c.date, "time": c.time}
+            for c in repo.commits
+        ],
+    }
+
+
+def wip_record(wip: "WipSummary") -> dict:
+    # diff_preview is the excerpt the llm saw, not the whole diff
+    return {
+        "repo": wip.repo_name,
+        "files_changed": list(wip.files_changed),
+        "diff_preview": wip.diff_preview,
+    }
+
+
+def write_json(result: "StandupResult", out: TextIO | None = None):
+    # the whole document, written as it is encoded
+    out = out or sys.stdout
+    for chunk in json.JSONEncoder(indent=2).iterencode(standup_record(result)):
+        out.write(chunk)
+    out.write("\n")
+    out.flush()
+
+
+def write_line(record: dict, out: TextIO | None = None):
+    out = out or sys.stdout
+    out.write(json.dumps(record) + "\n")
+    out.flush()
+
+
+def write_ndjson_start(result: "StandupResult", out: TextIO | None = None):
+    # --ndjson: a standup line, then a line per repo and per wip, all before
+    # the llm is asked. write_ndjson_end adds the summary line
+    write_line({"type": "standup", **head_record(result)}, out)
+    for repo in result.repos:
+        write_line({"type": "repo", **repo_record(repo)}, out)
+    for wip in result.wip:
+        write_line({"type": "wip", **wip_record(wip)}, out)
+
+
+def write_ndjson_end(result: "StandupResult", out: TextIO | None = None):
+    write_line({"type": "summary", **summary_record(result)}, out)
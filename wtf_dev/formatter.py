@@ -1,10 +1,11 @@
 import io
 import sys
-from datetime import datetime
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING
 
-from rich.console import Console
-
-from .models import RepoSummary, StandupResult, WipSummary
+if TYPE_CHECKING:
+    from .models import LLMResponse, RepoSummary, StandupResult, WipSummary
+    from .storage import HistoryEntry
 
 # force utf-8 for windows (skip during tests)
 if sys.platform == "win32" and "pytest" not in sys.modules:
@@ -15,10 +16,35 @@ if sys.platform == "win32" and "pytest" not in sys.modules:
     except Exception:
         pass
 
-console = Console(force_terminal=True)
+# plain ansi for the cheap commands, which shouldn't pay for importing rich
+DIM = "\x1b[2m"
+BOLD = "\x1b[1m"
+YELLOW = "\x1b[33m"
+RESET = "\x1b[0m"
+
+
+class LazyConsole:
+    # builds the rich console on first use
+    _console = None
+
+    def __getattr__(self, name):
+        if LazyConsole._console is None:
+            from rich.console import Console
+
+            LazyConsole._console = Console(force_terminal=True)
+        return getattr(LazyConsole._console, name)
+
 
+console = LazyConsole()
 
-def render(result: StandupResult):
+
+def render(result: "StandupResult"):
+    render_preamble(result)
+    render_summary(result.llm_response)
+
+
+def render_preamble(result: "StandupResult"):
+    # everything that doesn't depend on the llm
     # header - clean, no box
     date_str = datetime.now().strftime("%b %d, %Y")
     console.print()
@@ -28,7 +54,12 @@ def render(result: StandupResult):
 
     # streak
     if result.streak > 1:
-        console.print(f"  [yellow]* {result.streak} day streak[/yellow]")
+        best = ""
+        if result.longest_streak > result.streak:
+            best = f" [dim](best {result.longest_streak})[/dim]"
+        console.print(f"  [yellow]* {result.streak} day streak[/yellow]{best}")
+    if result.week_days:
+        render_week(result.week_days)
 
     console.print("[dim]" + "─" * 60 + "[/dim]")
     console.print()
@@ -54,24 +85,78 @@ def render(result: StandupResult):
         )
         console.print()
 
-    # summary - clean, no box
     console.print("[dim]" + "─" * 60 + "[/dim]")
     console.print()
-    console.print(f"  {result.llm_response.summary}")
 
+
+def render_summary(llm_response: "LLMResponse"):
+    # summary - clean, no box
+    console.print(f"  {llm_response.summary}")
+    render_summary_tail(llm_response)
+
+
+def render_summary_tail(llm_response: "LLMResponse"):
     # wip summary from llm
-    if result.llm_response.wip_summary:
+    if llm_response.wip_summary:
         console.print()
         console.print(
-            f"  [magenta]Currently working on:[/magenta] {result.llm_response.wip_summary}"
+            f"  [magenta]Currently working on:[/magenta] {llm_response.wip_summary}"
         )
 
     console.print()
-    console.print(f"  [dim italic]{result.llm_response.roast}[/dim italic]")
+    console.print(f"  [dim italic]{llm_response.roast}[/dim italic]")
     console.print()
 
 
-def render_repo(repo: RepoSummary):
+class SummaryStream:
+    # prints the summary as tokens arrive, wip summary and roast once done
+    # (they come after the summary on screen, and the roast streams first)
+
+    def __init__(self):
+        self.started = False
+
+    def update(self, field: str, text: str):
+        if field != "summary":
+            return
+        if not self.started:
+            console.print("  ", end="")
+            self.started = True
+        console.print(text, end="", markup=False, highlight=False, soft_wrap=True)
+
+    def finish(self, llm_response: "LLMResponse"):
+        if not self.started:
+            render_summary(llm_response)
+            return
+        console.print()
+        render_summary_tail(llm_response)
+
+
+def render_fallback(reason: str, stream: "SummaryStream | None" = None):
+    # on stderr, the offline summary that follows is the real output
+    if stream and stream.started:
+        console.print()
+    print(
+        f"  {YELLOW}LLM {reason}, summarizing offline{RESET}",
+        file=sys.stderr,
+    )
+
+
+def render_week(week_days: list[str]):
+    # one box per day since monday, filled when there were commits
+    today = datetime.now().date()
+    monday = today - timedelta(days=today.weekday())
+    boxes = []
+    for i in range(today.weekday() + 1):
+        day = monday + timedelta(days=i)
+        label = day.strftime("%a")[0]
+        if day.isoformat() in week_days:
+            boxes.append(f"{label}[green]■[/green]")
+        else:
+            boxes.append(f"[dim]{label}□[/dim]")
+    console.print(f"  [dim]this week[/dim] {' '.join(boxes)}")
+
+
+def render_repo(repo: "RepoSummary"):
     # repo header line
     commit_count = len(repo.commits)
     branch_str = f" ({repo.branch})" if repo.branch else ""
@@ -88,7 +173,7 @@ def render_repo(repo: RepoSummary):
     console.print()
 
 
-def render_wip(wip_list: list[WipSummary]):
+def render_wip(wip_list: list["WipSummary"]):
     console.print("   [bold magenta][wip][/bold magenta]")
     for wip in wip_list:
         console.print(
@@ -103,8 +188,97 @@ def render_wip(wip_list: list[WipSummary]):
     console.print()
 
 
+def render_team(members: list):
+    # (name, result, error) per member, in the order they were asked for
+    date_str = datetime.now().strftime("%b %d, %Y")
+    console.print()
+    console.print(
+        f"[bold cyan]PREVIOUSLY ON YOUR TEAM...[/bold cyan]  [dim]{date_str}[/dim]"
+    )
+    for name, result, error in members:
+        console.print("[dim]" + "─" * 60 + "[/dim]")
+        if error is not None:
+            console.print(f"[bold]{name}[/bold]  [red]LLM error: {error}[/red]")
+            continue
+        commits = sum(len(r.commits) for r in result.repos)
+        console.print(f"[bold]{name}[/bold]  [dim]{commits} commits[/dim]")
+        console.print()
+        if not result.repos:
+            console.print("  [dim]no commits[/dim]")
+            console.print()
+            continue
+        for repo in result.repos:
+            render_repo(repo)
+        render_summary(result.llm_response)
+
+
 def render_spending(total: float):
-    console.print(f"[dim]Total API spending: ${total:.6f}[/dim]")
+    print(f"{DIM}Total API spending: ${total:.6f}{RESET}")
+
+
+def render_spending_breakdown(rows: dict[str, float]):
+    width = max((len(k) for k in rows), default=0)
+    for key, cost in rows.items():
+        print(f"  {key:<{width}}  {DIM}${cost:.6f}{RESET}")
+
+
+def render_history(entries: list["HistoryEntry"]):
+    for entry in entries:
+        print(f"{DIM}{entry.generated_at}{RESET}")
+        print(entry.summary)
+        print()
+
+
+def render_profile(summary: dict):
+    # plain table on stderr so it never mixes into --json output
+    out = sys.stderr
+    rows = [
+        (
+            name,
+            str(p["calls"]),
+            f"{p['seconds'] * 1000:.1f}",
+            str(p["subprocesses"]),
+            str(p["bytes"]),
+        )
+        for name, p in summary["phases"].items()
+    ]
+    header = ("phase", "calls", "ms", "procs", "git bytes")
+    total = (
+        "total",
+        "",
+        f"{summary['wall_seconds'] * 1000:.1f}",
+        str(summary["subprocesses"]),
+        str(summary["bytes_read"]),
+    )
+    widths = [max(len(r[i]) for r in [header, total, *rows]) for i in range(5)]
+
+    def line(row):
+        cells = [row[0].ljust(widths[0])]
+        cells += [cell.rjust(width) for cell, width in zip(row[1:], widths[1:])]
+        return "  " + "  ".join(cells)
+
+    print(file=out)
+    print(f"{DIM}{line(header)}{RESET}", file=out)
+    for row in rows:
+        print(line(row), file=out)
+    print(f"{BOLD}{line(total)}{RESET}", file=out)
+
+    tokens = summary["tokens"]
+    if tokens:
+        print(
+            f"  {DIM}tokens:{RESET} {tokens.get('prompt_tokens', 0)} prompt, "
+            f"{tokens.get('completion_tokens', 0)} completion",
+            file=out,
+        )
+    if summary["slowest_repos"]:
+        print(f"  {DIM}slowest repos (time in git):{RESET}", file=out)
+        for i, repo in enumerate(summary["slowest_repos"]):
+            color = YELLOW if i == 0 else ""
+            print(
+                f"    {color}{repo['seconds'] * 1000:8.1f} ms{RESET}  {repo['repo']}"
+                f"  {DIM}({repo['calls']} git calls){RESET}",
+                file=out,
+            )
 
 
 def render_copied():
@@ -1,24 +1,117 @@
 import os
 import subprocess
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
 
+from . import gitdir, profiling
 
-def find_git_repos(start_path):
+# directories that hold dependencies or build output, never repos worth scanning
+SKIP_DIRS = frozenset(
+    {
+        "node_modules",
+        "bower_components",
+        ".venv",
+        "venv",
+        "__pycache__",
+        ".tox",
+        ".nox",
+        ".mypy_cache",
+        ".pytest_cache",
+        ".ruff_cache",
+        ".gradle",
+        ".next",
+        ".terraform",
+        "target",
+        "build",
+        "dist",
+    }
+)
+
+
+def find_git_repos(
+    start_path,
+    max_depth: int | None = None,
+    nested: bool = False,
+    skip_dirs=(),
+    follow_symlinks: bool = False,
+    one_filesystem: bool = False,
+    dir_mtimes: dict | None = None,
+):
     # find all git repositories in directory and subdirectories
+    # stops descending once a repo is found unless nested is set
+    # dir_mtimes (if given) is filled with the mtime of every non-repo dir scanned
+    skip = frozenset(skip_dirs)
+    try:
+        root_stat = os.stat(start_path)
+    except OSError:
+        return []
+
     repos = []
-    for root, dirs, files in os.walk(start_path):
-        if ".git" in dirs:
-            repos.append(root)
-            # skip searching inside .git folders
-            dirs[:] = [d for d in dirs if d != ".git"]
+    seen = {(root_stat.st_dev, root_stat.st_ino)}
+    stack = [(start_path, 0)]
+    while stack:
+        path, depth = stack.pop()
+        try:
+            with os.scandir(path) as it:
+                entries = list(it)
+            mtime = os.stat(path).st_mtime if dir_mtimes is not None else 0.0
+        except OSError:
+            continue
+
+        is_repo = False
+        subdirs = []
+        for entry in entries:
+            if entry.name == ".git":
+                # a .git file means a worktree or submodule, still a repo
+                is_repo = True
+                continue
+            if entry.name in skip:
+                continue
+            # a repo can be named build or dist too, only skip the dir when
+            # it isn't one
+            if entry.name in SKIP_DIRS and not os.path.lexists(
+                os.path.join(entry.path, ".git")
+            ):
+                continue
+            try:
+                if not entry.is_dir(follow_symlinks=follow_symlinks):
+                    continue
+                if follow_symlinks or one_filesystem:
+                    st = entry.stat(follow_symlinks=follow_symlinks)
+                    if one_filesystem and st.st_dev != root_stat.st_dev:
+                        continue
+                    # symlinks can loop back onto the tree
+                    if (st.st_dev, st.st_ino) in seen:
+                        continue
+                    seen.add((st.st_dev, st.st_ino))
+            except OSError:
+                continue
+            subdirs.append(entry.path)
+
+        if is_repo:
+            repos.append(path)
+            if not nested:
+                continue
+        # repo working trees churn constantly, only track the dirs around them
+        if dir_mtimes is not None:
+            dir_mtimes[path] = mtime
+        if max_depth is not None and depth >= max_depth:
+            continue
+        # push in reverse so repos come out in sorted order
+        for sub in sorted(subdirs, reverse=True):
+            stack.append((sub, depth + 1))
     return repos
 
 
 def get_git_user():
     # fetch configured git user name
+    started = profiling.now()
     try:
         user = subprocess.check_output(["git", "config", "user.name"]).decode().strip()
     except subprocess.CalledProcessError:
         user = None
+    profiling.record_git("git config", None, started, user)
     return user
 
 
@@ -57,131 +150,305 @@ def get_git_status():
     return status
 
 
-def get_git_commits(repo_path, author, start_date):
-    # fetch git commits for author and date range
-    # format: hash|message|date|iso_time
-    try:
-        commits = (
-            subprocess.check_output(
-                [
-                    "git",
-                    "log",
-                    "--author",
-                    author,
-                    "--since",
-                    start_date,
-                    "--pretty=format:%h|%s|%ad|%aI",
-                    "--date=short",
-                ],
-                cwd=repo_path,
-            )
-            .decode()
-            .strip()
-        )
-    except subprocess.CalledProcessError:
-        commits = None
+def get_git_commits(
+    repo_path: str, author: str, start_date: str
+) -> list["CommitRecord"] | None:
+    # author's commits since start_date ("1 day ago", a date), streamed from
+    # git log. None when git fails (not a repo)
+    started = profiling.now()
+    proc = subprocess.Popen(
+        [
+            "git",
+            "log",
+            "-z",
+            "--author",
+            author,
+            "--since",
+            start_date,
+            f"--pretty=format:{LOG_FORMAT}",
+            "--date=short",
+        ],
+        cwd=repo_path,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    commits = [
+        CommitRecord(*fields[:4], author=fields[5])
+        for fields in read_log(proc, repo_path, started)
+        if len(fields) == 6
+    ]
+    if proc.returncode != 0:
+        return None
     return commits
 
 
-def get_git_diff(repo_path: str) -> str:
+def get_git_diff(
+    repo_path: str, max_bytes: int | None = None, exclude: list[str] | None = None
+) -> str:
     # get uncommitted changes (staged + unstaged)
-    try:
-        diff = (
-            subprocess.check_output(
-                ["git", "diff", "HEAD"],
-                cwd=repo_path,
-                stderr=subprocess.DEVNULL,
+    # with max_bytes the diff is streamed: --numstat picks the files first
+    # (smallest changes first while they fit, binaries dropped) and git is
+    # killed once max_bytes have been read, so huge working trees cost the
+    # same as small ones
+    if max_bytes is None and not exclude:
+        try:
+            diff = (
+                subprocess.check_output(
+                    ["git", "diff", "HEAD"],
+                    cwd=repo_path,
+                    stderr=subprocess.DEVNULL,
+                )
+                .decode(errors="replace")
+                .strip()
             )
-            .decode(errors="replace")
-            .strip()
-        )
-    except subprocess.CalledProcessError:
-        diff = ""
-    return diff
+        except subprocess.CalledProcessError:
+            diff = ""
+        return diff
+
+    # pathspecs are anchored at the repo root (top) like numstat's paths
+    excludes = [f":(top,exclude,glob){pattern}" for pattern in exclude or []]
+    paths = pick_diff_paths(repo_path, excludes, max_bytes)
+    if not paths:
+        return ""
+    args = ["git", "diff", "HEAD", "--", *(f":(top,literal){p}" for p in paths)]
+    return read_bounded(args, repo_path, max_bytes).strip()
+
 
+# rough bytes of unified diff per changed line, for sizing --numstat output
+DIFF_BYTES_PER_LINE = 60
+# keep the pathspec list well under command line limits (windows: 32k)
+MAX_PATHSPEC_CHARS = 16_000
 
-def get_git_diff_stat(repo_path: str) -> list[str]:
-    # get file change summary (M/A/D with filenames)
+
+def pick_diff_paths(
+    repo_path: str, excludes: list[str], max_bytes: int | None
+) -> list[str]:
+    # changed text files from --numstat, smallest first, about max_bytes worth
+    started = profiling.now()
     try:
-        status = (
-            subprocess.check_output(
-                ["git", "status", "--porcelain"],
-                cwd=repo_path,
-            )
-            .decode()
-            .strip()
+        raw = subprocess.check_output(
+            ["git", "diff", "HEAD", "--numstat", "-z", "--", ":(top)", *excludes],
+            cwd=repo_path,
+            stderr=subprocess.DEVNULL,
         )
     except subprocess.CalledProcessError:
+        profiling.record_git("git numstat", repo_path, started, b"")
         return []
+    profiling.record_git("git numstat", repo_path, started, raw)
+    output = raw.decode(errors="replace")
 
-    if not status:
-        return []
+    changed = []
+    fields = iter(output.split("\0"))
+    for entry in fields:
+        if not entry:
+            continue
+        added, deleted, path = entry.split("\t", 2)
+        if not path:
+            # rename: "added<TAB>deleted<TAB>" then old and new path
+            next(fields, None)
+            path = next(fields, "")
+        if added == "-" or not path:
+            # binary file
+            continue
+        changed.append((int(added) + int(deleted), path))
 
-    files = []
-    for line in status.split("\n"):
-        if line.strip():
-            files.append(line.strip())
-    return files
+    changed.sort()
+    paths = []
+    estimate = 0
+    chars = 0
+    for lines, path in changed:
+        size = lines * DIFF_BYTES_PER_LINE
+        # git prints files in path order, so a file that can't fit would
+        # crowd out everything after it; only the first may run over
+        if paths and max_bytes is not None and estimate + size > max_bytes:
+            break
+        if chars + len(path) > MAX_PATHSPEC_CHARS:
+            break
+        paths.append(path)
+        estimate += size
+        chars += len(path) + 15
+    return paths
 
 
-def get_current_branch(repo_path: str) -> str:
-    # get current branch name
+def read_bounded(args: list[str], cwd: str, max_bytes: int | None) -> str:
+    # read a command's stdout, killing it once max_bytes have arrived
+    started = profiling.now()
+    proc = subprocess.Popen(
+        args, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+    chunks = []
+    total = 0
+    truncated = False
     try:
-        branch = (
-            subprocess.check_output(
-                ["git", "rev-parse", "--abbrev-ref", "HEAD"],
-                cwd=repo_path,
-            )
-            .decode()
-            .strip()
+        while True:
+            chunk = proc.stdout.read1(64 * 1024)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            total += len(chunk)
+            if max_bytes is not None and total >= max_bytes:
+                truncated = True
+                break
+    finally:
+        if truncated:
+            proc.kill()
+        proc.stdout.close()
+        proc.wait()
+        profiling.record(
+            " ".join(args[:2]), cwd, started, subprocesses=1, bytes_read=total
         )
-    except subprocess.CalledProcessError:
-        branch = ""
-    return branch
 
+    data = b"".join(chunks)
+    if truncated:
+        # drop the partial last line
+        data = data[:max_bytes]
+        data = data[: data.rfind(b"\n") + 1]
+    elif proc.returncode != 0:
+        return ""
+    return data.decode(errors="replace")
+
+
+def calculate_streak(dates: set[str]) -> int:
+    # count consecutive YYYY-MM-DD days in dates, from today backwards
+    streak = 0
+    check_date = datetime.now().date()
+    while check_date.strftime("%Y-%m-%d") in dates:
+        streak += 1
+        check_date -= timedelta(days=1)
+    return streak
+
+
+@dataclass(slots=True)
+class CommitRecord:
+    hash: str
+    message: str
+    date: str
+    time: str
+    # "Name <email>" after .mailmap
+    author: str = ""
+
+
+@dataclass(slots=True)
+class RepoSnapshot:
+    branch: str = ""
+    status: list[str] = field(default_factory=list)
+    commits: list[CommitRecord] = field(default_factory=list)
+    # author dates (YYYY-MM-DD) of every commit logged, window or not
+    commit_dates: set[str] = field(default_factory=set)
+
+
+# with git log -z commits end in NUL and fields are split by the unit
+# separator, neither can appear in a subject (unlike "|" or a newline)
+LOG_FORMAT = "%h%x1f%s%x1f%ad%x1f%aI%x1f%ct%x1f%aN <%aE>"
 
-def get_commit_streak(repo_path: str, author: str) -> int:
-    # count consecutive days with commits (including today)
-    from datetime import datetime, timedelta
 
+def read_log(
+    proc: subprocess.Popen, repo_path: str, started: float
+) -> Iterator[list[str]]:
+    # each commit's fields as they come off a git log -z pipe, so the
+    # output is never held whole. reaps the process when done
+    total = 0
+    pending = b""
     try:
-        # get all commit dates for author in last 30 days
-        output = (
-            subprocess.check_output(
-                [
-                    "git",
-                    "log",
-                    "--author",
-                    author,
-                    "--since",
-                    "30 days ago",
-                    "--pretty=format:%ad",
-                    "--date=short",
-                ],
-                cwd=repo_path,
-            )
-            .decode()
-            .strip()
+        while chunk := proc.stdout.read1(64 * 1024):
+            total += len(chunk)
+            *records, pending = (pending + chunk).split(b"\0")
+            for record in records:
+                yield record.decode(errors="replace").split("\x1f")
+        if pending:
+            yield pending.decode(errors="replace").split("\x1f")
+    finally:
+        proc.stdout.close()
+        proc.wait()
+        profiling.record(
+            "git log", repo_path, started, subprocesses=1, bytes_read=total
         )
-    except subprocess.CalledProcessError:
-        return 0
 
-    if not output:
-        return 0
 
-    # get unique dates
-    dates = set(output.split("\n"))
-    today = datetime.now().date()
+def get_repo_snapshot(
+    repo_path: str,
+    author: str | None,
+    since: float,
+    dates_since: float | None = None,
+    log: bool = True,
+) -> RepoSnapshot:
+    # branch, status, window commits and streak dates from at most two git
+    # processes (one when the reflog shows nothing happened)
+    # status and log run concurrently, the log reaches back to dates_since
+    # when that is earlier so streak dates need no extra pass
+    # author None logs everyone, for splitting by author afterwards
+    log_since = since if dates_since is None else min(since, dates_since)
+    # the reflog can prove there is nothing to log without spawning git
+    # (and without log the caller has the commits from elsewhere)
+    skip_log = not log
+    if log:
+        started = profiling.now()
+        skip_log = gitdir.has_commits_since(repo_path, author or "", log_since) is False
+        profiling.record("reflog", repo_path, started)
 
-    # count streak from today backwards
-    streak = 0
-    check_date = today
-    while True:
-        date_str = check_date.strftime("%Y-%m-%d")
-        if date_str in dates:
-            streak += 1
-            check_date -= timedelta(days=1)
-        else:
-            break
+    status_started = profiling.now()
+    status_proc = subprocess.Popen(
+        ["git", "status", "--porcelain=v2", "--branch"],
+        cwd=repo_path,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    log_proc = None
+    if not skip_log:
+        log_args = ["git", "log"]
+        if author is not None:
+            log_args += ["--author", author]
+        # git reads @0 as "now", so leave --since off for an unbounded window
+        if log_since >= 1:
+            log_args.append(f"--since=@{int(log_since)}")
+        log_started = profiling.now()
+        log_proc = subprocess.Popen(
+            [*log_args, "-z", f"--pretty=format:{LOG_FORMAT}", "--date=short"],
+            cwd=repo_path,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+    status_out, _ = status_proc.communicate()
+    profiling.record_git("git status", repo_path, status_started, status_out)
 
-    return streak
+    snapshot = RepoSnapshot()
+    if status_proc.returncode == 0:
+        snapshot.branch, snapshot.status = parse_status_v2(
+            status_out.decode(errors="replace")
+        )
+    if log_proc is None:
+        return snapshot
+    for fields in read_log(log_proc, repo_path, log_started):
+        if len(fields) != 6:
+            continue
+        snapshot.commit_dates.add(fields[2])
+        if int(fields[4]) >= since:
+            snapshot.commits.append(CommitRecord(*fields[:4], author=fields[5]))
+    return snapshot
+
+
+def parse_status_v2(output: str) -> tuple[str, list[str]]:
+    # turn porcelain v2 output into (branch, v1-style "XY path" entries)
+    branch = ""
+    files = []
+    for line in output.split("\n"):
+        if line.startswith("# branch.head "):
+            branch = line[len("# branch.head ") :]
+            # match rev-parse --abbrev-ref for a detached head
+            if branch == "(detached)":
+                branch = "HEAD"
+        elif line.startswith(("1 ", "u ")):
+            parts = line.split(" ", 10 if line[0] == "u" else 8)
+            files.append(f"{_status_code(parts[1])} {parts[-1]}")
+        elif line.startswith("2 "):
+            parts = line.split(" ", 9)
+            path, orig = parts[-1].split("\t", 1)
+            files.append(f"{_status_code(parts[1])} {orig} -> {path}")
+        elif line.startswith("? "):
+            files.append(f"?? {line[2:]}")
+    return branch, files
+
+
+def _status_code(xy: str) -> str:
+    # v2 uses "." for unchanged, v1 uses a space (which we strip)
+    return xy.replace(".", " ").strip()
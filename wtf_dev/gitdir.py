@@ -0,0 +1,217 @@
+import mmap
+import os
+import re
+
+# reads .git metadata directly so inactive repos cost no git process.
+# every answer can be None, meaning "can't tell, ask git instead".
+
+
+def resolve_git_dir(repo_path: str) -> str | None:
+    # .git is usually a dir, but worktrees and submodules use a "gitdir:" file
+    dot_git = os.path.join(repo_path, ".git")
+    if os.path.isdir(dot_git):
+        return dot_git
+    try:
+        with open(dot_git, encoding="utf-8") as f:
+            line = f.readline().strip()
+    except OSError:
+        return None
+    if not line.startswith("gitdir:"):
+        return None
+    return os.path.join(repo_path, line[len("gitdir:") :].strip())
+
+
+def plain_git_dir(repo_path: str) -> str | None:
+    # only trust the simple layout: a real .git dir that isn't a linked
+    # worktree, with refs stored as files
+    git_dir = os.path.join(repo_path, ".git")
+    if not os.path.isdir(git_dir):
+        return None
+    if os.path.exists(os.path.join(git_dir, "commondir")):
+        return None
+    if not _files_ref_storage(git_dir):
+        return None
+    return git_dir
+
+
+def read_head(git_dir: str) -> tuple[str | None, str | None]:
+    # (symbolic ref, None) on a branch, (None, sha) when detached
+    try:
+        with open(os.path.join(git_dir, "HEAD"), encoding="utf-8") as f:
+            head = f.read().strip()
+    except OSError:
+        return None, None
+    if head.startswith("ref: "):
+        return head[len("ref: ") :], None
+    return None, head or None
+
+
+def resolve_ref(git_dir: str, ref: str) -> str | None:
+    # loose ref file first, then packed-refs
+    try:
+        with open(os.path.join(git_dir, *ref.split("/")), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        pass
+    try:
+        with open(os.path.join(git_dir, "packed-refs"), encoding="utf-8") as f:
+            for line in f:
+                if line.startswith(("#", "^")):
+                    continue
+                sha, _, name = line.rstrip("\n").partition(" ")
+                if name == ref:
+                    return sha
+    except OSError:
+        pass
+    return None
+
+
+def has_commits_since(repo_path: str, author: str, since: float) -> bool | None:
+    # answer "did this author commit here since `since`?" from the reflogs
+    # False: nothing moved HEAD or the branch since then, so no new commits
+    # True: a commit by someone matching author was recorded since then
+    # None: something else happened (checkout, pull, rebase...) or no reflog
+    git_dir = plain_git_dir(repo_path)
+    if git_dir is None or not _logs_all_ref_updates(git_dir):
+        return None
+
+    ref, _ = read_head(git_dir)
+    if ref is not None and resolve_ref(git_dir, ref) is None:
+        # an unborn branch in a repo that never had a commit. any other ref
+        # we can't find is stored somewhere we don't read
+        if _is_empty(os.path.join(git_dir, "logs", "HEAD")):
+            return False
+        return None
+
+    logs = [os.path.join(git_dir, "logs", "HEAD")]
+    if ref is not None:
+        logs.append(os.path.join(git_dir, "logs", *ref.split("/")))
+
+    author_re = _author_pattern(author)
+    moved = False
+    for path in logs:
+        if not os.path.exists(path):
+            return None
+        for identity, message in reflog_since(path, since):
+            if message.startswith(b"commit") and author_re.search(identity):
+                return True
+            moved = True
+    return None if moved else False
+
+
+# reflog messages of operations that only add commits made right here.
+# "commit (merge)" is a merge finished by hand after conflicts, it can bring
+# in fetched commits like any other merge
+LOCAL_COMMIT_MESSAGES = (b"commit", b"cherry-pick", b"revert")
+MERGE_COMMIT_MESSAGE = b"commit (merge)"
+
+
+def only_local_commits_since(repo_path: str, since: float) -> bool:
+    # True when everything HEAD did since `since` was committing on this
+    # machine, so nothing came in that commit hooks wouldn't have seen
+    # (pulls, merges, rebases, checkouts and resets all make this False)
+    git_dir = plain_git_dir(repo_path)
+    if git_dir is None or not _logs_all_ref_updates(git_dir):
+        return False
+    path = os.path.join(git_dir, "logs", "HEAD")
+    if not os.path.exists(path):
+        return False
+    for _, message in reflog_since(path, since):
+        if not message.startswith(LOCAL_COMMIT_MESSAGES):
+            return False
+        if message.startswith(MERGE_COMMIT_MESSAGE):
+            return False
+    return True
+
+
+def own_hooks_path(repo_path: str) -> bool:
+    # True when the repo sets core.hooksPath itself (husky and friends),
+    # which wins over a global one. True as well when we can't tell
+    git_dir = plain_git_dir(repo_path)
+    if git_dir is None:
+        return True
+    config = _read_config(git_dir)
+    return bool(re.search(r"^\s*hookspath\s*=", config, re.MULTILINE))
+
+
+def reflog_since(path: str, since: float):
+    # yield (identity, message) newest first, stopping at the first older entry
+    for line in reverse_lines(path):
+        entry = parse_reflog_line(line)
+        if entry is None:
+            continue
+        identity, timestamp, message = entry
+        if timestamp < since:
+            return
+        yield identity.decode(errors="replace"), message
+
+
+def reverse_lines(path: str):
+    # yield a file's lines last to first, without their newlines
+    # the file is memory-mapped and walked backwards, so long logs stay cheap
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            end = size
+            while end > 0 and mm[end - 1] == 0x0A:
+                end -= 1
+            while end > 0:
+                start = mm.rfind(b"\n", 0, end) + 1
+                yield mm[start:end]
+                end = start - 1
+
+
+def parse_reflog_line(line: bytes) -> tuple[bytes, int, bytes] | None:
+    # "<old> <new> Name <email> <timestamp> <tz>\t<message>"
+    head, _, message = line.partition(b"\t")
+    parts = head.split(b" ", 2)
+    if len(parts) != 3:
+        return None
+    who = parts[2].rsplit(b" ", 2)
+    if len(who) != 3:
+        return None
+    try:
+        return who[0], int(who[1]), message
+    except ValueError:
+        return None
+
+
+def _read_config(git_dir: str) -> str:
+    # the repo's own config, lowercased, "" when there is none
+    try:
+        with open(os.path.join(git_dir, "config"), encoding="utf-8") as f:
+            return f.read().lower()
+    except OSError:
+        return ""
+
+
+def _logs_all_ref_updates(git_dir: str) -> bool:
+    # a stale reflog would make every repo look idle
+    config = _read_config(git_dir)
+    return not re.search(r"logallrefupdates\s*=\s*false", config)
+
+
+def _files_ref_storage(git_dir: str) -> bool:
+    # reftable repos (extensions.refStorage) keep refs and reflogs in binary
+    # tables, HEAD and refs/ are only placeholders there
+    if os.path.isdir(os.path.join(git_dir, "reftable")):
+        return False
+    config = _read_config(git_dir)
+    return not re.search(r"^\s*refstorage\s*=", config, re.MULTILINE)
+
+
+def _is_empty(path: str) -> bool:
+    try:
+        return os.path.getsize(path) == 0
+    except OSError:
+        return True
+
+
+def _author_pattern(author: str) -> re.Pattern:
+    # git log --author takes a regex, fall back to a literal match
+    try:
+        return re.compile(author)
+    except re.error:
+        return re.compile(re.escape(author))
@@ -0,0 +1,128 @@
+import re
+from collections import Counter
+from pathlib import PurePosixPath
+
+from .models import LLMResponse, StandupResult
+
+# type(scope)!: subject
+CONVENTIONAL_RE = re.compile(r"^(\w+)(?:\(([^)]*)\))?!?:\s*(.+)$")
+
+# how each conventional type reads in a sentence, in the order they're listed
+KINDS = {
+    "feat": ("feature", "features"),
+    "fix": ("fix", "fixes"),
+    "perf": ("performance tweak", "performance tweaks"),
+    "refactor": ("refactor", "refactors"),
+    "test": ("test change", "test changes"),
+    "docs": ("docs change", "docs changes"),
+    "build": ("build change", "build changes"),
+    "ci": ("CI change", "CI changes"),
+    "chore": ("chore", "chores"),
+    "revert": ("revert", "reverts"),
+}
+KIND_ALIASES = {"feature": "feat", "bugfix": "fix", "hotfix": "fix", "tests": "test"}
+
+VAGUE_MESSAGES = frozenset(
+    {"wip", "fix", "fixes", "update", "updates", "changes", "stuff", "misc", "tmp"}
+)
+
+
+def parse(message: str) -> tuple[str | None, str | None, str]:
+    # (type, scope, subject), type None for non-conventional messages
+    match = CONVENTIONAL_RE.match(message.strip())
+    if not match:
+        return None, None, message.strip()
+    kind = match.group(1).lower()
+    kind = KIND_ALIASES.get(kind, kind)
+    if kind not in KINDS:
+        return None, None, message.strip()
+    return kind, match.group(2) or None, match.group(3)
+
+
+def summarize(result: StandupResult) -> LLMResponse:
+    # a rough standup from the commits, wip and stats alone, no network
+    return LLMResponse(
+        summary=summary_text(result),
+        roast=roast_text(result),
+        wip_summary=wip_text(result),
+    )
+
+
+def summary_text(result: StandupResult) -> str:
+    commits = [c for r in result.repos for c in r.commits]
+    if not commits:
+        return "No commits in this window."
+    parsed = [parse(c.message) for c in commits]
+    kinds = Counter(kind for kind, _, _ in parsed if kind)
+    other = len(parsed) - sum(kinds.values())
+
+    counts = [plural(kinds[kind], *KINDS[kind]) for kind in KINDS if kinds.get(kind)]
+    if other:
+        counts.append(plural(other, "other commit", "other commits"))
+    repos = [r.name for r in result.repos if r.commits]
+    where = f"in {repos[0]}" if len(repos) == 1 else f"across {len(repos)} repos"
+    first = join(counts)
+    sentences = [f"{first[:1].upper()}{first[1:]} {where}."]
+
+    scopes = Counter(scope for _, scope, _ in parsed if scope)
+    if scopes:
+        top = [scope for scope, _ in scopes.most_common(3)]
+        sentences.append(f"Mostly around {join(top)}.")
+
+    # newest feature, else the newest commit, as the headline
+    headline = next((s for k, _, s in parsed if k == "feat"), parsed[0][2])
+    sentences.append(f"Latest: {headline.rstrip('.')}.")
+    return " ".join(sentences)
+
+
+def roast_text(result: StandupResult) -> str:
+    # first rule that fires wins, so the same run always gets the same line
+    commits = [c for r in result.repos for c in r.commits]
+    stats = result.time_stats
+    kinds = Counter(parse(c.message)[0] for c in commits)
+    vague = [c for c in commits if c.message.strip().lower() in VAGUE_MESSAGES]
+    repos = [r for r in result.repos if r.commits]
+
+    if stats and stats.late_night_commits:
+        n = stats.late_night_commits
+        return f"{plural(n, 'commit', 'commits')} after 10pm. Sleep is also a feature."
+    if kinds["fix"] >= 3 and kinds["fix"] > kinds["feat"]:
+        return (
+            f"{kinds['fix']} fixes and {kinds['feat']} features. The bugs are winning."
+        )
+    if len(vague) >= 2:
+        return f'"{vague[0].message.strip()}" is not a commit message, twice over.'
+    if len(repos) >= 4:
+        return f"{len(repos)} repos in one standup. Focus is a myth anyway."
+    if result.streak >= 7:
+        return f"{result.streak} day streak. Grass misses you."
+    if not commits:
+        return "Nothing committed. Bold strategy."
+    return "Clean, steady, suspiciously reasonable."
+
+
+def wip_text(result: StandupResult) -> str:
+    # where the uncommitted files are, by top directory
+    files = [
+        (wip.repo_name, line.split(" ", 1)[-1])
+        for wip in result.wip
+        for line in wip.files_changed
+    ]
+    if not files:
+        return ""
+    dirs = Counter(
+        f"{repo}/{PurePosixPath(path).parts[0]}" if "/" in path else repo
+        for repo, path in files
+    )
+    top = [d for d, _ in dirs.most_common(2)]
+    return f"{plural(len(files), 'uncommitted file', 'uncommitted files')}, mostly in {join(top)}."
+
+
+def plural(n: int, one: str, many: str) -> str:
+    return f"{n} {one if n == 1 else many}"
+
+
+def join(items: list[str]) -> str:
+    if len(items) <= 1:
+        return "".join(items)
+    return f"{', '.join(items[:-1])} and {items[-1]}"
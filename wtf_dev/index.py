@@ -0,0 +1,119 @@
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+from . import storage
+from .git import find_git_repos
+from .gitdir import resolve_git_dir
+
+INDEX_FILE = storage.WTF_DIR / "index.json"
+# 2: repos is a plain list, activity is checked live with fingerprint()
+INDEX_VERSION = 2
+
+# files and dirs git always touches when something happens in a repo
+ACTIVITY_PATHS = ("HEAD", "index", "logs/HEAD", "refs", "refs/heads", "packed-refs")
+
+# find_git_repos defaults, so partial option sets still match the stored entry
+DEFAULT_OPTIONS = {
+    "max_depth": None,
+    "nested": False,
+    "skip_dirs": [],
+    "follow_symlinks": False,
+    "one_filesystem": False,
+}
+
+
+def fingerprint(repo_path: str) -> float:
+    # latest mtime across git's activity files, 0.0 if none exist
+    git_dir = resolve_git_dir(repo_path)
+    if git_dir is None:
+        return 0.0
+    latest = 0.0
+    for name in ACTIVITY_PATHS:
+        try:
+            latest = max(latest, os.stat(os.path.join(git_dir, name)).st_mtime)
+        except OSError:
+            continue
+    return latest
+
+
+def fingerprints(scan_path: str, **options) -> dict[str, float]:
+    # every indexed repo under scan_path by its fingerprint right now
+    return {r: fingerprint(r) for r in load_repos(scan_path, **options)}
+
+
+def changed(fingerprints: dict[str, float]) -> bool:
+    # true if git touched any of the repos since the fingerprints were taken
+    return any(fingerprint(r) != fp for r, fp in fingerprints.items())
+
+
+def active_since(repo_path: str, since: float) -> bool:
+    # true if git touched the repo at or after the given timestamp
+    return fingerprint(repo_path) >= since
+
+
+def load_index() -> dict:
+    if not INDEX_FILE.exists():
+        return {"version": INDEX_VERSION, "roots": {}}
+    try:
+        data = json.loads(INDEX_FILE.read_text(encoding="utf-8"))
+    except Exception:
+        return {"version": INDEX_VERSION, "roots": {}}
+    if data.get("version") != INDEX_VERSION:
+        return {"version": INDEX_VERSION, "roots": {}}
+    return data
+
+
+def save_index(data: dict):
+    storage.init_storage()
+    storage.write_atomic(INDEX_FILE, json.dumps(data))
+
+
+def is_stale(entry: dict, options: dict) -> bool:
+    # any scanned dir changing means repos may have been added or removed
+    if entry.get("options") != options:
+        return True
+    for path, mtime in entry.get("dirs", {}).items():
+        try:
+            if os.stat(path).st_mtime != mtime:
+                return True
+        except OSError:
+            return True
+    return False
+
+
+def build_entry(scan_path: str, options: dict) -> dict:
+    dir_mtimes = {}
+    repos = find_git_repos(scan_path, dir_mtimes=dir_mtimes, **options)
+    return {
+        "built_at": datetime.now().isoformat(),
+        "options": options,
+        "dirs": {os.path.abspath(d): m for d, m in dir_mtimes.items()},
+        "repos": [_relative(r, scan_path) for r in repos],
+    }
+
+
+def load_repos(scan_path: str, rebuild: bool = False, **options) -> list[str]:
+    # repos under scan_path, served from the index unless it's stale
+    options = {**DEFAULT_OPTIONS, **options}
+    options["skip_dirs"] = sorted(options["skip_dirs"] or [])
+    root = os.path.abspath(scan_path)
+    data = load_index()
+    entry = data["roots"].get(root)
+    if rebuild or entry is None or is_stale(entry, options):
+        entry = build_entry(scan_path, options)
+        data["roots"][root] = entry
+        save_index(data)
+    return [_join(scan_path, rel) for rel in entry["repos"]]
+
+
+def _relative(repo_path: str, scan_path: str) -> str:
+    return Path(os.path.relpath(repo_path, scan_path)).as_posix()
+
+
+def _join(scan_path: str, rel: str) -> str:
+    # mirror find_git_repos paths so output looks the same either way
+    if rel == ".":
+        return scan_path
+    return os.path.join(scan_path, *rel.split("/"))
@@ -0,0 +1,353 @@
+import json
+import os
+import subprocess
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from . import gitdir, storage
+from .git import CommitRecord
+
+# hooks that append to the journal. post-commit covers commits and picks,
+# post-rewrite swaps amended and rebased commits for their replacements.
+# merges, pulls and checkouts can bring in commits no hook saw, so repos
+# whose reflog shows one of those go back to git log
+HOOK_NAMES = ("post-commit", "post-rewrite")
+BEGIN_MARKER = "# >>> wtf journal >>>"
+END_MARKER = "# <<< wtf journal <<<"
+
+# one line per event, fields split by \x1f (it can't appear in a subject):
+# c, recorded at, repo, branch, %H, %h, %s, %an, %ae, %aI, %ct
+# r, recorded at, repo, old %H  (the commit was amended or rebased away)
+COMMIT_FORMAT = "%H%x1f%h%x1f%s%x1f%an%x1f%ae%x1f%aI%x1f%ct"
+
+HOOK_SCRIPT = f"""{BEGIN_MARKER}
+# appends this repo's new commits to the wtf journal, see `wtf hook`
+wtf_journal_commit() {{
+    printf 'c\\037%s\\037%s\\037%s\\037%s\\n' "$wtf_now" "$wtf_repo" "$wtf_branch" \\
+        "$(git log -1 --format='{COMMIT_FORMAT}' "$1")" >> "$wtf_journal"
+}}
+wtf_journal="${{WTF_JOURNAL:-$HOME/.wtf/journal.log}}"
+wtf_repo="$(git rev-parse --show-toplevel 2>/dev/null)"
+if [ -n "$wtf_repo" ] && [ -d "$(dirname "$wtf_journal")" ]; then
+    wtf_now="$(date +%s)"
+    wtf_branch="$(git symbolic-ref --short -q HEAD || echo HEAD)"
+    case "$(basename "$0")" in
+    post-commit)
+        wtf_journal_commit HEAD
+        ;;
+    post-rewrite)
+        # keep stdin readable for the rest of the hook
+        wtf_input="$(mktemp)"
+        cat > "$wtf_input"
+        while read -r wtf_old wtf_new wtf_rest; do
+            printf 'r\\037%s\\037%s\\037%s\\n' "$wtf_now" "$wtf_repo" "$wtf_old" \\
+                >> "$wtf_journal"
+            wtf_journal_commit "$wtf_new"
+        done < "$wtf_input"
+        exec < "$wtf_input"
+        rm -f "$wtf_input"
+        ;;
+    esac
+fi
+{END_MARKER}
+"""
+
+# with core.hooksPath set git skips .git/hooks, so the global hooks run the
+# repo's own hook afterwards and hand back its exit status. every hook git
+# knows gets one, or setting hooksPath would switch the repo's pre-commit,
+# commit-msg, pre-push and the rest off
+CHAIN_SCRIPT = """hook="$(git rev-parse --git-common-dir)/hooks/$(basename "$0")"
+if [ -x "$hook" ]; then
+    exec "$hook" "$@"
+fi
+"""
+CHAIN_SHIM = "#!/bin/sh\n" + CHAIN_SCRIPT
+CHAIN_NAMES = (
+    "applypatch-msg",
+    "pre-applypatch",
+    "post-applypatch",
+    "pre-commit",
+    "pre-merge-commit",
+    "prepare-commit-msg",
+    "commit-msg",
+    "post-commit",
+    "pre-rebase",
+    "post-checkout",
+    "post-merge",
+    "pre-push",
+    "pre-receive",
+    "update",
+    "proc-receive",
+    "post-receive",
+    "post-update",
+    "reference-transaction",
+    "push-to-checkout",
+    "pre-auto-gc",
+    "post-rewrite",
+    "sendemail-validate",
+    "post-index-change",
+    "p4-changelist",
+    "p4-prepare-changelist",
+    "p4-post-changelist",
+    "p4-pre-submit",
+)
+
+
+def journal_path() -> Path:
+    # resolved on every call so a patched WTF_DIR is respected
+    return storage.WTF_DIR / "journal.log"
+
+
+def hooks_file() -> Path:
+    # which repos (or "global") have the hooks, and since when
+    return storage.WTF_DIR / "hooks.json"
+
+
+def global_hooks_dir() -> Path:
+    return storage.WTF_DIR / "hooks"
+
+
+def load_hooks() -> dict:
+    try:
+        data = json.loads(hooks_file().read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {"global": None, "repos": {}}
+    data.setdefault("global", None)
+    data.setdefault("repos", {})
+    return data
+
+
+def save_hooks(data: dict):
+    storage.init_storage()
+    storage.write_atomic(hooks_file(), json.dumps(data, indent=2))
+
+
+def git_output(args: list[str], cwd: str | None = None) -> str | None:
+    try:
+        return (
+            subprocess.check_output(args, cwd=cwd, stderr=subprocess.DEVNULL)
+            .decode()
+            .strip()
+        )
+    except (subprocess.CalledProcessError, OSError):
+        return None
+
+
+def write_hook(path: Path, chain: bool = False):
+    # add the journal block to a hook, keeping whatever else it does
+    text = path.read_text(encoding="utf-8") if path.exists() else ""
+    if BEGIN_MARKER in text:
+        return
+    if not text:
+        text = "#!/bin/sh\n"
+    elif not (text.startswith("#!") and text.partition("\n")[0].endswith("sh")):
+        raise ValueError(f"{path} is not a shell script, add the hook by hand")
+    if not text.endswith("\n"):
+        text += "\n"
+    # before the rest of the hook, which may exit early
+    first_line, _, rest = text.partition("\n")
+    block = HOOK_SCRIPT + (CHAIN_SCRIPT if chain else "")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(f"{first_line}\n{block}{rest}", encoding="utf-8")
+    path.chmod(path.stat().st_mode | 0o111)
+
+
+def remove_hook(path: Path):
+    # take the journal block out again, and the file if nothing else is left
+    if not path.exists():
+        return
+    text = path.read_text(encoding="utf-8")
+    start = text.find(BEGIN_MARKER)
+    end = text.find(END_MARKER)
+    if start == -1 or end == -1:
+        return
+    end += len(END_MARKER) + 1
+    if text[end:].startswith(CHAIN_SCRIPT):
+        end += len(CHAIN_SCRIPT)
+    text = text[:start] + text[end:]
+    if "\n" not in text.strip():
+        # nothing but the shebang left
+        path.unlink()
+    else:
+        path.write_text(text, encoding="utf-8")
+
+
+def write_shim(path: Path):
+    # a hook that only runs the repo's own one
+    if path.exists():
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(CHAIN_SHIM, encoding="utf-8")
+    path.chmod(path.stat().st_mode | 0o111)
+
+
+def remove_shim(path: Path):
+    try:
+        if path.read_text(encoding="utf-8") == CHAIN_SHIM:
+            path.unlink()
+    except OSError:
+        pass
+
+
+def repo_hooks_dir(repo_path: str) -> tuple[str, Path] | None:
+    # (toplevel, hooks dir) for the repo at repo_path
+    top = git_output(["git", "rev-parse", "--show-toplevel"], cwd=repo_path)
+    hooks = git_output(["git", "rev-parse", "--git-path", "hooks"], cwd=repo_path)
+    if top is None or hooks is None:
+        return None
+    return os.path.realpath(top), Path(repo_path, hooks).resolve()
+
+
+def install(repo_path: str, now: float) -> str:
+    # hooks for one repo, returns the repo's toplevel
+    found = repo_hooks_dir(repo_path)
+    if found is None:
+        raise ValueError(f"{repo_path} is not a git repo")
+    top, hooks = found
+    for name in HOOK_NAMES:
+        write_hook(hooks / name)
+    data = load_hooks()
+    data["repos"].setdefault(top, {"installed_at": now, "hook": str(hooks)})
+    save_hooks(data)
+    return top
+
+
+def install_global(now: float) -> Path:
+    # hooks for every repo through core.hooksPath, or in the hooks dir the
+    # user already pointed it at
+    current = git_output(["git", "config", "--global", "core.hooksPath"])
+    hooks = Path(os.path.expanduser(current)) if current else global_hooks_dir()
+    for name in HOOK_NAMES:
+        write_hook(hooks / name, chain=not current)
+    if not current:
+        for name in CHAIN_NAMES:
+            if name not in HOOK_NAMES:
+                write_shim(hooks / name)
+        subprocess.run(
+            ["git", "config", "--global", "core.hooksPath", str(hooks)], check=True
+        )
+    data = load_hooks()
+    if data["global"] is None:
+        data["global"] = {"installed_at": now, "hook": str(hooks)}
+    save_hooks(data)
+    return hooks
+
+
+def uninstall(repo_path: str):
+    found = repo_hooks_dir(repo_path)
+    if found is None:
+        raise ValueError(f"{repo_path} is not a git repo")
+    top, hooks = found
+    for name in HOOK_NAMES:
+        remove_hook(hooks / name)
+    data = load_hooks()
+    data["repos"].pop(top, None)
+    save_hooks(data)
+
+
+def uninstall_global():
+    data = load_hooks()
+    hooks = Path(data["global"]["hook"]) if data["global"] else global_hooks_dir()
+    for name in HOOK_NAMES:
+        remove_hook(hooks / name)
+    if hooks == global_hooks_dir():
+        for name in CHAIN_NAMES:
+            remove_shim(hooks / name)
+        subprocess.run(
+            ["git", "config", "--global", "--unset", "core.hooksPath"],
+            stderr=subprocess.DEVNULL,
+        )
+    data["global"] = None
+    save_hooks(data)
+
+
+def hook_present(hooks_dir: str) -> bool:
+    # the hooks can be deleted by hand, don't trust hooks.json blindly
+    try:
+        text = Path(hooks_dir, "post-commit").read_text(encoding="utf-8")
+    except OSError:
+        return False
+    return BEGIN_MARKER in text
+
+
+@dataclass(slots=True)
+class Journal:
+    # commits recorded by the hooks, by repo toplevel, newest first
+    installed: dict[str, float] = field(default_factory=dict)
+    global_since: float | None = None
+    commits: dict[str, list[tuple[str, str, CommitRecord, int]]] = field(
+        default_factory=dict
+    )
+
+    def covers(self, repo_path: str, since: float) -> bool:
+        # the hooks were in place for the whole window and HEAD only moved
+        # by local commits in it. the global hooks never run in a repo that
+        # points core.hooksPath somewhere of its own
+        top = os.path.realpath(repo_path)
+        installed = self.installed.get(top)
+        if installed is None:
+            if gitdir.own_hooks_path(repo_path):
+                return False
+            installed = self.global_since
+        if installed is None or installed > since:
+            return False
+        return gitdir.only_local_commits_since(repo_path, since)
+
+    def lookup(
+        self, repo_path: str, author: str, since: float, dates_since: float | None
+    ) -> tuple[list[CommitRecord], set[str]]:
+        # what get_repo_snapshot's git log would have returned
+        log_since = since if dates_since is None else min(since, dates_since)
+        author_re = gitdir._author_pattern(author)
+        commits = []
+        dates = set()
+        for identity, _, record, ct in self.commits.get(
+            os.path.realpath(repo_path), []
+        ):
+            if ct < log_since or not author_re.search(identity):
+                continue
+            dates.add(record.date)
+            if ct >= since:
+                commits.append(record)
+        return commits, dates
+
+
+def load(since: float) -> Journal | None:
+    # everything recorded since `since`, walking the journal backwards so the
+    # cost is the number of new entries. None when no hooks are installed
+    data = load_hooks()
+    journal = Journal()
+    if data["global"] and hook_present(data["global"]["hook"]):
+        journal.global_since = data["global"]["installed_at"]
+    for repo, info in data["repos"].items():
+        if hook_present(info["hook"]):
+            journal.installed[repo] = info["installed_at"]
+    if journal.global_since is None and not journal.installed:
+        return None
+
+    path = journal_path()
+    if not path.exists():
+        return journal
+    seen = set()
+    for line in gitdir.reverse_lines(str(path)):
+        parts = line.decode(errors="replace").split("\x1f")
+        try:
+            recorded_at = int(parts[1])
+        except (IndexError, ValueError):
+            continue
+        if recorded_at < since:
+            break
+        if parts[0] == "r" and len(parts) == 4:
+            # newest first, so the rewrite is seen before the old commit
+            seen.add((parts[2], parts[3]))
+        elif parts[0] == "c" and len(parts) == 11:
+            _, _, repo, _, full, short, subject, name, email, iso, ct = parts
+            if (repo, full) in seen or not ct.isdigit():
+                continue
+            seen.add((repo, full))
+            identity = f"{name} <{email}>"
+            record = CommitRecord(short, subject, iso[:10], iso, identity)
+            journal.commits.setdefault(repo, []).append(
+                (identity, full, record, int(ct))
+            )
+    return journal
@@ -1,14 +1,30 @@
 import json
+import os
+import time
+from typing import TYPE_CHECKING
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-import requests
-
-from . import storage
+from . import cache, profiling, prompt, storage, transport
 from .models import LLMResponse
 
+if TYPE_CHECKING:
+    from .models import StandupResult
+
 OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
 DEFAULT_MODEL = "anthropic/claude-3.5-sonnet"
 
 
+def api_url() -> str:
+    # WTF_API_URL points wtf at another openrouter compatible server,
+    # such as the local one from `wtf dev`
+    return os.environ.get("WTF_API_URL") or OPENROUTER_URL
+
+
+def models_url() -> str:
+    # the model list sits next to chat/completions, here and on the stub
+    return api_url().rstrip("/").removesuffix("/chat/completions") + "/models"
+
+
 def get_api_key() -> str:
     # get api key from config
     config = storage.load_config()
@@ -59,48 +75,355 @@ Rules:
 - Notice: repeated fixes, vague commits, late night work, scattered focus
 """
 
+# commit batches too big for one prompt are first boiled down to notes,
+# this many llm calls at a time, within this share of the deadline (the
+# rest is kept for the final call)
+DEFAULT_MAP_CONCURRENCY = 4
+MAP_DEADLINE_SHARE = 0.7
+
+MAP_SCHEMA = {
+    "name": "standup_notes",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "notes": {
+                "type": "string",
+                "description": "What these commits did, 2-4 sentences naming the repos",
+            },
+            "patterns": {
+                "type": "string",
+                "description": "Anything worth teasing about. Empty string if nothing stands out.",
+            },
+        },
+        "required": ["notes", "patterns"],
+        "additionalProperties": False,
+    },
+}
+
+MAP_PROMPT = """You take notes on one batch of a developer's git commits. Notes from every batch are turned into a standup summary later.
+
+Rules:
+- Notes: 2-4 sentences about what was done, name the repos
+- Patterns: repeated fixes, vague commits, late night work, scattered focus. Empty if none.
+- Be brief. No fluff.
+"""
+
 
 def analyze_commits(
-    commits_text: str, diff_text: str | None = None
+    commits_text: str,
+    diff_text: str | None = None,
+    deadline: float | None = None,
+    throttle: transport.Throttle | None = None,
 ) -> tuple[LLMResponse, float]:
-    # call openrouter
-    api_key = get_api_key()
-    model = get_model()
+    content, cost = complete(build_payload(commits_text, diff_text), deadline, throttle)
+    return LLMResponse(**content), cost
 
-    # build user message with commits and optional diff
-    user_content = f"COMMITS:\n{commits_text}"
-    if diff_text:
-        user_content += f"\n\nUNCOMMITTED CHANGES (diff):\n{diff_text}"
 
+def complete(
+    payload: dict,
+    deadline: float | None = None,
+    throttle: transport.Throttle | None = None,
+) -> tuple[dict, float]:
+    # call openrouter, the parsed json answer and what it cost
+    response = transport.post(
+        api_url(),
+        headers=build_headers(),
+        json=payload,
+        deadline=deadline,
+        throttle=throttle,
+    )
+    response.raise_for_status()
+    data = response.json()
+
+    content = json.loads(data["choices"][0]["message"]["content"])
+    usage = data.get("usage", {})
+    profiling.add_tokens(usage)
+    return content, calc_cost(usage)
+
+
+def summarize(
+    commits_text: str,
+    diff_text: str | None = None,
+    budget: int | None = None,
+    on_update=None,
+    deadline: float | None = None,
+    no_cache: bool = False,
+    throttle: transport.Throttle | None = None,
+) -> tuple[LLMResponse, float]:
+    # one call when the commits fit one prompt, map_reduce when they don't.
+    # streams through on_update when it's given. a throttle spaces out every
+    # request made on the way
+    budget = budget or prompt.budget_for(get_model())
+    size = prompt.commit_budget(budget, diff_text is not None)
+    batches = prompt.batch(commits_text, size)
+    if len(batches) > 1:
+        return map_reduce(batches, diff_text, on_update, deadline, no_cache, throttle)
+    if on_update:
+        return stream_commits(commits_text, diff_text, on_update, deadline, throttle)
+    return analyze_commits(commits_text, diff_text, deadline, throttle)
+
+
+def remote_backend(
+    result: "StandupResult",
+    commits_text: str,
+    diff_text: str | None = None,
+    budget: int | None = None,
+    on_update=None,
+    deadline: float | None = None,
+    no_cache: bool = False,
+) -> tuple[LLMResponse, float]:
+    # the llm on openrouter, from the planned prompt
+    return summarize(commits_text, diff_text, budget, on_update, deadline, no_cache)
+
+
+def offline_backend(
+    result: "StandupResult",
+    commits_text: str,
+    diff_text: str | None = None,
+    budget: int | None = None,
+    on_update=None,
+    deadline: float | None = None,
+    no_cache: bool = False,
+) -> tuple[LLMResponse, float]:
+    # heuristics over the collected commits, no network and free
+    from . import heuristic
+
+    return heuristic.summarize(result), 0.0
+
+
+# where standups come from: `summarizer` in the config, --offline picks
+# "offline". every backend takes the same arguments and returns
+# (LLMResponse, cost)
+BACKENDS = {"openrouter": remote_backend, "offline": offline_backend}
+DEFAULT_BACKEND = "openrouter"
+
+# a remote backend failing with one of these (no network, past the
+# deadline) falls back to offline, the rest are real errors
+FALLBACK_ERRORS = (
+    transport.requests.exceptions.ConnectionError,
+    transport.requests.exceptions.Timeout,
+)
+
+
+def spent(error: Exception) -> float:
+    # what a failed summarize cost anyway (map calls that finished)
+    return getattr(error, "cost", 0.0)
+
+
+def fallback_reason(error: Exception) -> str:
+    if isinstance(error, transport.requests.exceptions.Timeout):
+        return "timed out"
+    return "unreachable"
+
+
+def map_reduce(
+    batches: list[str],
+    diff_text: str | None = None,
+    on_update=None,
+    deadline: float | None = None,
+    no_cache: bool = False,
+    throttle: transport.Throttle | None = None,
+) -> tuple[LLMResponse, float]:
+    # notes for every batch in parallel (each cached on its own, so a window
+    # that grew by a day only pays for the new batch), then the standup from
+    # the notes. the deadline covers both rounds
+    config = storage.load_config() or {}
+    ttl = config.get("cache_ttl", cache.DEFAULT_TTL)
+    max_entries = config.get("cache_max_entries", cache.DEFAULT_MAX_ENTRIES)
+    concurrency = config.get("map_concurrency", DEFAULT_MAP_CONCURRENCY)
+    total = deadline or transport.DEFAULT_DEADLINE
+    started = time.monotonic()
+    end = started + total
+    map_end = started + total * MAP_DEADLINE_SHARE
+
+    def notes_for(batch: str) -> tuple[dict, float]:
+        # each call gets what is left of the map round, batches still
+        # queued behind the pool when it runs out never start
+        remaining = map_end - time.monotonic()
+        if remaining <= 0:
+            raise transport.DeadlineExceeded("LLM map step ran past its deadline")
+        return take_notes(batch, remaining, throttle)
+
+    keys = [notes_key(b) for b in batches]
+    notes = [None if no_cache else cache.get(key, ttl) for key in keys]
+    missing = [i for i, found in enumerate(notes) if found is None]
+    cost = 0.0
+    errors = []
+    if missing:
+        with ThreadPoolExecutor(
+            max_workers=max(1, min(concurrency, len(missing)))
+        ) as pool:
+            futures = {pool.submit(notes_for, batches[i]): i for i in missing}
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    notes[i], batch_cost = future.result()
+                except Exception as e:
+                    # the standup needs every batch, don't start the rest
+                    errors.append(e)
+                    for pending in futures:
+                        pending.cancel()
+                    continue
+                cost += batch_cost
+                cache.put(keys[i], notes[i], max_entries)
+    if errors:
+        # the batches that finished are paid for either way
+        errors[0].cost = cost
+        raise errors[0]
+
+    try:
+        remaining = end - time.monotonic()
+        if remaining <= 0:
+            raise transport.DeadlineExceeded("LLM map step ran past its deadline")
+        if on_update:
+            response, reduce_cost = stream_commits(
+                format_notes(notes), diff_text, on_update, remaining, throttle
+            )
+        else:
+            response, reduce_cost = analyze_commits(
+                format_notes(notes), diff_text, remaining, throttle
+            )
+    except Exception as e:
+        e.cost = cost
+        raise
+    return response, cost + reduce_cost
+
+
+def take_notes(
+    batch: str,
+    deadline: float | None = None,
+    throttle: transport.Throttle | None = None,
+) -> tuple[dict, float]:
+    started = profiling.now()
+    notes, cost = complete(
+        chat_payload(MAP_PROMPT, f"COMMITS:\n{batch}", MAP_SCHEMA), deadline, throttle
+    )
+    profiling.record("llm map", None, started)
+    return notes, cost
+
+
+def format_notes(notes: list[dict]) -> str:
+    # stands in for the commit list in the final prompt
+    out = [f"Too many to list, here are notes on them in {len(notes)} batches:"]
+    for i, n in enumerate(notes, 1):
+        out.append(f"\nBatch {i}:\n  {n['notes']}")
+        if n.get("patterns"):
+            out.append(f"  Patterns: {n['patterns']}")
+    return "\n".join(out)
+
+
+def stream_commits(
+    commits_text: str,
+    diff_text: str | None = None,
+    on_update=None,
+    deadline: float | None = None,
+    throttle: transport.Throttle | None = None,
+) -> tuple[LLMResponse, float]:
+    # same as analyze_commits, but reads the SSE stream and calls
+    # on_update(field, text) as each field's text arrives
+    payload = build_payload(commits_text, diff_text)
+    payload["stream"] = True
+    payload["usage"] = {"include": True}
+
+    end = time.monotonic() + (deadline or transport.DEFAULT_DEADLINE)
+    started = profiling.now()
+    response = transport.post(
+        api_url(),
+        headers=build_headers(),
+        json=payload,
+        deadline=deadline,
+        throttle=throttle,
+        stream=True,
+    )
+    with response:
+        response.raise_for_status()
+        fields = FieldStream()
+        content = []
+        usage = {}
+        for line in response.iter_lines():
+            if time.monotonic() > end:
+                raise transport.DeadlineExceeded("LLM stream ran past its deadline")
+            # blank keep-alives and ": OPENROUTER PROCESSING" comments
+            if not line.startswith(b"data:"):
+                continue
+            data = line[len(b"data:") :].strip()
+            if data == b"[DONE]":
+                break
+            chunk = json.loads(data)
+            if chunk.get("error"):
+                raise RuntimeError(chunk["error"].get("message", "stream error"))
+            usage = chunk.get("usage") or usage
+            for choice in chunk.get("choices", []):
+                delta = (choice.get("delta") or {}).get("content")
+                if not delta:
+                    continue
+                if not content:
+                    profiling.record("llm first token", None, started)
+                content.append(delta)
+                for field, text in fields.feed(delta):
+                    if on_update:
+                        on_update(field, text)
+
+    profiling.add_tokens(usage)
+    return LLMResponse(**json.loads("".join(content))), calc_cost(usage)
+
+
+def build_headers() -> dict:
+    return {
+        "Authorization": f"Bearer {get_api_key()}",
+        "Content-Type": "application/json",
+    }
+
+
+def build_payload(commits_text: str, diff_text: str | None = None) -> dict:
+    return chat_payload(
+        SYSTEM_PROMPT, build_user_content(commits_text, diff_text), SCHEMA
+    )
+
+
+def chat_payload(system: str, user: str, schema: dict) -> dict:
+    model = get_model()
     payload = {
         "model": model,
         "messages": [
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": user_content},
+            {"role": "system", "content": system},
+            {"role": "user", "content": user},
         ],
-        "response_format": {"type": "json_schema", "json_schema": SCHEMA},
+        "response_format": {"type": "json_schema", "json_schema": schema},
     }
 
     # use deepinfra provider for gpt-oss model (cheap + fast)
     if model == "openai/gpt-oss-120b":
         payload["provider"] = {"order": ["DeepInfra"]}
+    return payload
 
-    response = requests.post(
-        OPENROUTER_URL,
-        headers={
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json",
-        },
-        json=payload,
+
+def build_user_content(commits_text: str, diff_text: str | None = None) -> str:
+    # build user message with commits and optional diff
+    user_content = f"COMMITS:\n{commits_text}"
+    if diff_text:
+        user_content += f"\n\nUNCOMMITTED CHANGES (diff):\n{diff_text}"
+    return user_content
+
+
+def cache_key(commits_text: str, diff_text: str | None = None) -> str:
+    # identical prompts to the same model get the same answer from the cache
+    return cache.make_key(
+        get_model(),
+        SYSTEM_PROMPT,
+        json.dumps(SCHEMA, sort_keys=True),
+        build_user_content(commits_text, diff_text),
     )
-    response.raise_for_status()
-    data = response.json()
 
-    content = json.loads(data["choices"][0]["message"]["content"])
-    usage = data.get("usage", {})
-    cost = calc_cost(usage)
 
-    return LLMResponse(**content), cost
+def notes_key(batch: str) -> str:
+    return cache.make_key(
+        get_model(),
+        MAP_PROMPT,
+        json.dumps(MAP_SCHEMA, sort_keys=True),
+        f"COMMITS:\n{batch}",
+    )
 
 
 def calc_cost(usage: dict) -> float:
@@ -108,3 +431,98 @@ def calc_cost(usage: dict) -> float:
     prompt = usage.get("prompt_tokens", 0) * 0.0000001
     completion = usage.get("completion_tokens", 0) * 0.0000002
     return prompt + completion
+
+
+JSON_ESCAPES = {
+    '"': '"',
+    "\\": "\\",
+    "/": "/",
+    "b": "\b",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+}
+
+
+class FieldStream:
+    # pulls top-level string fields out of a JSON object fed in arbitrary
+    # chunks, feed() returns (field, decoded text) for whatever just arrived
+
+    def __init__(self):
+        self.state = "object"
+        self.field = None
+        self.key = []
+        self.pending = ""
+
+    def feed(self, chunk: str) -> list[tuple[str, str]]:
+        text = self.pending + chunk
+        self.pending = ""
+        out = []
+        value = []
+        i = 0
+        while i < len(text):
+            ch = text[i]
+            if self.state in ("key", "string") and ch == "\\":
+                decoded, used = unescape(text, i)
+                if decoded is None:
+                    # escape split across chunks, finish it next time
+                    self.pending = text[i:]
+                    break
+                (self.key if self.state == "key" else value).append(decoded)
+                i += used
+                continue
+
+            if self.state == "object":
+                if ch == '"':
+                    self.state, self.key = "key", []
+            elif self.state == "key":
+                if ch == '"':
+                    self.state, self.field = "colon", "".join(self.key)
+                else:
+                    self.key.append(ch)
+            elif self.state == "colon":
+                if ch == ":":
+                    self.state = "value"
+            elif self.state == "value":
+                if ch == '"':
+                    self.state = "string"
+                elif not ch.isspace():
+                    # null or another non-string value
+                    self.state = "other"
+            elif self.state == "string":
+                if ch == '"':
+                    if value:
+                        out.append((self.field, "".join(value)))
+                        value = []
+                    self.state = "object"
+                else:
+                    value.append(ch)
+            elif self.state == "other":
+                if ch in ",}":
+                    self.state = "object"
+            i += 1
+
+        if value:
+            out.append((self.field, "".join(value)))
+        return out
+
+
+def unescape(text: str, i: int) -> tuple[str | None, int]:
+    # decode the escape at text[i], (None, 0) if it isn't complete yet
+    if i + 1 >= len(text):
+        return None, 0
+    kind = text[i + 1]
+    if kind != "u":
+        return JSON_ESCAPES.get(kind, kind), 2
+    if i + 6 > len(text):
+        return None, 0
+    code = int(text[i + 2 : i + 6], 16)
+    if 0xD800 <= code < 0xDC00:
+        # high surrogate, needs its low half
+        if i + 12 > len(text):
+            return None, 0
+        if text[i + 6 : i + 8] == "\\u":
+            low = int(text[i + 8 : i + 12], 16)
+            return chr(0x10000 + ((code - 0xD800) << 10) + (low - 0xDC00)), 12
+    return chr(code), 6
@@ -45,3 +45,7 @@ class StandupResult(BaseModel):
     wip: list[WipSummary] = []
     time_stats: TimeStats | None = None
     streak: int = 0
+    longest_streak: int = 0
+    week_days: list[str] = []
+    cache_hit: bool = False
+    author: str = ""
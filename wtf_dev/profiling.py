@@ -0,0 +1,145 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+
+@dataclass(slots=True)
+class Span:
+    name: str
+    repo: str | None
+    start: float
+    seconds: float
+    thread: int
+    subprocesses: int = 0
+    bytes_read: int = 0
+
+
+@dataclass(slots=True)
+class Profile:
+    started: float = field(default_factory=time.perf_counter)
+    spans: list[Span] = field(default_factory=list)
+    tokens: dict[str, int] = field(default_factory=dict)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+# the profile for this run, None unless --profile is on. recording is a
+# no-op without it so the instrumented code paths only pay a None check
+current: Profile | None = None
+
+
+def start() -> Profile:
+    global current
+    current = Profile()
+    return current
+
+
+def stop() -> Profile | None:
+    global current
+    profile, current = current, None
+    return profile
+
+
+def now() -> float:
+    return time.perf_counter()
+
+
+def record(
+    name: str,
+    repo: str | None,
+    started: float,
+    subprocesses: int = 0,
+    bytes_read: int = 0,
+):
+    # close a span that began at started (a now() value)
+    profile = current
+    if profile is None:
+        return
+    span = Span(
+        name=name,
+        repo=repo,
+        start=started - profile.started,
+        seconds=time.perf_counter() - started,
+        thread=threading.get_ident(),
+        subprocesses=subprocesses,
+        bytes_read=bytes_read,
+    )
+    with profile.lock:
+        profile.spans.append(span)
+
+
+def record_git(name: str, repo: str | None, started: float, output: bytes | str):
+    # one git subprocess and whatever it wrote to stdout
+    record(name, repo, started, subprocesses=1, bytes_read=len(output or b""))
+
+
+@contextmanager
+def phase(name: str, repo: str | None = None):
+    started = now()
+    try:
+        yield
+    finally:
+        record(name, repo, started)
+
+
+def add_tokens(usage: dict):
+    profile = current
+    if profile is None:
+        return
+    with profile.lock:
+        for key in ("prompt_tokens", "completion_tokens"):
+            profile.tokens[key] = profile.tokens.get(key, 0) + usage.get(key, 0)
+
+
+def summarize(profile: Profile, slowest: int = 5) -> dict:
+    # totals per phase, in the order phases first started, plus the repos
+    # that spent the most time in git
+    phases = {}
+    repos = {}
+    for span in sorted(profile.spans, key=lambda s: s.start):
+        row = phases.setdefault(
+            span.name, {"calls": 0, "seconds": 0.0, "subprocesses": 0, "bytes": 0}
+        )
+        row["calls"] += 1
+        row["seconds"] += span.seconds
+        row["subprocesses"] += span.subprocesses
+        row["bytes"] += span.bytes_read
+        if span.repo is not None and span.subprocesses:
+            repo = repos.setdefault(span.repo, {"seconds": 0.0, "calls": 0})
+            repo["seconds"] += span.seconds
+            repo["calls"] += span.subprocesses
+    ranked = sorted(repos.items(), key=lambda kv: kv[1]["seconds"], reverse=True)
+    return {
+        "wall_seconds": time.perf_counter() - profile.started,
+        "subprocesses": sum(s.subprocesses for s in profile.spans),
+        "bytes_read": sum(s.bytes_read for s in profile.spans),
+        "tokens": dict(profile.tokens),
+        "phases": phases,
+        "slowest_repos": [{"repo": r, **stats} for r, stats in ranked[:slowest]],
+    }
+
+
+def write_trace(profile: Profile, path: str):
+    # chrome trace event format, opens in about:tracing and ui.perfetto.dev
+    threads = {}
+    events = []
+    for span in profile.spans:
+        tid = threads.setdefault(span.thread, len(threads))
+        args = {"subprocesses": span.subprocesses, "bytes_read": span.bytes_read}
+        if span.repo is not None:
+            args["repo"] = span.repo
+        events.append(
+            {
+                "name": span.name,
+                "ph": "X",
+                "ts": round(span.start * 1e6),
+                "dur": round(span.seconds * 1e6),
+                "pid": 1,
+                "tid": tid,
+                "args": args,
+            }
+        )
+    trace = {"traceEvents": events, "otherData": summarize(profile)}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(trace, f, indent=2)
@@ -0,0 +1,326 @@
+import re
+from dataclasses import dataclass, field
+from pathlib import PurePosixPath
+
+from .models import RepoSummary, WipSummary
+
+# ~4 characters per token holds up well enough for english and code
+CHARS_PER_TOKEN = 4
+
+# prompt budgets (tokens) per model, far below the context windows on
+# purpose: prompt size is what drives latency and cost here
+DEFAULT_BUDGET = 6000
+MODEL_BUDGETS = {
+    "openai/gpt-oss-120b": 8000,
+    "openai/gpt-4o-mini": 8000,
+    "google/gemini-2.0-flash-001": 12000,
+    "anthropic/claude-sonnet-4": 10000,
+    "anthropic/claude-3.5-sonnet": 10000,
+    "deepseek/deepseek-r1": 6000,
+}
+
+# commits are the main signal, they may use up to this share of the budget
+COMMIT_SHARE = 0.6
+# commits that don't fit one prompt are summarized in about this many
+# batches first (map), then once more from those summaries (reduce)
+DEFAULT_MAX_BATCHES = 8
+# never list more than this many changed files per repo
+MAX_FILES_LISTED = 10
+
+NOISE_FILES = frozenset(
+    {
+        "uv.lock",
+        "poetry.lock",
+        "Pipfile.lock",
+        "package-lock.json",
+        "npm-shrinkwrap.json",
+        "yarn.lock",
+        "pnpm-lock.yaml",
+        "bun.lockb",
+        "Cargo.lock",
+        "Gemfile.lock",
+        "composer.lock",
+        "go.sum",
+        "flake.lock",
+    }
+)
+NOISE_SUFFIXES = (
+    ".lock",
+    ".min.js",
+    ".min.css",
+    ".map",
+    ".snap",
+    ".svg",
+    ".png",
+    ".jpg",
+    ".jpeg",
+    ".gif",
+    ".ico",
+    ".webp",
+    ".pdf",
+    ".zip",
+    ".gz",
+    ".tar",
+    ".woff",
+    ".woff2",
+    ".ttf",
+    ".so",
+    ".dylib",
+    ".dll",
+    ".exe",
+    ".pyc",
+)
+NOISE_DIRS = frozenset({"node_modules", "vendor", "dist", "build", "__pycache__"})
+
+# the same noise as git pathspec globs, so git never diffs it in the first place
+NOISE_PATHSPECS = [
+    *(f"**/{name}" for name in sorted(NOISE_FILES)),
+    *(f"**/*{suffix}" for suffix in NOISE_SUFFIXES),
+    *(f"**/{name}/**" for name in sorted(NOISE_DIRS)),
+]
+
+DEFINITION_RE = re.compile(
+    r"^(async\s+)?(def|class|function|func|fn|struct|interface|type|export)\b"
+)
+TRIVIAL_PREFIXES = ("import ", "from ", "#", "//", "/*", "*", "}", "{", ")", "]")
+
+
+@dataclass(slots=True)
+class FileDiff:
+    path: str
+    header: str
+    hunks: list[str] = field(default_factory=list)
+    binary: bool = False
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def budget_for(model: str) -> int:
+    return MODEL_BUDGETS.get(model, DEFAULT_BUDGET)
+
+
+def commit_budget(budget: int, has_wip: bool) -> int:
+    # the commits' share of one prompt
+    return int(budget * COMMIT_SHARE) if has_wip else budget
+
+
+def is_noise(path: str) -> bool:
+    # lockfiles, generated/minified assets and binaries say nothing useful
+    p = PurePosixPath(path)
+    if p.name in NOISE_FILES or p.name.endswith(NOISE_SUFFIXES):
+        return True
+    return any(part in NOISE_DIRS for part in p.parts[:-1])
+
+
+def split_diff(diff: str) -> list[FileDiff]:
+    # break a unified diff into files and hunks
+    files = []
+    for chunk in re.split(r"^(?=diff --git )", diff, flags=re.M):
+        if not chunk.startswith("diff --git "):
+            continue
+        header, *hunks = re.split(r"^(?=@@ )", chunk, flags=re.M)
+        first = header.split("\n", 1)[0]
+        path = first.split(" b/", 1)[-1]
+        files.append(
+            FileDiff(
+                path=path,
+                header=first,
+                hunks=[h.rstrip("\n") for h in hunks],
+                binary="Binary files" in header or "GIT binary patch" in header,
+            )
+        )
+    return files
+
+
+def score_hunk(hunk: str) -> float:
+    # informative = many meaningful changed lines (definitions count extra),
+    # per token, so one dense hunk beats a huge reformat
+    meaningful = 0
+    for line in hunk.split("\n")[1:]:
+        if line[:1] not in "+-":
+            continue
+        text = line[1:].strip()
+        if not text or text.startswith(TRIVIAL_PREFIXES):
+            continue
+        meaningful += 4 if DEFINITION_RE.match(text) else 1
+    return meaningful / (1 + estimate_tokens(hunk) / 100)
+
+
+def fair_shares(demands: list[int], budget: int) -> list[int]:
+    # max-min fair split: small demands are met in full, the rest is
+    # shared evenly among the bigger ones
+    shares = [0] * len(demands)
+    remaining = budget
+    order = sorted(range(len(demands)), key=lambda i: demands[i])
+    for n, i in enumerate(order):
+        share = min(demands[i], remaining // (len(order) - n))
+        shares[i] = share
+        remaining -= share
+    return shares
+
+
+def format_commits(summaries: list[RepoSummary], budget: int | None = None) -> str:
+    # one line per commit, trimmed to a fair share of the budget per repo
+    blocks = []
+    for s in summaries:
+        lines = [f"  - {c.message}" for c in s.commits]
+        blocks.append((f"\n{s.name} ({len(s.commits)} commits):", lines))
+
+    if budget is not None:
+        demands = [sum(estimate_tokens(line) for line in lines) for _, lines in blocks]
+        headers = sum(estimate_tokens(header) for header, _ in blocks)
+        shares = fair_shares(demands, max(0, budget - headers))
+        blocks = [
+            (header, take_lines(lines, share))
+            for (header, lines), share in zip(blocks, shares)
+        ]
+
+    out = []
+    for header, lines in blocks:
+        out.append(header)
+        out.extend(lines)
+    return "\n".join(out)
+
+
+def take_lines(lines: list[str], budget: int) -> list[str]:
+    kept = []
+    used = 0
+    for line in lines:
+        cost = estimate_tokens(line)
+        if used + cost > budget:
+            # the marker counts against the budget too
+            while kept and used + estimate_tokens(more_marker(lines, kept)) > budget:
+                used -= estimate_tokens(kept.pop())
+            kept.append(more_marker(lines, kept))
+            break
+        kept.append(line)
+        used += cost
+    return kept
+
+
+def more_marker(lines: list[str], kept: list[str]) -> str:
+    return f"  ... and {len(lines) - len(kept)} more"
+
+
+def format_wip(wip_summaries: list[WipSummary], budget: int | None = None) -> str:
+    # file list plus the most informative hunks of each repo's diff
+    # each wip's diff_preview is replaced with the excerpt actually sent
+    heads = []
+    hunks = []
+    for wip in wip_summaries:
+        lines = [f"\n{wip.repo_name} ({len(wip.files_changed)} files changed):"]
+        lines.extend(f"  {f}" for f in wip.files_changed[:MAX_FILES_LISTED])
+        heads.append("\n".join(lines))
+        hunks.append(
+            [
+                (f, h)
+                for f in split_diff(wip.diff_preview)
+                if not f.binary and not is_noise(f.path)
+                for h in f.hunks
+            ]
+        )
+
+    demands = [sum(estimate_tokens(h) for _, h in repo) for repo in hunks]
+    if budget is None:
+        shares = demands
+    else:
+        head_tokens = sum(estimate_tokens(h) for h in heads)
+        shares = fair_shares(demands, max(0, budget - head_tokens))
+
+    out = []
+    for wip, head, repo_hunks, share in zip(wip_summaries, heads, hunks, shares):
+        excerpt = select_hunks(repo_hunks, share)
+        wip.diff_preview = excerpt
+        out.append(head)
+        if excerpt:
+            out.append(f"\nDiff preview:\n{excerpt}")
+    return "\n".join(out)
+
+
+def select_hunks(hunks: list[tuple[FileDiff, str]], budget: int) -> str:
+    # best scoring hunks that fit, printed back in diff order
+    ranked = sorted(range(len(hunks)), key=lambda i: -score_hunk(hunks[i][1]))
+    chosen = set()
+    used = 0
+    for i in ranked:
+        cost = estimate_tokens(hunks[i][1])
+        if used + cost <= budget:
+            chosen.add(i)
+            used += cost
+    if not chosen and hunks and budget > 0:
+        # nothing fits whole, send the head of the best hunk
+        f, hunk = hunks[ranked[0]]
+        return f"{f.header}\n{hunk[: budget * CHARS_PER_TOKEN]}"
+
+    out = []
+    last_file = None
+    for i in sorted(chosen):
+        f, hunk = hunks[i]
+        if f is not last_file:
+            out.append(f.header)
+            last_file = f
+        out.append(hunk)
+    return "\n".join(out)
+
+
+def plan(
+    summaries: list[RepoSummary],
+    wip_summaries: list[WipSummary],
+    budget: int | None = None,
+    batches: int = 1,
+) -> tuple[str, str | None]:
+    # (commits_text, diff_text) sized to the budget, commits first. with
+    # batches > 1 the commits may fill that many prompts' worth, see batch()
+    if budget is None:
+        commits_text = format_commits(summaries) if summaries else "No commits."
+        diff_text = format_wip(wip_summaries) if wip_summaries else None
+        return commits_text, diff_text
+
+    size = commit_budget(budget, bool(wip_summaries))
+    commits_text = (
+        format_commits(summaries, size * max(1, batches))
+        if summaries
+        else "No commits."
+    )
+    # batched commits reach the final prompt as short summaries, the diff
+    # still gets the rest of one prompt
+    diff_budget = budget - min(estimate_tokens(commits_text), size)
+    diff_text = format_wip(wip_summaries, diff_budget) if wip_summaries else None
+    return commits_text, diff_text
+
+
+def batch(commits_text: str, size: int) -> list[str]:
+    # commits_text cut into pieces of at most size tokens (counted the way
+    # format_commits counts them). a repo that runs over into the next piece
+    # gets its header repeated there
+    blocks = []
+    for line in commits_text.split("\n"):
+        if not line:
+            continue
+        if line.startswith("  ") and blocks:
+            blocks[-1].append(line)
+        else:
+            blocks.append([f"\n{line}"])
+
+    out = []
+    used = 0
+    for header, *lines in blocks:
+        header_cost = estimate_tokens(header)
+        first = estimate_tokens(lines[0]) if lines else 0
+        if not out or used + header_cost + first > size:
+            out.append([])
+            used = 0
+        out[-1].append(header)
+        used += header_cost
+        fresh = True
+        for line in lines:
+            cost = estimate_tokens(line)
+            if used + cost > size and not fresh:
+                out.append([header])
+                used = header_cost
+            out[-1].append(line)
+            used += cost
+            fresh = False
+    return ["\n".join(lines) for lines in out]
@@ -3,7 +3,7 @@ from InquirerPy import inquirer
 from rich.console import Console
 from rich.prompt import Prompt
 
-from . import storage
+from . import storage, transport
 
 console = Console()
 
@@ -24,10 +24,13 @@ POPULAR_MODELS = [
 
 
 def fetch_models(api_key: str) -> list[dict]:
-    # fetch models from openrouter api
-    response = requests.get(
-        "https://openrouter.ai/api/v1/models",
+    # fetch models from openrouter api, or whatever WTF_API_URL points at
+    from .llm import models_url
+
+    response = transport.get(
+        models_url(),
         headers={"Authorization": f"Bearer {api_key}"},
+        deadline=30,
     )
     response.raise_for_status()
     return response.json().get("data", [])
@@ -1,8 +1,20 @@
 import json
+import os
+import sqlite3
+from contextlib import closing, contextmanager
 from datetime import datetime
 from pathlib import Path
+from typing import TYPE_CHECKING, NamedTuple
 
-from .models import StandupResult
+# pydantic is slow to import, only the history writers and readers need it
+if TYPE_CHECKING:
+    from .models import StandupResult
+
+try:
+    import fcntl
+except ImportError:  # windows
+    fcntl = None
+    import msvcrt
 
 WTF_DIR = Path.home() / ".wtf"
 HISTORY_DIR = WTF_DIR / "history"
@@ -12,69 +24,374 @@ CONFIG_FILE = WTF_DIR / "config.json"
 
 def init_storage():
     # create directories if they don't exist
-    WTF_DIR.mkdir(exist_ok=True)
-    HISTORY_DIR.mkdir(exist_ok=True)
+    WTF_DIR.mkdir(parents=True, exist_ok=True)
+    HISTORY_DIR.mkdir(parents=True, exist_ok=True)
 
 
-def save_standup(result: StandupResult):
-    # save standup to history
-    init_storage()
-    filename = f"{datetime.now().strftime('%Y-%m-%d_%H%M%S')}.json"
-    path = HISTORY_DIR / filename
-    path.write_text(result.model_dump_json(indent=2), encoding="utf-8")
+def write_atomic(path: Path, text: str):
+    # through a temp file of its own next to path, so two processes writing
+    # the same file (the daemon and a direct run) never share one and a
+    # crash never leaves it half-written
+    import tempfile
+
+    with tempfile.NamedTemporaryFile(
+        "w",
+        encoding="utf-8",
+        dir=path.parent,
+        prefix=f".{path.name}.",
+        suffix=".tmp",
+        delete=False,
+    ) as f:
+        f.write(text)
+    try:
+        os.replace(f.name, path)
+    except OSError:
+        os.unlink(f.name)
+        raise
+
+
+HISTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS standups (
+    id INTEGER PRIMARY KEY,
+    generated_at TEXT NOT NULL,
+    author TEXT NOT NULL DEFAULT '',
+    summary TEXT NOT NULL,
+    roast TEXT NOT NULL,
+    cost_usd REAL NOT NULL DEFAULT 0,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_standups_generated_at ON standups (generated_at);
+CREATE INDEX IF NOT EXISTS idx_standups_author ON standups (author, generated_at);
+CREATE TABLE IF NOT EXISTS standup_repos (
+    standup_id INTEGER NOT NULL REFERENCES standups (id) ON DELETE CASCADE,
+    repo TEXT NOT NULL,
+    commits INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_standup_repos_repo ON standup_repos (repo, standup_id);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
 
+class HistoryEntry(NamedTuple):
+    generated_at: datetime
+    summary: str
 
-def load_history(limit: int = 10) -> list[StandupResult]:
-    # load recent standups
+
+def history_db() -> Path:
+    # resolved on every call so a patched WTF_DIR is respected
+    return WTF_DIR / "history.db"
+
+
+def connect_history() -> sqlite3.Connection:
+    # open the history db, creating it and importing old json history once
     init_storage()
-    files = sorted(HISTORY_DIR.glob("*.json"), reverse=True)[:limit]
+    conn = sqlite3.connect(history_db(), timeout=10)
+    conn.executescript(HISTORY_SCHEMA)
+    if not json_imported(conn):
+        import_json_history(conn)
+    return conn
+
+
+def json_imported(conn: sqlite3.Connection) -> bool:
+    row = conn.execute("SELECT value FROM meta WHERE key = 'json_imported'")
+    return row.fetchone() is not None
+
+
+def import_json_history(conn: sqlite3.Connection):
+    # the marker is checked again under the write lock, so two processes
+    # opening the db together (the daemon and the cli) can't both import
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if not json_imported(conn):
+            files = sorted(HISTORY_DIR.glob("*.json"))
+            if files:
+                from .models import StandupResult
+
+            for f in files:
+                try:
+                    result = StandupResult.model_validate_json(
+                        f.read_text(encoding="utf-8")
+                    )
+                except Exception:
+                    # skip invalid files
+                    continue
+                insert_standup(conn, result)
+            conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('json_imported', ?)",
+                (datetime.now().isoformat(),),
+            )
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+
+def insert_standup(conn: sqlite3.Connection, result: "StandupResult"):
+    cursor = conn.execute(
+        "INSERT INTO standups (generated_at, author, summary, roast, cost_usd, data)"
+        " VALUES (?, ?, ?, ?, ?, ?)",
+        (
+            result.generated_at.isoformat(),
+            result.author,
+            result.llm_response.summary,
+            result.llm_response.roast,
+            result.cost_usd,
+            result.model_dump_json(),
+        ),
+    )
+    conn.executemany(
+        "INSERT INTO standup_repos (standup_id, repo, commits) VALUES (?, ?, ?)",
+        [(cursor.lastrowid, r.name, len(r.commits)) for r in result.repos],
+    )
+
+
+def save_standup(result: "StandupResult"):
+    # save standup to history
+    with closing(connect_history()) as conn, conn:
+        insert_standup(conn, result)
+
+
+def query_history(
+    columns: str,
+    limit: int,
+    offset: int,
+    since: datetime | None,
+    until: datetime | None,
+    repo: str | None,
+    author: str | None,
+) -> list[tuple]:
+    # newest first, filtered on the indexed columns
+    where = []
+    params = []
+    if since is not None:
+        where.append("generated_at >= ?")
+        params.append(since.isoformat())
+    if until is not None:
+        where.append("generated_at < ?")
+        params.append(until.isoformat())
+    if author is not None:
+        where.append("author = ?")
+        params.append(author)
+    if repo is not None:
+        where.append("id IN (SELECT standup_id FROM standup_repos WHERE repo = ?)")
+        params.append(repo)
+    sql = f"SELECT {columns} FROM standups"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY generated_at DESC, id DESC LIMIT ? OFFSET ?"
+    with closing(connect_history()) as conn:
+        return conn.execute(sql, (*params, limit, offset)).fetchall()
+
+
+def load_history(
+    limit: int = 10,
+    offset: int = 0,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    repo: str | None = None,
+    author: str | None = None,
+) -> list["StandupResult"]:
+    # load recent standups in full
+    from .models import StandupResult
+
+    rows = query_history("data", limit, offset, since, until, repo, author)
     results = []
-    for f in files:
+    for (data,) in rows:
         try:
-            results.append(
-                StandupResult.model_validate_json(f.read_text(encoding="utf-8"))
-            )
+            results.append(StandupResult.model_validate_json(data))
         except Exception:
-            # skip invalid files
             continue
     return results
 
 
+def load_history_entries(
+    limit: int = 10,
+    offset: int = 0,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    repo: str | None = None,
+    author: str | None = None,
+) -> list[HistoryEntry]:
+    # just what --history prints, without parsing whole standups
+    rows = query_history(
+        "generated_at, summary", limit, offset, since, until, repo, author
+    )
+    return [
+        HistoryEntry(generated_at=datetime.fromisoformat(at), summary=summary)
+        for at, summary in rows
+    ]
+
+
+def spending_ledger() -> Path:
+    # append-only json lines, one record per run
+    return SPENDING_FILE.with_suffix(".jsonl")
+
+
+def spending_checkpoint() -> Path:
+    # running total plus how far into the ledger it covers
+    return SPENDING_FILE.with_suffix(".total.json")
+
+
+@contextmanager
+def locked(path: Path):
+    # exclusive cross-process lock on a sidecar file
+    with open(path.with_name(path.name + ".lock"), "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
 def add_spending(cost: float, model: str):
     # append spending record
     init_storage()
-    records = load_spending()
-    records.append(
-        {"timestamp": datetime.now().isoformat(), "model": model, "cost": cost}
-    )
-    SPENDING_FILE.write_text(json.dumps(records, indent=2), encoding="utf-8")
+    migrate_spending()
+    record = {"timestamp": datetime.now().isoformat(), "model": model, "cost": cost}
+    line = (json.dumps(record) + "\n").encode("utf-8")
+    ledger = spending_ledger()
+    with locked(ledger):
+        # one write on an O_APPEND handle, so records never interleave
+        with open(ledger, "ab") as f:
+            f.write(line)
+        update_checkpoint()
 
 
 def get_total_spent() -> float:
-    # calculate cumulative spending
-    records = load_spending()
-    return sum(r.get("cost", 0) for r in records)
+    # cumulative spending, only reading records newer than the checkpoint
+    migrate_spending()
+    if not spending_ledger().exists():
+        return 0.0
+    with locked(spending_ledger()):
+        return update_checkpoint()
+
+
+def update_checkpoint() -> float:
+    # fold records past the checkpoint into the running total (hold the lock)
+    path = spending_checkpoint()
+    try:
+        checkpoint = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        checkpoint = {"offset": 0, "total": 0.0}
+
+    offset, total = checkpoint["offset"], checkpoint["total"]
+    with open(spending_ledger(), "rb") as f:
+        if os.fstat(f.fileno()).st_size < offset:
+            # ledger was replaced, start over
+            offset, total = 0, 0.0
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                # partial write in progress, leave it for next time
+                break
+            offset += len(line)
+            total += _record_cost(line)
+
+    if (offset, total) != (checkpoint["offset"], checkpoint["total"]):
+        write_atomic(path, json.dumps({"offset": offset, "total": total}))
+    return total
+
+
+def iter_spending():
+    # stream ledger records without loading the whole file
+    ledger = spending_ledger()
+    if not ledger.exists():
+        return
+    with open(ledger, "rb") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
 
 
 def load_spending() -> list:
+    migrate_spending()
+    return list(iter_spending())
+
+
+def get_spending_breakdown(by: str) -> dict[str, float]:
+    # totals per model, day or month in one pass over the ledger
+    migrate_spending()
+    totals = {}
+    for record in iter_spending():
+        timestamp = record.get("timestamp", "")
+        if by == "model":
+            key = record.get("model", "unknown")
+        elif by == "day":
+            key = timestamp[:10]
+        elif by == "month":
+            key = timestamp[:7]
+        else:
+            raise ValueError(f"unknown breakdown: {by}")
+        totals[key] = totals.get(key, 0.0) + record.get("cost", 0)
+    return dict(sorted(totals.items()))
+
+
+def migrate_spending():
+    # move records from the old spending.json array into the ledger
     if not SPENDING_FILE.exists():
-        return []
-    return json.loads(SPENDING_FILE.read_text(encoding="utf-8"))
+        return
+    ledger = spending_ledger()
+    with locked(ledger):
+        if not SPENDING_FILE.exists():
+            return
+        try:
+            records = json.loads(SPENDING_FILE.read_text(encoding="utf-8"))
+        except ValueError:
+            records = []
+        with open(ledger, "ab") as f:
+            f.write("".join(json.dumps(r) + "\n" for r in records).encode("utf-8"))
+        os.replace(SPENDING_FILE, SPENDING_FILE.with_suffix(".json.migrated"))
+
+
+def _record_cost(line: bytes) -> float:
+    try:
+        return float(json.loads(line).get("cost", 0))
+    except (ValueError, TypeError, AttributeError):
+        return 0.0
 
 
 def save_config(api_key: str, model: str):
     # save api key and model to config file
+    # keep any other settings (like skip_dirs) the user added by hand
     init_storage()
-    config = {"api_key": api_key, "model": model}
+    config = dict(load_config() or {})
+    config.update({"api_key": api_key, "model": model})
     CONFIG_FILE.write_text(json.dumps(config, indent=2), encoding="utf-8")
+    _config_cache[CONFIG_FILE] = config
+
+
+# config is read once per process, keyed by path so a patched CONFIG_FILE works
+_config_cache: dict[Path, dict | None] = {}
 
 
 def load_config() -> dict | None:
     # load config from file
-    if not CONFIG_FILE.exists():
+    if CONFIG_FILE not in _config_cache:
+        _config_cache[CONFIG_FILE] = read_config(CONFIG_FILE)
+    return _config_cache[CONFIG_FILE]
+
+
+def reload_config() -> dict | None:
+    # for long-running processes, picks up edits made since the last read
+    _config_cache.pop(CONFIG_FILE, None)
+    return load_config()
+
+
+def read_config(path: Path) -> dict | None:
+    if not path.exists():
         return None
     try:
-        return json.loads(CONFIG_FILE.read_text(encoding="utf-8"))
+        return json.loads(path.read_text(encoding="utf-8"))
     except Exception:
         return None
 
@@ -0,0 +1,92 @@
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+
+from . import storage
+from .git import calculate_streak
+
+STREAK_FILE = storage.WTF_DIR / "streaks.json"
+
+# rescan a little before the last run so late arrivals (pulls, other machines)
+# still land on the right day
+OVERLAP = 2 * 86400
+
+
+@dataclass(slots=True)
+class StreakStats:
+    current: int = 0
+    longest: int = 0
+    # YYYY-MM-DD days with commits since monday
+    week_days: list[str] = field(default_factory=list)
+
+
+def load_all() -> dict:
+    if not STREAK_FILE.exists():
+        return {}
+    try:
+        return json.loads(STREAK_FILE.read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+
+
+def load(author: str) -> dict:
+    # days with commits plus a per-repo "scanned up to" timestamp
+    entry = load_all().get(author, {})
+    return {
+        "days": set(entry.get("days", [])),
+        "repos": dict(entry.get("repos", {})),
+    }
+
+
+def scanned_at(book: dict, repo_path: str) -> float:
+    # when this repo was last scanned for the author, 0.0 if never
+    return book["repos"].get(os.path.abspath(repo_path), 0.0)
+
+
+def scan_from(book: dict, repo_path: str) -> float:
+    # where the next git log for this repo has to start
+    last = scanned_at(book, repo_path)
+    return max(0.0, last - OVERLAP) if last else 0.0
+
+
+def record(
+    author: str, book: dict, dates: set[str], repos: list[str], started_at: float
+) -> StreakStats:
+    # merge new days in, move the scanned repos' marks forward and save
+    book["days"] |= dates
+    for repo in repos:
+        book["repos"][os.path.abspath(repo)] = started_at
+
+    data = load_all()
+    data[author] = {"days": sorted(book["days"]), "repos": book["repos"]}
+    storage.init_storage()
+    storage.write_atomic(STREAK_FILE, json.dumps(data))
+
+    return stats(book["days"])
+
+
+def stats(days: set[str], today: date | None = None) -> StreakStats:
+    today = today or datetime.now().date()
+    monday = today - timedelta(days=today.weekday())
+    week = {(monday + timedelta(days=i)).isoformat() for i in range(7)}
+    return StreakStats(
+        current=calculate_streak(days),
+        longest=longest_streak(days),
+        week_days=sorted(d for d in days if d in week),
+    )
+
+
+def longest_streak(days: set[str]) -> int:
+    # longest run of consecutive days
+    longest = run = 0
+    previous = None
+    for day in sorted(days):
+        try:
+            current = date.fromisoformat(day)
+        except ValueError:
+            continue
+        run = run + 1 if previous and current - previous == timedelta(days=1) else 1
+        longest = max(longest, run)
+        previous = current
+    return longest
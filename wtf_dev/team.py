@@ -0,0 +1,185 @@
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+from . import cache, gitdir, llm, prompt, storage, transport
+from .git import RepoSnapshot, get_repo_snapshot
+from .models import Commit, LLMResponse, RepoSummary, StandupResult
+
+# llm requests in flight at once, and per minute across all of them
+DEFAULT_CONCURRENCY = 4
+DEFAULT_RATE_PER_MINUTE = 30
+
+
+@dataclass(slots=True)
+class Member:
+    name: str
+    # matched against "Name <email>" like git log --author, first member wins
+    patterns: list[re.Pattern]
+
+    def matches(self, identity: str) -> bool:
+        return any(p.search(identity) for p in self.patterns)
+
+
+def parse_members(names: list[str], config: dict) -> list[Member]:
+    # --team takes names, comma separated or repeated. config "team" maps
+    # names to aliases ({"Ann": ["ann@corp.com", "asmith"]}), "all" is all
+    # of them
+    team = config.get("team") or {}
+    wanted = [n.strip() for arg in names for n in arg.split(",") if n.strip()]
+    if wanted == ["all"]:
+        wanted = list(team)
+    return [
+        Member(name, [gitdir._author_pattern(p) for p in [name, *team.get(name, [])]])
+        for name in dict.fromkeys(wanted)
+    ]
+
+
+def collect(
+    repos: list[str], since: float, jobs: int
+) -> list[tuple[str, RepoSnapshot]]:
+    # one git log per repo for everyone, .mailmap applied by git
+    if not repos:
+        return []
+    with ThreadPoolExecutor(max_workers=min(jobs, len(repos))) as pool:
+        snapshots = pool.map(lambda r: get_repo_snapshot(r, None, since), repos)
+        return list(zip(repos, snapshots))
+
+
+def split(
+    snapshots: list[tuple[str, RepoSnapshot]], members: list[Member]
+) -> dict[str, list[RepoSummary]]:
+    # each member's repos with only their commits, in repo order
+    by_member = {m.name: [] for m in members}
+    for repo_path, snapshot in snapshots:
+        name = Path(repo_path).name
+        buckets = {}
+        for c in snapshot.commits:
+            owner = next((m for m in members if m.matches(c.author)), None)
+            if owner is None:
+                continue
+            buckets.setdefault(owner.name, []).append(
+                Commit(
+                    hash=c.hash,
+                    message=c.message,
+                    date=c.date,
+                    time=c.time,
+                    repo_name=name,
+                )
+            )
+        for member, commits in buckets.items():
+            by_member[member].append(
+                RepoSummary(
+                    name=name, path=repo_path, commits=commits, branch=snapshot.branch
+                )
+            )
+    return by_member
+
+
+def summarize(
+    member: str,
+    summaries: list[RepoSummary],
+    config: dict,
+    throttle: transport.Throttle,
+    no_cache: bool = False,
+    deadline: float | None = None,
+    offline: bool = False,
+) -> StandupResult:
+    # one member's standup, saved to history like a normal run
+    from .cli import calculate_time_stats
+
+    result = StandupResult(
+        repos=summaries,
+        llm_response=LLMResponse(summary="", roast=""),
+        generated_at=datetime.now(),
+        cost_usd=0.0,
+        time_stats=calculate_time_stats([c for r in summaries for c in r.commits]),
+        author=member,
+    )
+    if not summaries:
+        return result
+    if offline or config.get("summarizer") == "offline":
+        result.llm_response, _ = llm.offline_backend(result, "")
+        storage.save_standup(result)
+        return result
+
+    budget = config.get("prompt_budget") or prompt.budget_for(llm.get_model())
+    commits_text, diff_text = prompt.plan(
+        summaries,
+        [],
+        budget,
+        batches=config.get("max_batches", prompt.DEFAULT_MAX_BATCHES),
+    )
+    key = llm.cache_key(commits_text, diff_text)
+    ttl = config.get("cache_ttl", cache.DEFAULT_TTL)
+    cached = None if no_cache else cache.get(key, ttl)
+    if cached is not None:
+        result.llm_response = LLMResponse(**cached)
+        result.cache_hit = True
+    else:
+        try:
+            result.llm_response, result.cost_usd = llm.summarize(
+                commits_text,
+                diff_text,
+                budget,
+                deadline=deadline or config.get("deadline"),
+                no_cache=no_cache,
+                throttle=throttle,
+            )
+        except Exception as e:
+            if llm.spent(e):
+                storage.add_spending(llm.spent(e), llm.get_model())
+            raise
+        max_entries = config.get("cache_max_entries", cache.DEFAULT_MAX_ENTRIES)
+        cache.put(key, result.llm_response.model_dump(), max_entries)
+        storage.add_spending(result.cost_usd, llm.get_model())
+    storage.save_standup(result)
+    return result
+
+
+def run(
+    members: list[Member],
+    repos: list[str],
+    since: float,
+    jobs: int,
+    config: dict,
+    no_cache: bool = False,
+    deadline: float | None = None,
+    on_done=None,
+    offline: bool = False,
+) -> list[tuple[StandupResult | None, Exception | None]]:
+    # summaries for every member at once, under the concurrency and rate
+    # limits. on_done(member, result, error) fires as each one finishes,
+    # the returned list is in member order
+    by_member = split(collect(repos, since, jobs), members)
+    throttle = transport.Throttle(
+        config.get("team_rate_per_minute", DEFAULT_RATE_PER_MINUTE)
+    )
+    concurrency = config.get("team_concurrency", DEFAULT_CONCURRENCY)
+    outcomes = {}
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = {
+            pool.submit(
+                summarize,
+                m.name,
+                by_member[m.name],
+                config,
+                throttle,
+                no_cache,
+                deadline,
+                offline,
+            ): m.name
+            for m in members
+        }
+        for future in as_completed(futures):
+            member = futures[future]
+            try:
+                outcome = (future.result(), None)
+            except Exception as e:
+                outcome = (None, e)
+            outcomes[member] = outcome
+            if on_done:
+                on_done(member, *outcome)
+    return [outcomes[m.name] for m in members]
@@ -0,0 +1,137 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+CONNECT_TIMEOUT = 5.0
+READ_TIMEOUT = 60.0
+# overall budget for a call, retries and backoff included
+DEFAULT_DEADLINE = 120.0
+MAX_RETRIES = 4
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 8.0
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class DeadlineExceeded(requests.exceptions.Timeout):
+    pass
+
+
+class Throttle:
+    # spaces calls out to at most per_minute, shared across threads
+
+    def __init__(self, per_minute: float | None):
+        self.interval = 60.0 / per_minute if per_minute else 0.0
+        self.lock = threading.Lock()
+        self.next_at = 0.0
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_at)
+            self.next_at = start + self.interval
+        time.sleep(start - now)
+
+
+def get_session() -> requests.Session:
+    # one pooled keep-alive session shared by every caller
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def request(
+    method: str,
+    url: str,
+    *,
+    deadline: float | None = None,
+    retries: int = MAX_RETRIES,
+    connect_timeout: float = CONNECT_TIMEOUT,
+    read_timeout: float = READ_TIMEOUT,
+    throttle: Throttle | None = None,
+    **kwargs,
+) -> requests.Response:
+    # send a request, retrying 429/5xx and connection errors with jittered
+    # exponential backoff (or Retry-After), never running past the deadline.
+    # with a throttle every attempt, retries included, waits its turn
+    end = time.monotonic() + (deadline or DEFAULT_DEADLINE)
+    session = get_session()
+    attempt = 0
+    while True:
+        if throttle is not None:
+            throttle.wait()
+        remaining = end - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceeded(f"{method} {url} ran past its deadline")
+
+        response, error = None, None
+        try:
+            response = session.request(
+                method,
+                url,
+                timeout=(min(connect_timeout, remaining), min(read_timeout, remaining)),
+                **kwargs,
+            )
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            error = e
+        else:
+            if response.status_code not in RETRY_STATUSES:
+                return response
+
+        delay = retry_after(response)
+        if delay is None:
+            delay = backoff(attempt)
+        if attempt >= retries or time.monotonic() + delay >= end:
+            # out of attempts or time, hand back the last answer we got
+            if response is not None:
+                return response
+            raise error
+
+        if response is not None:
+            response.close()
+        time.sleep(delay)
+        attempt += 1
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return request("POST", url, **kwargs)
+
+
+def backoff(attempt: int) -> float:
+    # full jitter keeps parallel callers from retrying in lockstep
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2**attempt))
+
+
+def retry_after(response: requests.Response | None) -> float | None:
+    # Retry-After is either seconds or an http date
+    if response is None:
+        return None
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None